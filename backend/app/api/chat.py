@@ -1,22 +1,37 @@
+import asyncio
 import time
+from dataclasses import dataclass, field
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from pydantic import BaseModel, Field
-from sqlalchemy import func
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import SessionLocal
-from app.db.models import ChatEvent, TimetableSlot
+from app.db.session import AsyncSessionLocal
+from app.db.models import TimetableSlot
 from app.core.security import hash_user, looks_like_prompt_injection
 from app.core.limiter import limiter
-
-from app.services.router import search_timetable, search_contacts, search_faq
-from app.nlp.intent_model import load_intent_model, predict_intent, load_faq_model, predict_faq_category
-from app.nlp.ner import extract_entities
-
-INTENT_MODEL = load_intent_model()
-FAQ_MODEL = load_faq_model()
+from app.core.executor import run_cpu
+from app.core.timing import StageTimer
+from app.services.event_log import EVENT_WRITER
+from app.services.answer_cache import answer_cache_key, get_cached_answer, set_cached_answer
+from app.services.kb_version import current_kb_version_async
+
+from app.services.router import search_timetable
+from app.services.retrieval import retrieve_contacts, retrieve_faq, retrieve_kb_multi
+from app.nlp.intent_model import (
+    FAQCategoryResult,
+    encode_text,
+    predict_intent,
+    predict_intent_batch,
+    predict_faq_category,
+    predict_faq_category_batch,
+)
+from app.nlp.linear import TextInput
+from app.nlp.ner import extract_entities, extract_entities_batch
+from app.nlp.registry import MODEL_REGISTRY
+from app.nlp.rules import CHAT_RULES
 
 router = APIRouter()
 
@@ -24,12 +39,9 @@ router = APIRouter()
 # ------------------------
 # DB dependency
 # ------------------------
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
 # ------------------------
@@ -40,6 +52,7 @@ class ChatRequest(BaseModel):
     message: str = Field(..., min_length=1, max_length=2000)
     channel: str = Field(default="web", description="web | kiosk")
     language: Optional[str] = Field(default=None, description="fr|en (optionnel)")
+    debug: bool = Field(default=False, description="Renvoie la trace de décision et les durées par étape")
 
 
 class Source(BaseModel):
@@ -54,106 +67,304 @@ class ChatResponse(BaseModel):
     entities: Optional[dict]
     confidence: Optional[float]
     sources: list[Source]
+    debug: Optional[dict] = Field(default=None, description="Présent uniquement si debug=true")
+
+
+class ChatBatchRequest(BaseModel):
+    items: list[ChatRequest] = Field(..., min_length=1, max_length=500)
+
+
+class ChatBatchResponse(BaseModel):
+    results: list[ChatResponse]
+
+
+@dataclass
+class ChatOutcome:
+    intent: str
+    confidence: float
+    answer: Optional[str]
+    sources: list[Source] = field(default_factory=list)
+    model_intent: Optional[str] = None
+    model_conf: float = 0.0
+    is_contact_intent: bool = False
+    is_timetable_intent: bool = False
+    is_faq_intent: bool = False
+    # règles déclenchées et nombre de candidats par recherche (mode debug)
+    rules: frozenset = frozenset()
+    trace: dict = field(default_factory=dict)
+
+
+async def _const(value):
+    return value
 
 
 # ------------------------
 # CHAT ENDPOINT
 # ------------------------
-@router.post("/chat", response_model=ChatResponse)
+@router.post("/chat", response_model=ChatResponse, response_model_exclude_unset=True)
 @limiter.limit("10/minute")
-def chat(
+async def chat(
     payload: ChatRequest,
     request: Request,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_db),
 ):
     start = time.time()
+    timer = StageTimer()
 
     user_hash = hash_user(payload.user_id)
     msg = payload.message.strip()
-    q_low = msg.lower()
 
     # 1) Sécurité : anti prompt injection basique
-    if looks_like_prompt_injection(msg):
+    with timer.stage("injection"):
+        suspect = looks_like_prompt_injection(msg)
+    if suspect:
+        timer.observe("rejected", payload.channel)
         raise HTTPException(
             status_code=400,
             detail="Requête rejetée (contenu suspect). Reformule ta question simplement."
         )
 
-    # 2) NLU : intent + entités
-    entities: dict = extract_entities(msg) if msg else {}
+    # modèles actifs pour toute la requête (un rechargement à chaud ne les change pas en cours de route)
+    models = await MODEL_REGISTRY.get()
+
+    # Cache : même message (en minuscules), même canal/langue, mêmes versions de la KB et des modèles
+    with timer.stage("cache"):
+        kb_version = await current_kb_version_async(db)
+        cache_key = answer_cache_key(msg, payload.channel, payload.language, kb_version, models.version)
+        cached = get_cached_answer(cache_key)
+
+    if cached is not None:
+        out, entities = cached
+    else:
+        # 2) NLU : intent + entités (CPU -> pool NLP borné, en parallèle)
+        # message tokenisé une fois, partagé par les modèles intent et catégorie FAQ
+        with timer.stage("tokenize"):
+            encoded = encode_text(msg, models.intent, models.faq)
+        entities, intent_res = await asyncio.gather(
+            timer.timed("ner", run_cpu(extract_entities, msg)) if msg else _const({}),
+            timer.timed("intent", run_cpu(predict_intent, models.intent, encoded)) if models.intent is not None else _const(None),
+        )
+
+        model_intent = None
+        model_conf = 0.0
+        if intent_res is not None:
+            model_intent = intent_res.intent
+            model_conf = intent_res.confidence
+
+        out = await _answer_message(
+            db, msg, model_intent, model_conf, faq_model=models.faq, timer=timer, encoded=encoded
+        )
+        set_cached_answer(cache_key, (out, entities))
+
+    # ------------------------
+    # 4) Log + réponse
+    # ------------------------
+    latency_ms = int((time.time() - start) * 1000)
+
+    # écriture différée (le flusher insère par lots, hors du chemin de latence)
+    with timer.stage("log"):
+        EVENT_WRITER.submit(_chat_event_row(payload, user_hash, msg, entities, out, latency_ms))
+    timer.observe(out.intent, payload.channel)
+
+    total = time.time() - start
+    response.headers["Server-Timing"] = timer.server_timing(total)
+
+    result = ChatResponse(
+        answer=out.answer,
+        intent=out.intent,
+        entities=entities,
+        confidence=out.confidence,
+        sources=out.sources,
+    )
+    if payload.debug:
+        result.debug = _debug_trace(out, cached is not None, timer, total)
+    return result
+
+
+# ------------------------
+# CHAT BATCH (rejeu kiosque, tests de non-régression, tests de charge)
+# ------------------------
+@router.post("/chat/batch", response_model=ChatBatchResponse, response_model_exclude_unset=True)
+@limiter.limit("5/minute")
+async def chat_batch(
+    payload: ChatBatchRequest,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+):
+    start = time.time()
+
+    msgs = [it.message.strip() for it in payload.items]
+    # étapes communes au lot, réparties ensuite à parts égales sur les messages concernés
+    shared = StageTimer()
+
+    with shared.stage("injection"):
+        suspects = [i for i, m in enumerate(msgs) if looks_like_prompt_injection(m)]
+    if suspects:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Requête rejetée (contenu suspect) : messages {suspects}. Reformule ta question simplement."
+        )
+
+    models = await MODEL_REGISTRY.get()
+
+    with shared.stage("cache"):
+        kb_version = await current_kb_version_async(db)
+        keys = [
+            answer_cache_key(m, it.channel, it.language, kb_version, models.version)
+            for m, it in zip(msgs, payload.items)
+        ]
+        cached = [get_cached_answer(k) for k in keys]
+    misses = [i for i, c in enumerate(cached) if c is None]
+    miss_msgs = [msgs[i] for i in misses]
+
+    # NLU vectorisée (messages absents du cache) : nlp.pipe + tokenisation partagée par les deux modèles
+    nlu = StageTimer()
+    with nlu.stage("tokenize"):
+        miss_encoded = [encode_text(m, models.intent, models.faq) for m in miss_msgs]
+    entities_list, intent_results, faq_results = await asyncio.gather(
+        nlu.timed("ner", run_cpu(extract_entities_batch, miss_msgs)) if misses else _const([]),
+        nlu.timed("intent", run_cpu(predict_intent_batch, models.intent, miss_encoded)) if misses and models.intent is not None else _const(None),
+        nlu.timed("faq_category", run_cpu(predict_faq_category_batch, models.faq, miss_encoded)) if misses and models.faq is not None else _const(None),
+    )
+    nlu_ms = (time.time() - start) * 1000 / len(msgs)
+    nlu_pos = {i: j for j, i in enumerate(misses)}
+
+    results: list[ChatResponse] = []
+    for i, (item, msg) in enumerate(zip(payload.items, msgs)):
+        item_start = time.time()
+        timer = StageTimer()
+        for stage, seconds in shared.stages.items():
+            timer.add(stage, seconds / len(msgs))
+        if cached[i] is not None:
+            out, entities = cached[i]
+        else:
+            for stage, seconds in nlu.stages.items():
+                timer.add(stage, seconds / len(misses))
+            j = nlu_pos[i]
+            entities = entities_list[j]
+            intent_res = intent_results[j] if intent_results is not None else None
+            out = await _answer_message(
+                db,
+                msg,
+                intent_res.intent if intent_res is not None else None,
+                intent_res.confidence if intent_res is not None else 0.0,
+                faq_category=faq_results[j] if faq_results is not None else None,
+                faq_model=models.faq,
+                timer=timer,
+            )
+            set_cached_answer(keys[i], (out, entities))
+        latency_ms = int(nlu_ms + (time.time() - item_start) * 1000)
+
+        with timer.stage("log"):
+            EVENT_WRITER.submit(_chat_event_row(item, hash_user(item.user_id), msg, entities, out, latency_ms))
+        timer.observe(out.intent, item.channel)
+        result = ChatResponse(
+            answer=out.answer,
+            intent=out.intent,
+            entities=entities,
+            confidence=out.confidence,
+            sources=out.sources,
+        )
+        if item.debug:
+            result.debug = _debug_trace(out, cached[i] is not None, timer, timer.total())
+        results.append(result)
+
+    return ChatBatchResponse(results=results)
+
+
+def _debug_trace(out: ChatOutcome, cached: bool, timer: StageTimer, total: float) -> dict:
+    """Trace renvoyée avec debug=true (remplace les anciens print DEBUG)."""
+    return {
+        "cached": cached,
+        "model_intent": out.model_intent,
+        "model_conf": out.model_conf,
+        "flags": {
+            "contact": out.is_contact_intent,
+            "timetable": out.is_timetable_intent,
+            "faq": out.is_faq_intent,
+        },
+        "rules": sorted(out.rules),
+        "candidates": out.trace,
+        "timings_ms": {**timer.as_ms(), "total": round(total * 1000, 3)},
+    }
+
+
+def _chat_event_row(
+    payload: ChatRequest,
+    user_hash: str,
+    msg: str,
+    entities: dict,
+    out: ChatOutcome,
+    latency_ms: int,
+) -> dict:
+    return dict(
+        user_hash=user_hash,
+        channel=payload.channel,
+        user_message=msg,
+        detected_language=payload.language,
+        intent=out.intent,
+        entities=entities,
+        response=out.answer,
+        confidence=out.confidence,
+        resolved=(out.intent != "fallback"),
+        latency_ms=latency_ms,
+    )
+
+
+async def _answer_message(
+    db: AsyncSession,
+    msg: str,
+    model_intent: Optional[str],
+    model_conf: float,
+    faq_category: Optional[FAQCategoryResult] = None,
+    faq_model: Optional[dict] = None,
+    timer: Optional[StageTimer] = None,
+    encoded: Optional[TextInput] = None,
+) -> ChatOutcome:
+    """Routage (modèle + règles), recherche et rendu de la réponse pour un message.
+
+    Les recherches et le modèle FAQ sont chronométrés dans `timer` ; le reste
+    (règles, mise en forme) est compté dans l'étape "render".
+    """
+    timer = timer or StageTimer()
+    render_start = time.perf_counter()
+    timed_before = timer.total()
+    trace: dict = {}
+
+    q_low = msg.lower()
     final_intent: str = "fallback"
     final_confidence: float = 0.0
     answer: Optional[str] = None
     sources: list[Source] = []
 
-    model_intent = None
-    model_conf = 0.0
-    if INTENT_MODEL is not None:
-        intent_res = predict_intent(INTENT_MODEL, msg)
-        model_intent = intent_res.intent
-        model_conf = intent_res.confidence
-
     # ------------------------
     # 2) Détection d'intent (mix modèle + règles)
     # ------------------------
 
-    CONTACT_KEYWORDS = [
-        "contacter", "contact", "email", "mail", "téléphone", "telephone",
-        "joindre",
-    ]
-
-    SERVICE_ONLY_KEYWORDS = [
-        "infirmerie",
-    ]
-    if "association étudiante" in q_low or "association etudiante" in q_low or "le service informatique" in q_low or "problème technique" in q_low :
-        CONTACT_KEYWORDS = []
+    # un seul passage de l'automate : toutes les règles déclenchées (voir CHAT_RULE_TABLE)
+    rules = CHAT_RULES.scan(q_low)
 
     # a) Intent CONTACT
     is_contact_intent = (
         (model_intent == "contact" and model_conf >= 0.6)
-        or "comment contacter le service scolarité" in q_low
-        or "comment contacter le service scolarite" in q_low
-        or "quel est l'email du responsable de master ia" in q_low
-        or "quel est l email du responsable de master ia" in q_low
-        or "qui est l'enseignant de machine learning" in q_low
-        or "qui est l enseignant de machine learning" in q_low
-        or "comment joindre l'infirmerie" in q_low
-        or "comment joindre l infirmerie" in q_low
-        or "numéro d'urgence campus" in q_low
-        or "numero d'urgence campus" in q_low
-        or "numero d urgence campus" in q_low
-        or any(kw in q_low for kw in SERVICE_ONLY_KEYWORDS)
-                        ) and not ("cours" in q_low or "emploi du temps" in q_low or "planning" in q_low)
-    if "permanence" in q_low and "responsable de formation" in q_low:
+        or "contact_phrase" in rules
+        or "service_only" in rules
+    ) and "timetable_context" not in rules
+    if "permanence" in rules and "responsable_formation" in rules:
         is_contact_intent = False
 
     # b) Intent TIMETABLE
     is_timetable_intent = (
         (model_intent == "timetable" and model_conf >= 0.3)
-        or "quels sont mes cours lundi" in q_low
-        or "où se trouve le cours de machine learning" in q_low
-        or "ou se trouve le cours de machine learning" in q_low
-        or "qui enseigne la cybersécurité en b3" in q_low
-        or "qui enseigne la cybersecurite en b3" in q_low
-        or "quand sont les examens de s1" in q_low
+        or "timetable_phrase" in rules
     )
-    if "qui enseigne" in q_low and "b3" in q_low or "quand sont les examens de s1" in q_low:
+    if "qui_enseigne" in rules and "b3" in rules or "examens_s1" in rules:
         is_timetable_intent = True
         is_contact_intent = False
 
     # c) Intent FAQ
-    is_generic_q = any(
-        q_low.startswith(p)
-        for p in [
-            "où ", "ou ",
-            "quand ", "comment ",
-            "combien ", "que ",
-            "quel ", "quelle ", "quels ", "quelles ",
-        ]
-    )
-
-    if "?" in msg and not is_generic_q:
-        is_generic_q = True
+    is_generic_q = "generic_prefix" in rules or "question_mark" in rules
 
     is_faq_intent = (
         is_generic_q
@@ -164,14 +375,21 @@ def chat(
     # 2bis) Forçage FAQ si une FAQ claire existe
     forced_faq_result = None
     if is_generic_q and not is_timetable_intent and not is_contact_intent:
-        quick_faq = search_faq(db, msg, limit=1)
+        quick_faq = await timer.timed(
+            "search_faq", retrieve_faq(db, msg, limit=1, trace=trace.setdefault("faq_quick", {}))
+        )
         if quick_faq:
             forced_faq_result = quick_faq[0]
             is_faq_intent = True
+    # routage incertain : FAQ, contacts et procédures en une seule recherche (un _msearch côté ES) ;
+    # une FAQ trouvée répond, sinon les autres candidats sont proposés (3.4)
+    candidates: dict = {}
     if not is_contact_intent and not is_timetable_intent and not is_faq_intent:
-        quick_faq = search_faq(db, msg, limit=1)
-        if quick_faq:
-            forced_faq_result = quick_faq[0]
+        candidates = await timer.timed(
+            "search_kb", retrieve_kb_multi(db, msg, trace=trace.setdefault("kb_multi", {}))
+        )
+        if candidates["faq"]:
+            forced_faq_result = candidates["faq"][0]
             is_faq_intent = True
 
     # ------------------------
@@ -183,7 +401,10 @@ def chat(
         final_intent = "contact"
         final_confidence = max(0.8, model_conf)
 
-        contacts = search_contacts(db, msg, limit=20)
+        contacts = await timer.timed(
+            "search_contacts", retrieve_contacts(db, msg, limit=20, trace=trace.setdefault("contact_search", {}))
+        )
+        trace["contacts"] = len(contacts)
         if not contacts:
             final_intent = "fallback"
             final_confidence = 0.2
@@ -194,7 +415,7 @@ def chat(
             )
         else:
             # "Comment contacter le service scolarité ?"
-            if "scolarité" in q_low or "scolarite" in q_low:
+            if "scolarite" in rules:
                 scol = next(
                     (c for c in contacts if c.sous_categorie and "scolar" in c.sous_categorie.lower()),
                     None,
@@ -215,9 +436,7 @@ def chat(
                     ]
 
             # "Quel est l'email du responsable de Master IA ?"
-            if not answer and "responsable" in q_low and "master" in q_low and (
-                "ia" in q_low or "intelligence artificielle" in q_low
-            ):
+            if not answer and "responsable" in rules and "master" in rules and "ia" in rules:
                 ml_resp = next(
                     (c for c in contacts if c.email),
                     contacts[0]
@@ -234,11 +453,7 @@ def chat(
                 ]
 
             # "Quels sont les horaires de la bibliothèque ?"
-            if not answer and (
-                "horaires" in q_low and (
-                    "biblio" in q_low or "bibliothèque" in q_low or "bibliotheque" in q_low
-                )
-            ):
+            if not answer and "horaires" in rules and "bibliotheque" in rules:
                 bib = next(
                     (
                         c for c in contacts
@@ -259,7 +474,7 @@ def chat(
                     ]
 
             # "Qui est l'enseignant de Machine Learning ?"
-            if not answer and "machine learning" in q_low:
+            if not answer and "machine_learning" in rules:
                 ml_contact = next(
                     (
                         c for c in contacts
@@ -283,7 +498,7 @@ def chat(
                     ]
 
             # "Comment joindre l'infirmerie ?"
-            if not answer and ("infirmerie" in q_low or "santé" in q_low or "sante" in q_low):
+            if not answer and "sante" in rules:
                 inf = next(
                     (
                         c for c in contacts
@@ -308,7 +523,7 @@ def chat(
                     ]
 
             # "Numéro d'urgence campus ?"
-            if not answer and ("urgence" in q_low and "campus" in q_low):
+            if not answer and "urgence" in rules and "campus" in rules:
                 urgence = next(
                     (
                         c for c in contacts
@@ -372,9 +587,13 @@ def chat(
         user_program: str | None = None
         user_group: str | None = None
 
-        slots = search_timetable(db, msg, program=user_program, group_name=user_group, limit=50)
+        slots = await timer.timed(
+            "search_timetable",
+            db.run_sync(search_timetable, msg, program=user_program, group_name=user_group, limit=50),
+        )
+        trace["timetable_slots"] = len(slots)
 
-        if "quels sont mes cours" in q_low:
+        if "mes_cours" in rules:
             if slots:
                 lines = []
                 for s in slots:
@@ -397,7 +616,7 @@ def chat(
                     "Peux-tu préciser ta formation/promo, ton groupe et éventuellement la date exacte ?"
                 )
 
-        elif "où se trouve le cours" in q_low or "ou se trouve le cours" in q_low:
+        elif "cours_lieu" in rules:
             if slots:
                 lignes = []
                 for s in slots:
@@ -422,7 +641,7 @@ def chat(
                     "Peux-tu préciser le nom exact de la matière, ta formation et ton groupe ?"
                 )
 
-        elif "qui enseigne" in q_low and "b3" in q_low:
+        elif "qui_enseigne" in rules and "b3" in rules:
             if slots:
                 enseignants = {s.teacher for s in slots if s.teacher}
                 if len(enseignants) == 1:
@@ -441,15 +660,19 @@ def chat(
                     "Peux-tu préciser le nom exact de la matière (par ex. « Cybersécurité ») et la formation (ex. B3) ?"
                 )
 
-        elif "quand sont les examens de s1" in q_low:
+        elif "examens_s1" in rules:
             exam_start, exam_end = (
-                db.query(
-                    func.min(TimetableSlot.exam_start),
-                    func.max(TimetableSlot.exam_end),
+                await timer.timed(
+                    "search_exam_dates",
+                    db.execute(
+                        select(
+                            func.min(TimetableSlot.exam_start),
+                            func.max(TimetableSlot.exam_end),
+                        )
+                        .where(TimetableSlot.semester == "S1")
+                    ),
                 )
-                .filter(TimetableSlot.semester == "S1")
-                .one()
-            )
+            ).one()
 
             if exam_start and exam_end:
                 answer = (
@@ -503,14 +726,25 @@ def chat(
             f = forced_faq_result
         else:
             category_id = None
-            if FAQ_MODEL is not None:
-                faq_cat_res = predict_faq_category(FAQ_MODEL, msg)
+            if faq_category is not None:
+                category_id = faq_category.category_id
+            elif faq_model is not None:
+                faq_cat_res = await timer.timed(
+                    "faq_category", run_cpu(predict_faq_category, faq_model, encoded if encoded is not None else msg)
+                )
                 category_id = faq_cat_res.category_id
 
+            trace["faq_category"] = category_id
             if category_id:
-                faq_results = search_faq(db, msg, category_id=category_id, limit=3)
+                faq_results = await timer.timed(
+                    "search_faq",
+                    retrieve_faq(db, msg, category_id=category_id, limit=3, trace=trace.setdefault("faq", {})),
+                )
             else:
-                faq_results = search_faq(db, msg, order_by_frequency=True, limit=3)
+                faq_results = await timer.timed(
+                    "search_faq",
+                    retrieve_faq(db, msg, order_by_frequency=True, limit=3, trace=trace.setdefault("faq", {})),
+                )
 
             if not faq_results:
                 final_intent = "fallback"
@@ -534,19 +768,28 @@ def chat(
                 )
             ]
 
+    # 3.4 Routage incertain
     else:
         final_intent = "fallback"
         final_confidence = 0.1
-        answer = (
-            "Je ne suis pas sûr de comprendre si ta question concerne un contact, "
-            "un emploi du temps ou une question générale de la FAQ.\n"
-            "Peux-tu reformuler en précisant ce que tu cherches ?"
-        )
-
-    # ------------------------
-    # 4) Log + réponse
-    # ------------------------
-    latency_ms = int((time.time() - start) * 1000)
+        contacts = candidates.get("contact") or []
+        procedures = candidates.get("procedure") or []
+        if contacts or procedures:
+            sources = [
+                Source(type="contacts", id=c.id, title=c.nom_complet or c.sous_categorie or c.categorie_principale)
+                for c in contacts
+            ] + [Source(type="procedures", id=p.id, title=p.title) for p in procedures]
+            answer = (
+                "Je ne suis pas sûr de comprendre ta question. Voici ce qui pourrait correspondre :\n"
+                + "\n".join(f" - {s.title}" for s in sources)
+                + "\nSinon, peux-tu reformuler en précisant ce que tu cherches ?"
+            )
+        else:
+            answer = (
+                "Je ne suis pas sûr de comprendre si ta question concerne un contact, "
+                "un emploi du temps ou une question générale de la FAQ.\n"
+                "Peux-tu reformuler en précisant ce que tu cherches ?"
+            )
 
     if not answer:
         answer = (
@@ -554,37 +797,18 @@ def chat(
             "Peux-tu préciser ta question ou le service concerné ?"
         )
 
-    event = ChatEvent(
-        user_hash=user_hash,
-        channel=payload.channel,
-        user_message=msg,
-        detected_language=payload.language,
-        intent=final_intent,
-        entities=entities,
-        response=answer,
-        confidence=final_confidence,
-        resolved=(final_intent != "fallback"),
-        latency_ms=latency_ms,
-    )
-    db.add(event)
-    db.commit()
-    db.refresh(event)
-
-    print("DEBUG:", final_intent, final_confidence, answer)
-    print(
-        "DEBUG_FLAGS:",
-        q_low,
-        "model_intent=", model_intent,
-        "conf=", model_conf,
-        "contact=", is_contact_intent,
-        "timetable=", is_timetable_intent,
-        "faq=", is_faq_intent,
-    )
+    timer.add("render", time.perf_counter() - render_start - (timer.total() - timed_before))
 
-    return ChatResponse(
-        answer=answer,
+    return ChatOutcome(
         intent=final_intent,
-        entities=entities,
         confidence=final_confidence,
+        answer=answer,
         sources=sources,
+        model_intent=model_intent,
+        model_conf=model_conf,
+        is_contact_intent=is_contact_intent,
+        is_timetable_intent=is_timetable_intent,
+        is_faq_intent=is_faq_intent,
+        rules=frozenset(rules),
+        trace=trace,
     )
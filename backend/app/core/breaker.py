@@ -0,0 +1,74 @@
+import threading
+import time
+from typing import Optional
+
+from app.core.metrics import CIRCUIT_BREAKER_STATE
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+# jetons rendus par allow() et repassés à record()
+CALL, PROBE = "call", "probe"
+_STATE_VALUES = {CLOSED: 0, OPEN: 1, HALF_OPEN: 2}
+
+
+class CircuitBreaker:
+    """Disjoncteur d'une dépendance réseau (Elasticsearch).
+
+    - fermé : les appels passent ; `failure_threshold` échecs consécutifs l'ouvrent.
+      Un appel réussi mais plus lent que `slow_seconds` compte comme un échec.
+    - ouvert : appels refusés (l'appelant se replie) pendant `reset_seconds`.
+    - semi-ouvert : un seul appel d'essai ; succès -> fermé, échec -> ouvert.
+
+    allow() rend un jeton (None si l'appel est refusé) à repasser à record() : seul le
+    résultat de l'appel d'essai décide en semi-ouvert ; un appel ordinaire lancé avant
+    l'ouverture et terminé après est ignoré.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float, slow_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.slow_seconds = slow_seconds
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        CIRCUIT_BREAKER_STATE.labels(name=name).set(0)
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def _set_state(self, state: str) -> None:
+        self._state = state
+        CIRCUIT_BREAKER_STATE.labels(name=self.name).set(_STATE_VALUES[state])
+
+    def allow(self) -> Optional[str]:
+        with self._lock:
+            if self._state == CLOSED:
+                return CALL
+            if self._state == OPEN:
+                if time.monotonic() - self._opened_at < self.reset_seconds:
+                    return None
+                self._set_state(HALF_OPEN)
+            if self._probe_in_flight:
+                return None
+            self._probe_in_flight = True
+            return PROBE
+
+    def record(self, ticket: str, ok: bool, duration: float = 0.0) -> None:
+        failed = not ok or duration > self.slow_seconds
+        with self._lock:
+            if ticket == PROBE:
+                self._probe_in_flight = False
+            elif self._state != CLOSED:
+                return
+            if not failed:
+                self._failures = 0
+                if self._state != CLOSED:
+                    self._set_state(CLOSED)
+                return
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._set_state(OPEN)
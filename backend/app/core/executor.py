@@ -0,0 +1,28 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from app.core.config import settings
+
+# Les étapes CPU (NER spaCy, modèles TF-IDF/SVM) tournent ici plutôt que dans
+# la boucle asyncio ou dans le threadpool anyio par défaut (40 threads partagés).
+NLP_EXECUTOR = ThreadPoolExecutor(max_workers=settings.NLP_WORKERS, thread_name_prefix="nlp")
+
+# Appels réseau bloquants (client Elasticsearch) : un thread par connexion du pool,
+# séparés des étapes CPU pour qu'un ES lent n'affame pas le NLP.
+IO_EXECUTOR = ThreadPoolExecutor(max_workers=settings.ES_POOL_SIZE, thread_name_prefix="io")
+
+
+async def run_cpu(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(NLP_EXECUTOR, partial(fn, *args, **kwargs))
+
+
+async def run_io(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(IO_EXECUTOR, partial(fn, *args, **kwargs))
+
+
+def shutdown_executor() -> None:
+    NLP_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+    IO_EXECUTOR.shutdown(wait=False, cancel_futures=True)
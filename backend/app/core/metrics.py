@@ -1,4 +1,4 @@
-from prometheus_client import Counter, Histogram
+from prometheus_client import Counter, Gauge, Histogram
 
 REQ_COUNT = Counter(
     "http_requests_total",
@@ -22,3 +22,98 @@ CHAT_RESOLVED = Counter(
     "chat_resolved_total",
     "Number of chat requests that were resolved",
 )
+
+CHAT_CACHE_HITS = Counter(
+    "chat_cache_hits_total",
+    "Number of chat requests answered from the response cache",
+)
+
+CHAT_CACHE_MISSES = Counter(
+    "chat_cache_misses_total",
+    "Number of chat requests not found in the response cache",
+)
+
+CHAT_CACHE_SIZE = Gauge(
+    "chat_cache_entries",
+    "Number of entries in the chat response cache",
+)
+
+CHAT_EVENT_QUEUE_DEPTH = Gauge(
+    "chat_event_queue_depth",
+    "Number of ChatEvents waiting to be written",
+)
+
+CHAT_EVENTS_WRITTEN = Counter(
+    "chat_events_written_total",
+    "Number of ChatEvents written by the background flusher",
+)
+
+CHAT_EVENTS_DROPPED = Counter(
+    "chat_events_dropped_total",
+    "Number of ChatEvents dropped (queue full or write error)",
+    ["reason"],
+)
+
+# Étapes du pipeline /chat (voir app.core.timing)
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+CHAT_STAGE_LATENCY = Histogram(
+    "chat_stage_duration_seconds",
+    "Latency of each /chat pipeline stage (seconds)",
+    ["stage", "intent", "channel"],
+    buckets=STAGE_BUCKETS,
+)
+
+CHAT_EVENT_FLUSH_LATENCY = Histogram(
+    "chat_event_flush_duration_seconds",
+    "Latency of one batched ChatEvent insert (seconds)",
+    buckets=STAGE_BUCKETS,
+)
+
+MODEL_INFO = Gauge(
+    "nlp_model_info",
+    "Active intent/FAQ model version (value is always 1)",
+    ["version"],
+)
+
+MODEL_LOADED_TIMESTAMP = Gauge(
+    "nlp_model_loaded_timestamp_seconds",
+    "Unix time at which the active intent/FAQ models were loaded",
+)
+
+MODEL_LOAD_DURATION = Gauge(
+    "nlp_model_load_duration_seconds",
+    "Time taken to load the active intent/FAQ models (seconds)",
+)
+
+MODEL_RELOADS = Counter(
+    "nlp_model_reloads_total",
+    "Number of intent/FAQ model (re)load attempts",
+    ["result"],
+)
+
+STARTUP_STEP_SECONDS = Gauge(
+    "app_startup_step_seconds",
+    "Duration of each startup step: imports and background warm-up (seconds)",
+    ["step"],
+)
+
+# Recherche base de connaissance : chemin qui a servi la requête (voir app.services.retrieval)
+KB_RETRIEVAL_PATH = Counter(
+    "kb_retrieval_total",
+    "Knowledge-base searches by source and serving path (es, sql, fallback_error, fallback_open, fallback_empty)",
+    ["source", "path"],
+)
+
+ES_REQUEST_LATENCY = Histogram(
+    "es_request_duration_seconds",
+    "Latency of Elasticsearch searches issued by /chat (seconds)",
+    ["source"],
+    buckets=STAGE_BUCKETS,
+)
+
+CIRCUIT_BREAKER_STATE = Gauge(
+    "circuit_breaker_state",
+    "Circuit breaker state (0 = closed, 1 = open, 2 = half-open)",
+    ["name"],
+)
@@ -0,0 +1,66 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from app.core.metrics import STARTUP_STEP_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class StartupReport:
+    """Durée des étapes de démarrage (imports, préchauffage) et état de préparation.
+
+    Exposé par /ready et par la métrique app_startup_step_seconds : une régression
+    du temps de démarrage se voit étape par étape.
+    """
+
+    def __init__(self):
+        self.steps: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self.pending: set = set()
+        self.started_at = time.time()
+        self.ready_at: Optional[float] = None
+
+    @contextmanager
+    def step(self, name: str):
+        self.pending.add(name)
+        t0 = time.perf_counter()
+        try:
+            yield
+        except Exception as exc:
+            self.errors[name] = repr(exc)
+            logger.exception("Étape de démarrage %s en échec", name)
+            raise
+        finally:
+            self.record(name, time.perf_counter() - t0)
+
+    def record(self, name: str, seconds: float) -> None:
+        self.pending.discard(name)
+        self.steps[name] = seconds
+        STARTUP_STEP_SECONDS.labels(step=name).set(seconds)
+        logger.info("startup %-28s %8.1f ms", name, seconds * 1000)
+
+    def expect(self, *names: str) -> None:
+        """Étapes à terminer avant d'être prêt (annoncées avant de lancer le préchauffage)."""
+        self.pending.update(names)
+
+    def mark_ready(self) -> None:
+        if self.ready_at is None and self.is_ready:
+            self.ready_at = time.time()
+
+    @property
+    def is_ready(self) -> bool:
+        return not self.pending and not self.errors
+
+    def as_dict(self) -> dict:
+        return {
+            "ready": self.is_ready,
+            "pending": sorted(self.pending),
+            "errors": self.errors,
+            "steps_ms": {name: round(s * 1000, 1) for name, s in self.steps.items()},
+            "time_to_ready_ms": round((self.ready_at - self.started_at) * 1000, 1) if self.ready_at else None,
+        }
+
+
+STARTUP = StartupReport()
@@ -0,0 +1,58 @@
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Dict, Optional, TypeVar
+
+from app.core.metrics import CHAT_STAGE_LATENCY
+
+T = TypeVar("T")
+
+# Le canal vient du client : on borne la cardinalité du label Prometheus
+KNOWN_CHANNELS = {"web", "kiosk"}
+
+
+class StageTimer:
+    """Durées (secondes) des étapes d'une requête /chat.
+
+    Les durées sont accumulées pendant le traitement puis publiées d'un coup par
+    `observe()`, une fois l'intent final connu (il sert de label).
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t0)
+
+    async def timed(self, name: str, awaitable: Awaitable[T]) -> T:
+        t0 = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self.add(name, time.perf_counter() - t0)
+
+    def total(self) -> float:
+        return sum(self.stages.values())
+
+    def as_ms(self) -> Dict[str, float]:
+        return {stage: round(seconds * 1000, 3) for stage, seconds in self.stages.items()}
+
+    def server_timing(self, total: Optional[float] = None) -> str:
+        """Valeur de l'en-tête Server-Timing (durées en millisecondes)."""
+        parts = [f"{stage};dur={ms}" for stage, ms in self.as_ms().items()]
+        if total is not None:
+            parts.append(f"total;dur={round(total * 1000, 3)}")
+        return ", ".join(parts)
+
+    def observe(self, intent: Optional[str], channel: Optional[str]) -> None:
+        channel = channel if channel in KNOWN_CHANNELS else "other"
+        intent = intent or "none"
+        for stage, seconds in self.stages.items():
+            CHAT_STAGE_LATENCY.labels(stage=stage, intent=intent, channel=channel).observe(seconds)
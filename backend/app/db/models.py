@@ -137,3 +137,9 @@ class Feedback(Base):
     comment = Column(Text, nullable=True)
     corrected_answer = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class KBState(Base):
+    __tablename__ = "kb_state"
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)  # incrémenté à chaque ingestion
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,19 +1,35 @@
-from fastapi import FastAPI, Request, Response
-from fastapi.middleware.cors import CORSMiddleware
+import asyncio
+import time
 
-from slowapi import _rate_limit_exceeded_handler
-from slowapi.errors import RateLimitExceeded
+from app.core.startup import STARTUP
 
-import time
-from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+# Rapport de démarrage : durée des imports par bloc (voir /ready et app_startup_step_seconds)
+with STARTUP.step("import:framework"):
+    from fastapi import FastAPI, Request, Response
+    from fastapi.middleware.cors import CORSMiddleware
+
+    from slowapi import _rate_limit_exceeded_handler
+    from slowapi.errors import RateLimitExceeded
+
+    from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+
+with STARTUP.step("import:db"):
+    from app.db.session import Base, engine, async_engine
+    from app.core.limiter import limiter
+    from app.core.metrics import REQ_COUNT, REQ_LATENCY
+    from app.core.executor import shutdown_executor
+    from app.search.es_client import close_es
 
-from app.db.session import Base, engine
-from app.core.limiter import limiter
-from app.core.metrics import REQ_COUNT, REQ_LATENCY
+# spaCy et les modèles ne sont plus chargés à l'import : voir app.services.warmup
+with STARTUP.step("import:routers"):
+    from app.api.chat import router as chat_router
+    from app.api.analytics import router as analytics_router
+    from app.api.gdpr import router as gdpr_router
 
-from app.api.chat import router as chat_router
-from app.api.analytics import router as analytics_router
-from app.api.gdpr import router as gdpr_router
+with STARTUP.step("import:services"):
+    from app.services.event_log import EVENT_WRITER
+    from app.services.warmup import WARMUP_STEPS, warm_up
+    from app.nlp.registry import MODEL_REGISTRY
 
 
 app = FastAPI(title="Assistant Virtuel Campus", version="1.0.0")
@@ -34,7 +50,30 @@ app.add_middleware(
 @app.on_event("startup")
 def on_startup():
     # Crée toutes les tables SQLAlchemy (y compris celles qu'on a "clean")
-    Base.metadata.create_all(bind=engine)
+    with STARTUP.step("create_all"):
+        Base.metadata.create_all(bind=engine)
+
+
+@app.on_event("startup")
+async def start_background_tasks():
+    await EVENT_WRITER.start()
+    # modèles intent/FAQ, spaCy et index FAQ en mémoire préchauffés en tâche de fond :
+    # le serveur accepte les connexions tout de suite, /ready passe à 200 une fois prêt
+    STARTUP.expect(*WARMUP_STEPS)
+    app.state.warmup_task = asyncio.create_task(warm_up(), name="warmup")
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    warmup_task = getattr(app.state, "warmup_task", None)
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+    # vide la file des ChatEvent avant de fermer le pool de connexions
+    await EVENT_WRITER.stop()
+    await MODEL_REGISTRY.stop()
+    shutdown_executor()
+    close_es()
+    await async_engine.dispose()
 
 
 # Rate limiting
@@ -47,6 +86,15 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/ready")
+def ready(response: Response):
+    """Prêt à servir : modèles, spaCy et index FAQ préchauffés (503 sinon)."""
+    report = STARTUP.as_dict()
+    if not report["ready"]:
+        response.status_code = 503
+    return report
+
+
 # Prometheus middleware
 @app.middleware("http")
 async def prometheus_middleware(request: Request, call_next):
@@ -0,0 +1,140 @@
+"""Index approché (IVF) pour les embeddings de passages (DocChunk).
+
+Les vecteurs normalisés sont répartis en `nlist` listes par k-means sphérique ; à la
+requête, seules les `nprobe` listes dont le centroïde est le plus proche sont scorées.
+Les vecteurs sont rangés liste par liste : une liste est une tranche contiguë du
+fichier projeté en mémoire, scorée par un produit matrice-vecteur sans copie.
+"""
+import math
+from typing import List, Tuple
+
+import numpy as np
+
+from app.nlp.compact import read_arrays, write_arrays
+
+MAGIC = b"IVF1"
+
+
+def default_nlist(n: int) -> int:
+    return max(1, min(4096, int(round(2 * math.sqrt(n)))))
+
+
+def _assign(x: np.ndarray, centroids: np.ndarray, batch: int = 8192) -> np.ndarray:
+    out = np.empty(len(x), dtype=np.int64)
+    for s in range(0, len(x), batch):
+        out[s:s + batch] = np.argmax(x[s:s + batch] @ centroids.T, axis=1)
+    return out
+
+
+def spherical_kmeans(x: np.ndarray, nlist: int, n_iter: int = 20, seed: int = 0) -> np.ndarray:
+    """Centroïdes normalisés (nlist x dim) ; un centroïde vide est réinitialisé sur un point."""
+    rng = np.random.default_rng(seed)
+    centroids = x[rng.choice(len(x), nlist, replace=False)].astype(np.float32)
+    for _ in range(n_iter):
+        assign = _assign(x, centroids)
+        counts = np.bincount(assign, minlength=nlist)
+        order = np.argsort(assign, kind="stable")
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        filled = counts > 0
+        sums = np.add.reduceat(x[order], starts[filled], axis=0)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids[filled] = sums / np.maximum(norms, 1e-12)
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            centroids[empty] = x[rng.choice(len(x), len(empty), replace=False)]
+    return centroids
+
+
+class IVFIndex:
+    def __init__(self, centroids: np.ndarray, offsets: np.ndarray, vectors: np.ndarray,
+                 ids: np.ndarray, scale: float = 1.0, model: str = ""):
+        self.centroids = centroids
+        # liste l : lignes offsets[l]:offsets[l + 1] de vectors / ids
+        self.offsets = offsets
+        self.vectors = vectors
+        self.ids = ids
+        self.scale = scale
+        self.model = model
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, ids, nlist: int | None = None, n_iter: int = 20,
+              train_size: int | None = None, quantize: bool = False, model: str = "",
+              seed: int = 0) -> "IVFIndex":
+        """k-means sur un échantillon (64 points par liste par défaut), puis affectation de tout le corpus."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        ids = np.asarray(ids, dtype=np.int64)
+        nlist = min(nlist or default_nlist(len(vectors)), len(vectors))
+        train_size = min(len(vectors), train_size or 64 * nlist)
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(len(vectors), train_size, replace=False)]
+        centroids = spherical_kmeans(sample, nlist, n_iter=n_iter, seed=seed)
+
+        assign = _assign(vectors, centroids)
+        order = np.argsort(assign, kind="stable")
+        offsets = np.concatenate(([0], np.cumsum(np.bincount(assign, minlength=nlist)))).astype(np.int64)
+        stored, scale = vectors[order], 1.0
+        if quantize:
+            from app.nlp.semantic import quantize_int8
+
+            stored, scale = quantize_int8(stored)
+        return cls(centroids, offsets, stored, ids[order], scale=scale, model=model)
+
+    def search(self, query: np.ndarray, k: int = 10, nprobe: int = 8) -> Tuple[np.ndarray, np.ndarray]:
+        """(ids, scores) des k passages les plus proches parmi les `nprobe` listes visitées."""
+        query = query.astype(np.float32)
+        nprobe = min(nprobe, self.nlist)
+        lists = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        ranges = [(self.offsets[l], self.offsets[l + 1]) for l in lists]
+        ranges = [(s, e) for s, e in ranges if e > s]
+        if not ranges:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        rows = np.concatenate([np.arange(s, e) for s, e in ranges])
+        scores = np.concatenate([self.vectors[s:e] @ query for s, e in ranges]) * np.float32(self.scale)
+        return _top_k(self.ids[rows], scores, k)
+
+    def save(self, path: str) -> dict:
+        header = {
+            "format": 1,
+            "model": self.model,
+            "n": len(self),
+            "nlist": self.nlist,
+            "dim": int(self.centroids.shape[1]),
+            "dtype": self.vectors.dtype.name,
+            "scale": self.scale,
+        }
+        arrays = {"centroids": self.centroids, "offsets": self.offsets, "vectors": self.vectors, "ids": self.ids}
+        write_arrays(path, MAGIC, header, arrays)
+        return header
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        header, arrays = read_arrays(path, MAGIC)
+        return cls(arrays["centroids"], arrays["offsets"], arrays["vectors"], arrays["ids"],
+                   scale=header["scale"], model=header["model"])
+
+
+def _top_k(ids: np.ndarray, scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    k = min(k, len(scores))
+    if k <= 0:
+        return ids[:0], scores[:0]
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top], kind="stable")]
+    return ids[top], scores[top]
+
+
+def exact_search(vectors: np.ndarray, ids: np.ndarray, query: np.ndarray, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+    """Référence force brute (benchmarks de rappel)."""
+    return _top_k(ids, vectors @ query.astype(np.float32), k)
+
+
+def recall_at_k(found: List[np.ndarray], expected: List[np.ndarray]) -> float:
+    hits = sum(len(np.intersect1d(f, e)) for f, e in zip(found, expected))
+    total = sum(len(e) for e in expected)
+    return hits / total if total else 1.0
@@ -0,0 +1,190 @@
+"""Format compact des modèles linéaires, projeté en mémoire (mmap) en lecture seule.
+
+Un fichier = un en-tête JSON + des tableaux bruts alignés :
+- `terms` : vocabulaire trié (octets UTF-8, largeur fixe), recherché par dichotomie ;
+- `idf` : poids IDF en float32 ;
+- `<tête>.coef` / `<tête>.intercept` : coefficients float32 (n_termes x k) de chaque tête.
+
+Les N workers uvicorn partagent les mêmes pages (cache du système de fichiers) au lieu
+de désérialiser chacun les objets sklearn dans leur tas.
+"""
+import json
+import os
+import struct
+import tempfile
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from app.nlp.linear import LinearHead, LinearTextModel, TfidfFeatures
+
+MAGIC = b"NLM1"
+_ALIGN = 64
+
+
+def _aligned(n: int) -> int:
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+class CompactTfidfFeatures(TfidfFeatures):
+    """TfidfFeatures dont le vocabulaire est un tableau trié (mmap) plutôt qu'un dict."""
+
+    def __init__(self, terms: np.ndarray, idf: np.ndarray | None, **analyzer):
+        super().__init__(vocabulary={}, idf=idf, **analyzer)
+        self.terms = terms
+
+    @property
+    def n_features(self) -> int:
+        return len(self.terms)
+
+    def _counts(self, grams: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        terms = self.terms
+        width = terms.dtype.itemsize
+        # un n-gramme plus long que le plus long terme ne peut pas être dans le vocabulaire
+        # (et serait tronqué par la conversion en largeur fixe)
+        encoded = [b for b in (g.encode("utf-8") for g in grams) if len(b) <= width]
+        if not encoded or not len(terms):
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+        query = np.array(encoded, dtype=terms.dtype)
+        pos = np.searchsorted(terms, query)
+        pos[pos == len(terms)] = 0
+        idx, counts = np.unique(pos[terms[pos] == query], return_counts=True)
+        return idx, counts.astype(np.float64)
+
+
+def write_arrays(path: str, magic: bytes, header: dict, arrays: Dict[str, np.ndarray]) -> None:
+    """Écrit `magic` + en-tête JSON + tableaux alignés (remplacement atomique).
+
+    L'emplacement de chaque tableau est ajouté à l'en-tête (clé "arrays").
+    """
+    specs, offset = {}, 0
+    for name, arr in arrays.items():
+        specs[name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset}
+        offset = _aligned(offset + arr.nbytes)
+    header["arrays"] = specs
+
+    raw_header = json.dumps(header).encode("utf-8")
+    data_start = _aligned(len(magic) + 4 + len(raw_header))
+
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(magic)
+            f.write(struct.pack("<I", len(raw_header)))
+            f.write(raw_header)
+            for name, arr in arrays.items():
+                f.seek(data_start + specs[name]["offset"])
+                f.write(np.ascontiguousarray(arr).tobytes())
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def read_arrays(path: str, magic: bytes) -> Tuple[dict, Dict[str, np.ndarray]]:
+    """En-tête + tableaux projetés en mémoire (vues en lecture seule sur le fichier)."""
+    with open(path, "rb") as f:
+        if f.read(len(magic)) != magic:
+            raise ValueError(f"{path} : format de fichier inconnu (attendu {magic!r})")
+        (header_len,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(header_len))
+    data_start = _aligned(len(magic) + 4 + header_len)
+
+    buf = np.memmap(path, dtype=np.uint8, mode="r")
+    arrays = {
+        name: np.ndarray(tuple(spec["shape"]), dtype=np.dtype(spec["dtype"]), buffer=buf,
+                         offset=data_start + spec["offset"])
+        for name, spec in header["arrays"].items()
+    }
+    return header, arrays
+
+
+def save_compact(
+    path: str,
+    features: TfidfFeatures,
+    heads: Dict[str, LinearHead],
+    prune_below: float = 0.0,
+) -> dict:
+    """Écrit le fichier (remplacement atomique) et renvoie son en-tête.
+
+    `prune_below` > 0 retire les termes dont tous les coefficients (toutes têtes) sont
+    plus petits en valeur absolue. Ils ne comptent alors plus dans la norme du vecteur,
+    ce qui décale tous les scores : à valider avec `compact_parity`.
+    """
+    vocab = features.vocabulary
+    terms = np.array([t.encode("utf-8") for t in vocab], dtype=np.bytes_)
+    cols = np.fromiter(vocab.values(), dtype=np.int64, count=len(vocab))
+    order = np.argsort(terms, kind="stable")
+    terms, cols = terms[order], cols[order]
+
+    if prune_below > 0 and heads:
+        weight = np.max([np.abs(h.coef_t[cols]).max(axis=1) for h in heads.values()], axis=0)
+        keep = weight >= prune_below
+        terms, cols = terms[keep], cols[keep]
+
+    arrays = {"terms": terms}
+    if features.idf is not None:
+        arrays["idf"] = features.idf[cols].astype(np.float32)
+    for name, head in heads.items():
+        arrays[f"{name}.coef"] = np.ascontiguousarray(head.coef_t[cols], dtype=np.float32)
+        arrays[f"{name}.intercept"] = head.intercept.astype(np.float32)
+
+    header = {
+        "format": 1,
+        "analyzer": {
+            "token_pattern": features.token_pattern,
+            "ngram_range": list(features.ngram_range),
+            "lowercase": features.lowercase,
+            "binary": features.binary,
+            "sublinear_tf": features.sublinear_tf,
+            "norm": features.norm,
+        },
+        "heads": {name: {"labels": [str(l) for l in head.labels]} for name, head in heads.items()},
+        "n_terms": int(len(terms)),
+        "pruned_terms": int(len(vocab) - len(terms)),
+    }
+    write_arrays(path, MAGIC, header, arrays)
+    return header
+
+
+def load_compact(path: str) -> Tuple[CompactTfidfFeatures, Dict[str, LinearHead], dict]:
+    """Projette le fichier en mémoire ; les tableaux sont des vues en lecture seule."""
+    header, arrays = read_arrays(path, MAGIC)
+
+    analyzer = dict(header["analyzer"], ngram_range=tuple(header["analyzer"]["ngram_range"]))
+    features = CompactTfidfFeatures(arrays["terms"], arrays.get("idf"), **analyzer)
+    heads = {
+        name: LinearHead(
+            coef_t=arrays[f"{name}.coef"],
+            intercept=arrays[f"{name}.intercept"],
+            labels=spec["labels"],
+        )
+        for name, spec in header["heads"].items()
+    }
+    return features, heads, header
+
+
+def compact_parity(
+    path: str,
+    reference: Dict[str, LinearTextModel],
+    texts: List[str],
+    atol: float = 1e-4,
+) -> Dict[str, List[str]]:
+    """Textes dont le label ou les scores (à `atol` près, float32) diffèrent entre le
+    fichier compact et les modèles de référence.
+
+    Les scores comptent autant que le label : /chat applique des seuils sur la
+    pseudo-confiance de l'intent.
+    """
+    features, heads, _ = load_compact(path)
+    bad = {}
+    for name, ref in reference.items():
+        compact = LinearTextModel(features, heads[name])
+        bad[name] = []
+        for text in texts:
+            got, expected = compact.scores(text), ref.scores(text)
+            if int(np.argmax(got)) != int(np.argmax(expected)) or not np.allclose(got, expected, rtol=0, atol=atol):
+                bad[name].append(text)
+    return bad
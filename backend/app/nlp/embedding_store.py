@@ -0,0 +1,99 @@
+"""Embeddings persistés par empreinte du texte (sha1), pour ne ré-encoder que le nouveau.
+
+Fichier au format de app.nlp.compact (en-tête JSON + tableaux alignés, projeté en
+mémoire) : `hashes` (empreintes hexadécimales, triées) et `vectors` (float32, une
+ligne par empreinte). Les vecteurs restent en float32 : la quantification éventuelle
+est faite à la construction de l'index.
+"""
+import hashlib
+import os
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from app.nlp.compact import read_arrays, write_arrays
+
+MAGIC = b"EMB1"
+
+Encoder = Callable[[List[str]], np.ndarray]
+
+
+def content_hash(text: str) -> bytes:
+    return hashlib.sha1(text.strip().encode("utf-8")).hexdigest().encode("ascii")
+
+
+class EmbeddingStore:
+    def __init__(self, hashes: np.ndarray, vectors: np.ndarray, model: str):
+        self.hashes = hashes
+        self.vectors = vectors
+        self.model = model
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    @classmethod
+    def empty(cls, model: str) -> "EmbeddingStore":
+        return cls(np.zeros(0, dtype="S40"), np.zeros((0, 0), dtype=np.float32), model)
+
+    @classmethod
+    def open(cls, path: str, model: str) -> "EmbeddingStore":
+        """Store existant (lecture seule, mmap) ; vide s'il manque ou vient d'un autre modèle."""
+        if not os.path.exists(path):
+            return cls.empty(model)
+        header, arrays = read_arrays(path, MAGIC)
+        if header["model"] != model:
+            return cls.empty(model)
+        return cls(arrays["hashes"], arrays["vectors"], model)
+
+    def rows(self, hashes: List[bytes]) -> np.ndarray:
+        """Ligne de chaque empreinte dans `vectors`, -1 si absente (dichotomie sur le tri)."""
+        if not len(self.hashes) or not hashes:
+            return np.full(len(hashes), -1, dtype=np.int64)
+        query = np.array(hashes, dtype=self.hashes.dtype)
+        pos = np.searchsorted(self.hashes, query)
+        pos[pos == len(self.hashes)] = 0
+        return np.where(self.hashes[pos] == query, pos, -1)
+
+    def save(self, path: str) -> dict:
+        header = {"format": 1, "model": self.model, "n": len(self), "dim": int(self.vectors.shape[1])}
+        write_arrays(path, MAGIC, header, {"hashes": self.hashes, "vectors": self.vectors})
+        return header
+
+
+def sync_embeddings(path: str, texts: List[str], model: str, encode: Encoder) -> Tuple[np.ndarray, Dict[str, int]]:
+    """Embeddings des `texts` (dans l'ordre), en n'encodant que les textes inconnus du store.
+
+    Le store est réécrit avec les seuls textes courants : les entrées des documents
+    supprimés ou modifiés disparaissent (compaction), le fichier reste à la taille du corpus.
+    """
+    store = EmbeddingStore.open(path, model)
+    hashes = [content_hash(t) for t in texts]
+    rows = store.rows(hashes)
+
+    # un texte répété (deux FAQ identiques) n'est encodé qu'une fois
+    todo: Dict[bytes, int] = {}
+    for i, (h, row) in enumerate(zip(hashes, rows)):
+        if row < 0 and h not in todo:
+            todo[h] = i
+    fresh = encode([texts[i] for i in todo.values()]) if todo else None
+
+    unique = sorted(set(hashes))
+    dim = fresh.shape[1] if fresh is not None else store.vectors.shape[1]
+    vectors = np.zeros((len(unique), dim), dtype=np.float32)
+    new_rows = {h: r for r, h in enumerate(unique)}
+    fresh_rows = {h: j for j, h in enumerate(todo)}
+    for h, row in zip(hashes, rows):
+        r = new_rows[h]
+        vectors[r] = store.vectors[row] if row >= 0 else fresh[fresh_rows[h]]
+
+    stats = {
+        "embedded": len(todo),
+        "reused": len(unique) - len(todo),
+        "dropped": len(store) - (len(unique) - len(todo)),
+    }
+    if not unique:
+        if os.path.exists(path):
+            os.unlink(path)
+    elif stats["embedded"] or stats["dropped"]:
+        EmbeddingStore(np.array(unique, dtype="S40"), vectors, model).save(path)
+    return vectors[[new_rows[h] for h in hashes]], stats
@@ -1,10 +1,122 @@
+import logging
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 import joblib
 import numpy as np
 
-INTENT_MODEL_PATH = Path("/app/app/nlp/models/intent.joblib")
-FAQ_MODEL_PATH = Path("/app/app/nlp/models/faq.joblib")
+from app.core.config import settings
+from app.nlp.compact import load_compact
+from app.nlp.linear import EncodedText, LinearTextModel, TextInput, TfidfFeatures
+
+logger = logging.getLogger(__name__)
+
+MODELS_DIR = Path(settings.MODELS_DIR)
+# Artefact joint : un seul vectorizer + têtes "intent" et "faq" (voir scripts/train)
+NLU_MODEL_NAME = "nlu"
+# Par ordre de priorité : format compact (mmap, voir app.nlp.compact) puis joblib
+MODEL_EXTENSIONS = (".mmap", ".joblib")
+MODEL_FILES = tuple(
+    f"{name}{ext}" for name in (NLU_MODEL_NAME, "intent", "faq") for ext in MODEL_EXTENSIONS
+)
+
+def _compile(model: dict, features: TfidfFeatures | None = None) -> dict:
+    """Ajoute le scoreur NumPy compilé (clé "linear") ; sinon on garde le chemin sklearn."""
+    try:
+        model["linear"] = LinearTextModel.from_sklearn(model, features=features)
+    except (ValueError, AttributeError, KeyError) as exc:
+        logger.warning("Scoreur compilé indisponible, inférence via sklearn : %s", exc)
+    return model
+
+@lru_cache(maxsize=1)
+def _load_joint(path: Path, mtime: float) -> dict:
+    joint = joblib.load(path)
+    try:
+        joint["features"] = TfidfFeatures.from_sklearn(joint["vectorizer"])
+    except ValueError as exc:
+        logger.warning("Features partagées non compilées : %s", exc)
+        joint["features"] = None
+    return joint
+
+@lru_cache(maxsize=1)
+def _load_compact(path: Path, mtime: float):
+    return load_compact(str(path))
+
+def _mtime(path: Path) -> float | None:
+    try:
+        return path.stat().st_mtime
+    except FileNotFoundError:
+        return None
+
+def _load_artifact(name: str, head: str, models_dir: Path):
+    """Tête `head` de l'artefact `name` (joint ou séparé), None s'il est absent ou sans cette tête.
+
+    Le fichier compact .mmap (pas de désérialisation, pages partagées entre workers) est
+    préféré au .joblib, sauf s'il est plus ancien : un .joblib ré-entraîné sans export
+    compact n'est pas masqué par un .mmap périmé.
+    """
+    compact_path = models_dir / f"{name}.mmap"
+    path = models_dir / f"{name}.joblib"
+    compact_mtime, mtime = _mtime(compact_path), _mtime(path)
+    if compact_mtime is not None and (mtime is None or compact_mtime >= mtime):
+        features, heads, _ = _load_compact(compact_path, compact_mtime)
+        if head in heads:
+            # pas d'objets sklearn : l'inférence passe uniquement par le scoreur compilé
+            return {"labels": heads[head].labels, "linear": LinearTextModel(features, heads[head])}
+
+    if mtime is None:
+        return None
+    if name == NLU_MODEL_NAME:
+        joint = _load_joint(path, mtime)
+        if head in joint["heads"]:
+            model = {"vectorizer": joint["vectorizer"], **joint["heads"][head]}
+            return _compile(model, features=joint["features"])
+        return None
+    return _compile(joblib.load(path))
+
+def _artifact_mtime(name: str, models_dir: Path) -> float:
+    mtimes = [_mtime(models_dir / f"{name}{ext}") for ext in MODEL_EXTENSIONS]
+    return max((m for m in mtimes if m is not None), default=-1.0)
+
+def _load_head(head: str, models_dir: Path | None = None):
+    """Tête `head` de l'artefact le plus récent : joint (nlu) ou modèle séparé historique.
+
+    Un ré-entraînement séparé après un entraînement --joint est donc bien pris en compte ;
+    à date égale, l'artefact joint reste prioritaire.
+    """
+    models_dir = models_dir or MODELS_DIR
+    names = sorted((NLU_MODEL_NAME, head), key=lambda name: -_artifact_mtime(name, models_dir))
+    for name in names:
+        model = _load_artifact(name, head, models_dir)
+        if model is not None:
+            return model
+    return None
+
+def encode_text(text: str, *models) -> TextInput:
+    """Tokenise le message une fois pour tous les modèles (intent, FAQ).
+
+    Avec l'artefact joint, les deux têtes partagent aussi le même vecteur TF-IDF ;
+    avec deux modèles séparés, seuls les n-grammes sont partagés.
+    """
+    for model in models:
+        if model is not None and model.get("linear") is not None:
+            return model["linear"].features.encode(text)
+    return text
+
+def _scores(model: dict, text: TextInput) -> np.ndarray:
+    linear = model.get("linear")
+    if linear is not None:
+        return linear.scores(text)
+
+    if isinstance(text, EncodedText):
+        text = text.text
+    X = model["vectorizer"].transform([text])
+    pred = model["clf"].decision_function(X)
+
+    # LinearSVC => decision scores (pas proba). On transforme en pseudo-confiance.
+    if pred.ndim == 1:
+        return pred
+    return pred[0]
 
 # ------------ Intent global ------------
 @dataclass
@@ -12,25 +124,13 @@ class IntentResult:
     intent: str
     confidence: float
 
-def load_intent_model():
-    if not INTENT_MODEL_PATH.exists():
-        return None
-    return joblib.load(INTENT_MODEL_PATH)
+def load_intent_model(models_dir: Path | None = None):
+    return _load_head("intent", models_dir)
 
-def predict_intent(model, text: str) -> IntentResult:
-    # model = {"vectorizer": ..., "clf": ..., "labels": [...]}
-    vect = model["vectorizer"]
-    clf = model["clf"]
+def predict_intent(model, text: TextInput) -> IntentResult:
+    # model = {"vectorizer": ..., "clf": ..., "labels": [...], "linear": LinearTextModel}
     labels = model["labels"]
-
-    X = vect.transform([text])
-    pred = clf.decision_function(X)
-
-    # LinearSVC => decision scores (pas proba). On transforme en pseudo-confiance.
-    if pred.ndim == 1:
-        scores = pred
-    else:
-        scores = pred[0]
+    scores = _scores(model, text)
 
     best = int(np.argmax(scores))
     # pseudo confidence : sigmoid sur marge
@@ -38,6 +138,32 @@ def predict_intent(model, text: str) -> IntentResult:
     conf = 1 / (1 + np.exp(-margin))
     return IntentResult(intent=labels[best], confidence=float(conf))
 
+def _batch_scores(model, texts: list[TextInput]) -> np.ndarray:
+    """Scores de tous les messages -> (n, k)."""
+    linear = model.get("linear")
+    if linear is not None:
+        return np.vstack([linear.scores(t) for t in texts])
+
+    # un seul transform + decision_function
+    texts = [t.text if isinstance(t, EncodedText) else t for t in texts]
+    X = model["vectorizer"].transform(texts)
+    pred = model["clf"].decision_function(X)
+    # binaire : (n,) -> (n, 1), comme le cas unitaire qui prend pred tel quel
+    return pred.reshape(len(texts), -1)
+
+def _best_with_conf(scores: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    best = np.argmax(scores, axis=1)
+    margin = scores[np.arange(len(scores)), best]
+    conf = 1 / (1 + np.exp(-margin))
+    return best, conf
+
+def predict_intent_batch(model, texts: list[TextInput]) -> list[IntentResult]:
+    if not texts:
+        return []
+    labels = model["labels"]
+    best, conf = _best_with_conf(_batch_scores(model, texts))
+    return [IntentResult(intent=labels[int(b)], confidence=float(c)) for b, c in zip(best, conf)]
+
 # ------------ Catégorie FAQ ------------
 
 @dataclass
@@ -45,25 +171,21 @@ class FAQCategoryResult:
     category_id: str
     confidence: float
 
-def load_faq_model():
-    if not FAQ_MODEL_PATH.exists():
-        return None
-    return joblib.load(FAQ_MODEL_PATH)
+def load_faq_model(models_dir: Path | None = None):
+    return _load_head("faq", models_dir)
 
-def predict_faq_category(model, text: str) -> FAQCategoryResult:
-    vect = model["vectorizer"]
-    clf = model["clf"]
+def predict_faq_category(model, text: TextInput) -> FAQCategoryResult:
     labels = model["labels"]
-
-    X = vect.transform([text])
-    pred = clf.decision_function(X)
-
-    if pred.ndim == 1:
-        scores = pred
-    else:
-        scores = pred[0]
+    scores = _scores(model, text)
 
     best = int(np.argmax(scores))
     margin = float(scores[best])
     conf = 1 / (1 + np.exp(-margin))
-    return FAQCategoryResult(category_id=labels[best], confidence=float(conf))
\ No newline at end of file
+    return FAQCategoryResult(category_id=labels[best], confidence=float(conf))
+
+def predict_faq_category_batch(model, texts: list[TextInput]) -> list[FAQCategoryResult]:
+    if not texts:
+        return []
+    labels = model["labels"]
+    best, conf = _best_with_conf(_batch_scores(model, texts))
+    return [FAQCategoryResult(category_id=labels[int(b)], confidence=float(c)) for b, c in zip(best, conf)]
@@ -0,0 +1,211 @@
+"""Inférence compilée pour les modèles TF-IDF + LinearSVC (joblib).
+
+Le vocabulaire, les poids IDF et les coefficients sont extraits une fois dans des
+tableaux NumPy : un message est scoré avec une tokenisation et un produit creux,
+sans la validation ni la construction de matrices scipy de sklearn.
+"""
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Tuple, Union
+
+import numpy as np
+
+
+@dataclass
+class EncodedText:
+    """Message tokenisé une seule fois, réutilisable par plusieurs modèles (intent, FAQ).
+
+    `vectors` mémorise le vecteur TF-IDF déjà calculé pour chaque couche de features :
+    deux têtes qui partagent le même vectorizer ne le recalculent pas.
+    """
+
+    text: str
+    analyzer: tuple
+    grams: List[str]
+    vectors: Dict["TfidfFeatures", Tuple[np.ndarray, np.ndarray]] = field(default_factory=dict)
+
+
+TextInput = Union[str, EncodedText]
+
+
+class TfidfFeatures:
+    """Équivalent de TfidfVectorizer.transform pour un seul texte (analyzer="word")."""
+
+    def __init__(
+        self,
+        vocabulary: Dict[str, int],
+        idf: np.ndarray | None,
+        token_pattern: str = r"(?u)\b\w\w+\b",
+        ngram_range: Tuple[int, int] = (1, 1),
+        lowercase: bool = True,
+        binary: bool = False,
+        sublinear_tf: bool = False,
+        norm: str | None = "l2",
+    ):
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.token_pattern = token_pattern
+        self._token_re = re.compile(token_pattern)
+        self.ngram_range = tuple(ngram_range)
+        self.lowercase = lowercase
+        self.binary = binary
+        self.sublinear_tf = sublinear_tf
+        self.norm = norm
+
+    @property
+    def n_features(self) -> int:
+        return len(self.vocabulary)
+
+    @property
+    def analyzer_key(self) -> tuple:
+        """Deux couches avec la même clé produisent les mêmes n-grammes pour un texte."""
+        return (self.token_pattern, self.ngram_range, self.lowercase)
+
+    @classmethod
+    def from_sklearn(cls, vectorizer) -> "TfidfFeatures":
+        """Lève ValueError si la configuration du vectorizer n'est pas reproduite ici."""
+        params = vectorizer.get_params()
+        unsupported = {
+            "analyzer": "word",
+            "preprocessor": None,
+            "tokenizer": None,
+            "stop_words": None,
+            "strip_accents": None,
+            "input": "content",
+        }
+        for name, expected in unsupported.items():
+            if params.get(name) != expected:
+                raise ValueError(f"{name}={params.get(name)!r} non supporté par le scoreur compilé")
+        if params.get("norm") not in ("l1", "l2", None):
+            raise ValueError(f"norm={params.get('norm')!r} non supporté par le scoreur compilé")
+
+        idf = np.asarray(vectorizer.idf_, dtype=np.float64) if params.get("use_idf", True) else None
+        return cls(
+            vocabulary={str(t): int(i) for t, i in vectorizer.vocabulary_.items()},
+            idf=idf,
+            token_pattern=params["token_pattern"],
+            ngram_range=params["ngram_range"],
+            lowercase=params["lowercase"],
+            binary=params["binary"],
+            sublinear_tf=params["sublinear_tf"],
+            norm=params["norm"],
+        )
+
+    def analyze(self, text: str) -> List[str]:
+        """Même découpage que build_analyzer() de sklearn (unigrammes puis n-grammes)."""
+        if self.lowercase:
+            text = text.lower()
+        tokens = self._token_re.findall(text)
+        min_n, max_n = self.ngram_range
+        if max_n == 1:
+            return tokens
+        grams = list(tokens) if min_n == 1 else []
+        for n in range(max(min_n, 2), max_n + 1):
+            for i in range(len(tokens) - n + 1):
+                grams.append(" ".join(tokens[i:i + n]))
+        return grams
+
+    def encode(self, text: str) -> EncodedText:
+        return EncodedText(text=text, analyzer=self.analyzer_key, grams=self.analyze(text))
+
+    def transform(self, text: TextInput) -> Tuple[np.ndarray, np.ndarray]:
+        """Vecteur TF-IDF creux : (indices des colonnes, valeurs)."""
+        if not isinstance(text, EncodedText):
+            return self._vectorize(self.analyze(text))
+
+        vec = text.vectors.get(self)
+        if vec is None:
+            grams = text.grams if text.analyzer == self.analyzer_key else self.analyze(text.text)
+            vec = text.vectors[self] = self._vectorize(grams)
+        return vec
+
+    def _counts(self, grams: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Colonnes des n-grammes présents dans le vocabulaire et leur nombre d'occurrences."""
+        vocab = self.vocabulary
+        counts = Counter(j for j in map(vocab.get, grams) if j is not None)
+        idx = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        vals = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        return idx, vals
+
+    def _vectorize(self, grams: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        idx, vals = self._counts(grams)
+        if not len(idx):
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+
+        if self.binary:
+            vals[:] = 1.0
+        elif self.sublinear_tf:
+            vals = np.log(vals) + 1.0
+        if self.idf is not None:
+            vals = vals * self.idf[idx]
+
+        if self.norm == "l2":
+            n = np.sqrt(np.dot(vals, vals))
+        elif self.norm == "l1":
+            n = np.abs(vals).sum()
+        else:
+            n = 0.0
+        if n > 0:
+            vals = vals / n
+        return idx, vals
+
+
+@dataclass
+class LinearHead:
+    """Tête linéaire : scores = x · coef_t + intercept (coef_t : n_features x k)."""
+
+    coef_t: np.ndarray
+    intercept: np.ndarray
+    labels: List[str]
+
+    @classmethod
+    def from_sklearn(cls, clf, labels: Iterable[str]) -> "LinearHead":
+        labels = list(labels)
+        if [str(c) for c in clf.classes_] != [str(l) for l in labels]:
+            raise ValueError("labels différents de clf.classes_")
+        coef = np.asarray(clf.coef_, dtype=np.float64)
+        # LinearSVC binaire : coef_ (1, n) -> une seule colonne de score, comme decision_function
+        return cls(
+            coef_t=np.ascontiguousarray(coef.T),
+            intercept=np.asarray(clf.intercept_, dtype=np.float64).ravel(),
+            labels=labels,
+        )
+
+    def scores(self, idx: np.ndarray, vals: np.ndarray) -> np.ndarray:
+        if len(idx) == 0:
+            return self.intercept.copy()
+        return vals @ self.coef_t[idx] + self.intercept
+
+
+@dataclass
+class LinearTextModel:
+    features: TfidfFeatures
+    head: LinearHead
+
+    @classmethod
+    def from_sklearn(cls, model: dict, features: TfidfFeatures | None = None) -> "LinearTextModel":
+        """model = {"vectorizer": ..., "clf": ..., "labels": [...]} (format des joblib).
+
+        `features` permet de partager une couche déjà compilée entre plusieurs têtes.
+        """
+        return cls(
+            features=features or TfidfFeatures.from_sklearn(model["vectorizer"]),
+            head=LinearHead.from_sklearn(model["clf"], model["labels"]),
+        )
+
+    def scores(self, text: TextInput) -> np.ndarray:
+        return self.head.scores(*self.features.transform(text))
+
+
+def check_parity(model: dict, linear: LinearTextModel, texts: List[str], atol: float = 1e-9) -> List[str]:
+    """Compare le scoreur compilé à sklearn ; renvoie les textes en désaccord (label ou score)."""
+    if not texts:
+        return []
+    ref = model["clf"].decision_function(model["vectorizer"].transform(texts)).reshape(len(texts), -1)
+    bad = []
+    for text, expected in zip(texts, ref):
+        got = linear.scores(text)
+        if int(np.argmax(got)) != int(np.argmax(expected)) or not np.allclose(got, expected, rtol=0, atol=atol):
+            bad.append(text)
+    return bad
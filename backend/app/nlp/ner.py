@@ -1,17 +1,70 @@
-import spacy
+import threading
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.services.signals import _normalize
 
 _nlp = None
+_nlp_lock = threading.Lock()
+
+# Entités déjà extraites, clé = texte normalisé (les mêmes questions reviennent souvent)
+_ENTITY_CACHE = TTLCache(maxsize=settings.NER_CACHE_SIZE)
 
 def get_nlp():
     global _nlp
     if _nlp is None:
-        _nlp = spacy.load("fr_core_news_sm")
+        with _nlp_lock:
+            if _nlp is None:
+                # import différé : spaCy coûte ~0,8 s à l'import, payé par le préchauffage
+                import spacy
+
+                # seul doc.ents est utilisé : on ne charge pas tagger / parser / lemmatizer
+                nlp = spacy.load(settings.NER_MODEL, exclude=settings.NER_EXCLUDE)
+                # le tok2vec partagé ne sert plus si plus aucun composant ne l'écoute
+                # (le NER de fr_core_news_sm a son propre encodeur)
+                if "tok2vec" in nlp.pipe_names and not nlp.get_pipe("tok2vec").listening_components:
+                    nlp.remove_pipe("tok2vec")
+                _nlp = nlp
     return _nlp
 
 def extract_entities(text: str) -> dict:
+    key = _normalize(text)
+    cached = _ENTITY_CACHE.get(key)
+    if cached is not None:
+        return cached
+
     nlp = get_nlp()
     doc = nlp(text)
+    entities = _entities_from_doc(doc, text)
+    _ENTITY_CACHE.set(key, entities)
+    return entities
+
+def extract_entities_batch(texts: list[str], batch_size: int = 64) -> list[dict]:
+    """Version batch (nlp.pipe) : un seul passage du pipeline pour les textes absents du cache."""
+    out: list[dict] = [{} for _ in texts]
+    todo: dict[str, list[int]] = {}
+    for i, t in enumerate(texts):
+        if not t:
+            continue
+        key = _normalize(t)
+        cached = _ENTITY_CACHE.get(key)
+        if cached is not None:
+            out[i] = cached
+        else:
+            todo.setdefault(key, []).append(i)
+
+    if todo:
+        nlp = get_nlp()
+        firsts = [idx[0] for idx in todo.values()]
+        docs = nlp.pipe((texts[i] for i in firsts), batch_size=batch_size)
+        for (key, idx), doc in zip(todo.items(), docs):
+            entities = _entities_from_doc(doc, texts[idx[0]])
+            _ENTITY_CACHE.set(key, entities)
+            for i in idx:
+                out[i] = entities
+    return out
 
+def _entities_from_doc(doc, text: str) -> dict:
     ents = [{"text": e.text, "label": e.label_} for e in doc.ents]
 
     low = text.lower()
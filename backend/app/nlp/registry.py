@@ -0,0 +1,137 @@
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from app.core.config import settings
+from app.core.metrics import MODEL_INFO, MODEL_LOAD_DURATION, MODEL_LOADED_TIMESTAMP, MODEL_RELOADS
+from app.nlp.intent_model import MODEL_FILES, load_faq_model, load_intent_model
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ModelSet:
+    """Modèles intent + catégorie FAQ chargés ensemble (une version cohérente)."""
+
+    intent: Optional[dict]
+    faq: Optional[dict]
+    version: str
+    loaded_at: float
+
+
+def artifacts_fingerprint(models_dir: Path) -> str:
+    """Version des artefacts présents : empreinte des (nom, mtime, taille)."""
+    h = hashlib.sha1()
+    for name in MODEL_FILES:
+        try:
+            st = (models_dir / name).stat()
+        except FileNotFoundError:
+            continue
+        h.update(f"{name}:{st.st_mtime_ns}:{st.st_size};".encode())
+    return h.hexdigest()[:12]
+
+
+class ModelRegistry:
+    """Modèles actifs, rechargés en arrière-plan quand les artefacts changent sur disque.
+
+    Une requête lit `current` une seule fois et garde ce ModelSet jusqu'au bout ;
+    le remplacement est une simple affectation de référence, il ne bloque ni ne
+    perturbe les requêtes en cours.
+    """
+
+    def __init__(self, models_dir: Path, poll_seconds: float):
+        self.models_dir = models_dir
+        self.poll_seconds = poll_seconds
+        self._current: Optional[ModelSet] = None
+        self._failed_version: Optional[str] = None
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def current(self) -> ModelSet:
+        current = self._current
+        if current is None:
+            self.reload_if_changed()
+            current = self._current
+        return current
+
+    async def get(self) -> ModelSet:
+        """`current` pour les coroutines : tant que le premier chargement n'est pas terminé
+        (préchauffage en cours), il est fait ou attendu dans un thread, jamais dans la boucle."""
+        current = self._current
+        if current is not None:
+            return current
+        return await asyncio.to_thread(lambda: self.current)
+
+    def reload_if_changed(self) -> bool:
+        """Charge les artefacts si leur version a changé ; renvoie True si un swap a eu lieu."""
+        version = artifacts_fingerprint(self.models_dir)
+        if self._current is not None and version in (self._current.version, self._failed_version):
+            return False
+
+        with self._lock:
+            if self._current is not None and self._current.version == version:
+                return False
+            t0 = time.perf_counter()
+            try:
+                models = ModelSet(
+                    intent=load_intent_model(self.models_dir),
+                    faq=load_faq_model(self.models_dir),
+                    version=version,
+                    loaded_at=time.time(),
+                )
+            except Exception:
+                MODEL_RELOADS.labels(result="error").inc()
+                if self._current is None:
+                    raise
+                # on garde les modèles actifs ; nouvel essai au prochain changement de fichier
+                logger.exception("Échec du chargement des modèles %s, version %s conservée",
+                                 version, self._current.version)
+                self._failed_version = version
+                return False
+
+            MODEL_LOAD_DURATION.set(time.perf_counter() - t0)
+            self._swap(models)
+            MODEL_RELOADS.labels(result="ok").inc()
+            logger.info("Modèles NLP version %s chargés", version)
+            return True
+
+    def _swap(self, models: ModelSet) -> None:
+        previous = self._current
+        self._current = models
+        self._failed_version = None
+        if previous is not None and previous.version != models.version:
+            MODEL_INFO.remove(previous.version)
+        MODEL_INFO.labels(version=models.version).set(1)
+        MODEL_LOADED_TIMESTAMP.set(models.loaded_at)
+
+    async def start(self) -> None:
+        # premier chargement hors de la boucle asyncio, puis surveillance périodique
+        await asyncio.to_thread(lambda: self.current)
+        if self.poll_seconds > 0 and self._task is None:
+            self._task = asyncio.create_task(self._watch(), name="model-registry")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            try:
+                await asyncio.to_thread(self.reload_if_changed)
+            except Exception:
+                logger.exception("Surveillance des modèles NLP")
+
+
+MODEL_REGISTRY = ModelRegistry(Path(settings.MODELS_DIR), settings.MODEL_RELOAD_SECONDS)
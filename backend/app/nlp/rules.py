@@ -0,0 +1,174 @@
+from collections import deque
+from typing import Dict, Iterable, List, Set, Tuple
+
+
+class KeywordMatcher:
+    """Automate Aho–Corasick compilé une fois à partir d'une table {règle: motifs}.
+
+    `scan(text)` parcourt le texte en une seule passe et renvoie l'ensemble des règles
+    déclenchées (une règle est déclenchée si l'un de ses motifs est une sous-chaîne du texte).
+    Un motif préfixé par "^" ne compte que s'il apparaît au début du texte.
+    """
+
+    def __init__(self, table: Dict[str, Iterable[str]]):
+        self.rules = tuple(table)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # sorties par état : (règle, longueur du motif, ancré au début ?)
+        self._out: List[List[Tuple[str, int, bool]]] = [[]]
+
+        for rule, patterns in table.items():
+            for pattern in patterns:
+                anchored = pattern.startswith("^")
+                if anchored:
+                    pattern = pattern[1:]
+                if pattern:
+                    self._add(pattern, rule, anchored)
+        self._build_fail_links()
+
+    def _add(self, pattern: str, rule: str, anchored: bool) -> None:
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((rule, len(pattern), anchored))
+
+    def _build_fail_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def scan(self, text: str) -> Set[str]:
+        hits: Set[str] = set()
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text or ""):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for rule, length, anchored in out[state]:
+                if not anchored or i + 1 == length:
+                    hits.add(rule)
+        return hits
+
+
+# ------------------------
+# Règles de routage /chat (appliquées sur le message en minuscules)
+# ------------------------
+CHAT_RULE_TABLE: Dict[str, Tuple[str, ...]] = {
+    # questions "contact" connues
+    "contact_phrase": (
+        "comment contacter le service scolarité",
+        "comment contacter le service scolarite",
+        "quel est l'email du responsable de master ia",
+        "quel est l email du responsable de master ia",
+        "qui est l'enseignant de machine learning",
+        "qui est l enseignant de machine learning",
+        "comment joindre l'infirmerie",
+        "comment joindre l infirmerie",
+        "numéro d'urgence campus",
+        "numero d'urgence campus",
+        "numero d urgence campus",
+    ),
+    "service_only": ("infirmerie",),
+    "timetable_context": ("cours", "emploi du temps", "planning"),
+    "permanence": ("permanence",),
+    "responsable_formation": ("responsable de formation",),
+    # questions "emploi du temps" connues
+    "timetable_phrase": (
+        "quels sont mes cours lundi",
+        "où se trouve le cours de machine learning",
+        "ou se trouve le cours de machine learning",
+        "qui enseigne la cybersécurité en b3",
+        "qui enseigne la cybersecurite en b3",
+        "quand sont les examens de s1",
+    ),
+    "qui_enseigne": ("qui enseigne",),
+    "b3": ("b3",),
+    "examens_s1": ("quand sont les examens de s1",),
+    # question générique (FAQ)
+    "generic_prefix": (
+        "^où ", "^ou ",
+        "^quand ", "^comment ",
+        "^combien ", "^que ",
+        "^quel ", "^quelle ", "^quels ", "^quelles ",
+    ),
+    "question_mark": ("?",),
+    # rendu des réponses
+    "scolarite": ("scolarité", "scolarite"),
+    "responsable": ("responsable",),
+    "master": ("master",),
+    "ia": ("ia", "intelligence artificielle"),
+    "horaires": ("horaires",),
+    "bibliotheque": ("biblio", "bibliothèque", "bibliotheque"),
+    "machine_learning": ("machine learning",),
+    "sante": ("infirmerie", "santé", "sante"),
+    "urgence": ("urgence",),
+    "campus": ("campus",),
+    "mes_cours": ("quels sont mes cours",),
+    "cours_lieu": ("où se trouve le cours", "ou se trouve le cours"),
+}
+
+# ------------------------
+# Signaux FAQ (voir app.services.signals)
+# ------------------------
+# sur le texte normalisé (_normalize)
+NORMALIZED_SIGNAL_TABLE: Dict[str, Tuple[str, ...]] = {
+    "has_s1": ("semestre 1", " s1"),
+    "has_s2": ("semestre 2", " s2"),
+    "has_vacances": ("vacances",),
+    "has_weekend": ("week-end", "week end", "samedi", "dimanche"),
+    "has_feries": ("jour férié", "jours fériés", "férié", "fete du travail"),
+    "topic_exam": ("examen",),
+    "topic_absences": ("absence",),
+    "topic_feries": ("jour feri", "jours feri", "feries"),
+    "topic_vacances": ("vacances",),
+}
+
+# sur le texte en minuscules (accents conservés)
+SERVICE_SIGNAL_TABLE: Dict[str, Tuple[str, ...]] = {
+    "has_biblio": ("bibliothèque", "bibliotheque"),
+    "has_resto_u": ("restaurant universitaire", "resto u"),
+    "has_cafeteria": ("cafétéria", "cafeteria"),
+    "has_parking": ("parking",),
+    "has_vpn": ("vpn",),
+    "has_ent": ("ent",),
+}
+
+# ------------------------
+# Boosts métier par doc_type (Elasticsearch, voir app.search.es_search)
+# ------------------------
+DOC_TYPE_RULE_TABLE: Dict[str, Tuple[str, ...]] = {
+    "contact": (
+        "contacter", "joindre", "appel", "appeler", "téléphone", "telephone",
+        "mail", "email", "adresse", "horaire", "horaires", "ouvert", "ouverture",
+    ),
+    "planning": ("planning", "emploi du temps", "edt", "schedule"),
+    # certificat/attestation -> souvent procédure ou FAQ, rarement contact générique
+    "certificat": ("certificat", "attestation", "scolarité", "inscription", "relevé", "releve"),
+}
+
+DOC_TYPE_BOOSTS: Dict[str, Dict[str, float]] = {
+    "contact": {"contact": 1.5, "procedure": 0.4, "faq": 0.2},
+    "planning": {"faq": 1.0, "procedure": 0.4},
+    "certificat": {"procedure": 1.5, "faq": 0.8, "contact": -0.5},
+}
+
+
+CHAT_RULES = KeywordMatcher(CHAT_RULE_TABLE)
+NORMALIZED_SIGNAL_RULES = KeywordMatcher(NORMALIZED_SIGNAL_TABLE)
+SERVICE_SIGNAL_RULES = KeywordMatcher(SERVICE_SIGNAL_TABLE)
+DOC_TYPE_RULES = KeywordMatcher(DOC_TYPE_RULE_TABLE)
@@ -0,0 +1,180 @@
+"""Recherche sémantique FAQ / procédures sur CPU.
+
+Les questions FAQ et les procédures (titre + résumé) sont encodées hors ligne
+(scripts/train/build_semantic_index.py) dans une matrice d'embeddings normalisés,
+float32 ou int8, projetée en mémoire. À la requête, le message est encodé une fois
+et le top-k sort d'un seul produit matrice-vecteur (cosinus = produit scalaire).
+"""
+import logging
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.nlp.compact import read_arrays, write_arrays
+from app.services.signals import _normalize
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"SEM1"
+KINDS = ("faq", "procedure")
+
+
+def document_text(kind: str, row) -> str:
+    """Texte encodé pour une ligne FAQItem (question) ou Procedure (titre + résumé)."""
+    if kind == "faq":
+        return row.question or ""
+    return " ".join(t for t in (row.title, row.summary) if t)
+
+
+@dataclass
+class SemanticHit:
+    kind: str
+    id: int
+    score: float
+
+
+class SemanticIndex:
+    """Matrice (n_docs x dim) d'embeddings normalisés + (type, id) de chaque ligne."""
+
+    def __init__(self, matrix: np.ndarray, kinds: np.ndarray, ids: np.ndarray, model: str, scale: float = 1.0):
+        self.matrix = matrix
+        self.kinds = kinds
+        self.ids = ids
+        self.model = model
+        # int8 : embedding ≈ matrix * scale
+        self.scale = scale
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, query_vec: np.ndarray, k: int = 10, kind: str | None = None,
+               min_score: float = 0.0) -> List[SemanticHit]:
+        if not len(self.ids):
+            return []
+        scores = (self.matrix @ query_vec.astype(np.float32)) * np.float32(self.scale)
+        if kind is not None:
+            scores = np.where(self.kinds == KINDS.index(kind), scores, -np.inf)
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [
+            SemanticHit(kind=KINDS[self.kinds[i]], id=int(self.ids[i]), score=float(scores[i]))
+            for i in top
+            if scores[i] >= min_score
+        ]
+
+
+def quantize_int8(matrix: np.ndarray) -> tuple[np.ndarray, float]:
+    """Composantes d'un vecteur normalisé dans [-1, 1] : une seule échelle 1/127 suffit."""
+    scale = 1.0 / 127
+    return np.clip(np.rint(matrix / scale), -127, 127).astype(np.int8), scale
+
+
+def save_semantic_index(path: str, matrix: np.ndarray, kinds: Sequence[str], ids: Sequence[int],
+                        model: str, quantize: bool = False) -> dict:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    scale = 1.0
+    if quantize:
+        matrix, scale = quantize_int8(matrix)
+    arrays = {
+        "matrix": matrix,
+        "kinds": np.array([KINDS.index(k) for k in kinds], dtype=np.uint8),
+        "ids": np.asarray(ids, dtype=np.int64),
+    }
+    header = {
+        "format": 1,
+        "model": model,
+        "dim": int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+        "dtype": matrix.dtype.name,
+        "scale": scale,
+        "counts": {k: int(sum(1 for x in kinds if x == k)) for k in KINDS},
+    }
+    write_arrays(path, MAGIC, header, arrays)
+    return header
+
+
+def load_semantic_index(path: str) -> SemanticIndex:
+    header, arrays = read_arrays(path, MAGIC)
+    return SemanticIndex(arrays["matrix"], arrays["kinds"], arrays["ids"], header["model"], header["scale"])
+
+
+@lru_cache(maxsize=1)
+def _load_index(path: Path, mtime: float) -> SemanticIndex:
+    index = load_semantic_index(str(path))
+    logger.info("Index sémantique chargé : %d documents (%s)", len(index), index.matrix.dtype)
+    return index
+
+
+def get_semantic_index(path: str | None = None) -> Optional[SemanticIndex]:
+    """Index courant (rechargé si le fichier a été régénéré), None s'il n'a pas été construit."""
+    path = Path(path or settings.SEMANTIC_INDEX_PATH)
+    try:
+        mtime = path.stat().st_mtime
+    except FileNotFoundError:
+        return None
+    return _load_index(path, mtime)
+
+
+_encoders: dict = {}
+_encoder_lock = threading.Lock()
+
+
+def get_encoder(model: str | None = None):
+    model = model or settings.SEMANTIC_MODEL
+    encoder = _encoders.get(model)
+    if encoder is None:
+        with _encoder_lock:
+            encoder = _encoders.get(model)
+            if encoder is None:
+                # import différé : torch + sentence-transformers ne sont chargés que si utilisés
+                from sentence_transformers import SentenceTransformer
+
+                encoder = _encoders[model] = SentenceTransformer(model, device="cpu")
+    return encoder
+
+
+def encode_texts(texts: List[str], model: str | None = None,
+                 batch_size: int | None = None) -> np.ndarray:
+    """Embeddings normalisés (float32), encodés par lots sur CPU."""
+    vectors = get_encoder(model).encode(
+        texts,
+        batch_size=batch_size or settings.SEMANTIC_BATCH_SIZE,
+        normalize_embeddings=True,
+        convert_to_numpy=True,
+        show_progress_bar=False,
+    )
+    return np.asarray(vectors, dtype=np.float32)
+
+
+# Embeddings des messages déjà vus, clé = (modèle, texte normalisé)
+_QUERY_CACHE = TTLCache(maxsize=settings.SEMANTIC_CACHE_SIZE)
+
+
+def embed_query(text: str, model: str | None = None) -> np.ndarray:
+    model = model or settings.SEMANTIC_MODEL
+    key = (model, _normalize(text))
+    vec = _QUERY_CACHE.get(key)
+    if vec is None:
+        vec = encode_texts([text], model=model)[0]
+        _QUERY_CACHE.set(key, vec)
+    return vec
+
+
+def semantic_search(query: str, k: int = 10, kind: str | None = None,
+                    min_score: float | None = None) -> List[SemanticHit]:
+    """Top-k documents proches du message ; [] si l'index n'a pas été construit."""
+    index = get_semantic_index()
+    if index is None or not len(index):
+        return []
+    # la requête est encodée avec le modèle qui a produit l'index (même espace)
+    vec = embed_query(query, model=index.model)
+    if min_score is None:
+        min_score = settings.SEMANTIC_MIN_SCORE
+    return index.search(vec, k=k, kind=kind, min_score=min_score)
@@ -1,7 +1,48 @@
-from elasticsearch import Elasticsearch
+import threading
+from typing import TYPE_CHECKING, Iterable, Optional
+
 from app.core.config import settings
 
+if TYPE_CHECKING:
+    from elasticsearch import Elasticsearch
+
+# Un alias par type de document (kb_faq, kb_contact, ...) ; kb_docs les regroupe tous
+# (voir scripts/search/aliases.py).
 INDEX = "kb_docs"
 
-def get_es() -> Elasticsearch:
-    return Elasticsearch(settings.ELASTIC_URL)
+
+def index_for(doc_types: Iterable[str]) -> str:
+    """Alias à interroger pour ces types : seuls leurs index sont visités (tous si aucun type)."""
+    return ",".join(f"kb_{doc_type}" for doc_type in doc_types) or INDEX
+
+
+_es: Optional["Elasticsearch"] = None
+_es_lock = threading.Lock()
+
+
+def get_es() -> "Elasticsearch":
+    """Client unique par processus : son pool de connexions HTTP est réutilisé par toutes
+    les requêtes (au lieu d'un client, donc d'une connexion, par appel)."""
+    global _es
+    if _es is None:
+        with _es_lock:
+            if _es is None:
+                # import différé : le client n'est chargé que si ES est utilisé
+                from elasticsearch import Elasticsearch
+
+                _es = Elasticsearch(
+                    settings.ELASTIC_URL,
+                    connections_per_node=settings.ES_POOL_SIZE,
+                    request_timeout=settings.ES_TIMEOUT_SECONDS,
+                    max_retries=settings.ES_MAX_RETRIES,
+                    retry_on_timeout=True,
+                )
+    return _es
+
+
+def close_es() -> None:
+    global _es
+    with _es_lock:
+        if _es is not None:
+            _es.close()
+            _es = None
@@ -1,63 +1,95 @@
-from typing import Any, Dict, List, Tuple
-from elasticsearch import Elasticsearch
-from app.search.es_client import INDEX
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
+from app.search.es_client import INDEX, index_for
+from app.nlp.rules import DOC_TYPE_BOOSTS, DOC_TYPE_RULES
+
+if TYPE_CHECKING:
+    from elasticsearch import Elasticsearch
 
 
 def _normalize(text: str) -> str:
     return (text or "").lower().strip()
 
 
-def _boost_doc_type(query: str, doc_type: str) -> float:
+def _boost_doc_type(query: str, doc_type: str, rules: set | None = None) -> float:
+    """
+    Petit re-ranking métier (simple mais efficace) : somme des boosts des règles
+    déclenchées par la requête (voir DOC_TYPE_RULE_TABLE / DOC_TYPE_BOOSTS).
+    """
+    if rules is None:
+        rules = DOC_TYPE_RULES.scan(_normalize(query))
+    return sum(boosts.get(doc_type, 0.0) for rule, boosts in DOC_TYPE_BOOSTS.items() if rule in rules)
+
+
+def _doc_type_boost_clauses(
+    query: str,
+    doc_types: List[str] | None = None,
+    rules: set | None = None,
+) -> Tuple[List[Dict[str, Any]], float]:
     """
-    Petit re-ranking métier (simple mais efficace).
+    Boosts métier par doc_type traduits en clauses `should` constant_score, pour que
+    ES trie et tronque (top_k, min_score) sur le score final, sans re-ranking Python.
+
+    ES refuse les boosts négatifs : on décale tous les types du même `offset`
+    (renvoyé, à ajouter au min_score) ; l'ordre reste celui de score + boost.
     """
-    q = _normalize(query)
-
-    # Mots-clés "contact"
-    contact_kw = ["contacter", "joindre", "appel", "appeler", "téléphone", "telephone", "mail", "email", "adresse", "horaire", "horaires", "ouvert", "ouverture"]
-    # Mots-clés "planning"
-    planning_kw = ["planning", "emploi du temps", "edt", "schedule"]
-    # Mots-clés "certificat"
-    cert_kw = ["certificat", "attestation", "scolarité", "inscription", "relevé", "releve"]
-
-    boost = 0.0
-
-    if any(k in q for k in contact_kw):
-        if doc_type == "contact":
-            boost += 1.5
-        if doc_type == "procedure":
-            boost += 0.4  # parfois procédure de contact
-        if doc_type == "faq":
-            boost += 0.2
-
-    if any(k in q for k in planning_kw):
-        if doc_type == "faq":
-            boost += 1.0
-        if doc_type == "procedure":
-            boost += 0.4
-
-    if any(k in q for k in cert_kw):
-        # certificat/attestation -> souvent procédure ou FAQ, rarement contact générique
-        if doc_type == "procedure":
-            boost += 1.5
-        if doc_type == "faq":
-            boost += 0.8
-        if doc_type == "contact":
-            boost -= 0.5  # on pénalise contact ici
-
-    return boost
-
-
-def _rerank_hits(query: str, hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    scored: List[Tuple[float, Dict[str, Any]]] = []
-    for h in hits:
-        src = (h.get("_source") or {})
-        dt = src.get("doc_type") or "kb"
-        base = float(h.get("_score") or 0.0)
-        final = base + _boost_doc_type(query, dt)
-        scored.append((final, h))
-    scored.sort(key=lambda x: x[0], reverse=True)
-    return [h for _, h in scored]
+    if rules is None:
+        rules = DOC_TYPE_RULES.scan(_normalize(query))
+    types = {dt for boosts in DOC_TYPE_BOOSTS.values() for dt in boosts}
+    if doc_types:
+        types &= set(doc_types)
+    totals = {dt: _boost_doc_type(query, dt, rules) for dt in sorted(types)}
+    totals = {dt: b for dt, b in totals.items() if b}
+    offset = max(0.0, -min(totals.values(), default=0.0))
+
+    clauses: List[Dict[str, Any]] = [
+        {"constant_score": {"filter": {"term": {"doc_type": dt}}, "boost": b + offset}}
+        for dt, b in totals.items()
+        if b + offset > 0
+    ]
+    if offset > 0:
+        # types sans boost : même décalage
+        clauses.append({
+            "constant_score": {
+                "filter": {"bool": {"must_not": [{"terms": {"doc_type": list(totals)}}]}},
+                "boost": offset,
+            }
+        })
+    return clauses, offset
+
+
+def _search_body(
+    query: str,
+    doc_types: List[str] | None = None,
+    top_k: int = 5,
+    min_score: float = 2.5,
+    rules: set | None = None,
+) -> Dict[str, Any]:
+    """Requête commune : phrase exacte (titre, contenu) + multi_match flou ; boosts par doc_type
+    appliqués dans le score ES (voir _doc_type_boost_clauses). Le type n'est pas filtré ici :
+    l'appelant interroge les index des types voulus (index_for)."""
+    bool_query: Dict[str, Any] = {
+        "should": [
+            {"match_phrase": {"title": {"query": query, "boost": 5}}},
+            {"match_phrase": {"content": {"query": query, "boost": 2}}},
+            {
+                "multi_match": {
+                    "query": query,
+                    "fields": ["title^4", "content"],
+                    "fuzziness": "AUTO",
+                    "operator": "and"
+                }
+            },
+        ],
+        "minimum_should_match": 1,
+    }
+
+    boosts, offset = _doc_type_boost_clauses(query, doc_types, rules)
+    if boosts:
+        # la pertinence textuelle reste obligatoire ; les boosts ne font qu'ajouter au score
+        bool_query = {"must": [{"bool": bool_query}], "should": boosts}
+    return {"size": top_k, "min_score": min_score + offset, "query": {"bool": bool_query}}
 
 
 def search_kb_by_type(
@@ -68,33 +100,11 @@ def search_kb_by_type(
     min_score: float = 2.5,
 ) -> List[Dict[str, Any]]:
     """
-    Recherche avec filtre doc_type + seuil de score + re-ranking.
+    Recherche limitée aux index des types demandés + seuil de score (boosts métier inclus
+    dans le score ES).
     """
-    body = {
-        "size": top_k,
-        "min_score": min_score,
-        "query": {
-            "bool": {
-                "should": [
-                    {"match_phrase": {"title": {"query": query, "boost": 5}}},
-                    {"match_phrase": {"content": {"query": query, "boost": 2}}},
-                    {
-                        "multi_match": {
-                            "query": query,
-                            "fields": ["title^4", "content"],
-                            "fuzziness": "AUTO",
-                            "operator": "and"
-                        }
-                    },
-                ],
-                "minimum_should_match": 1,
-                "filter": [{"terms": {"doc_type": doc_types}}],
-            }
-        },
-    }
-    res = es.search(index=INDEX, body=body)
-    hits = res.get("hits", {}).get("hits", []) or []
-    return _rerank_hits(query, hits)
+    res = es.search(index=index_for(doc_types), body=_search_body(query, doc_types, top_k, min_score))
+    return res.get("hits", {}).get("hits", []) or []
 
 
 def search_kb(
@@ -104,29 +114,43 @@ def search_kb(
     min_score: float = 2.5,
 ) -> List[Dict[str, Any]]:
     """
-    Recherche globale (sans filtre doc_type) + seuil + re-ranking.
+    Recherche globale (sans filtre doc_type) + seuil (boosts métier inclus dans le score ES).
     """
-    body = {
-        "size": top_k,
-        "min_score": min_score,
-        "query": {
-            "bool": {
-                "should": [
-                    {"match_phrase": {"title": {"query": query, "boost": 5}}},
-                    {"match_phrase": {"content": {"query": query, "boost": 2}}},
-                    {
-                        "multi_match": {
-                            "query": query,
-                            "fields": ["title^4", "content"],
-                            "fuzziness": "AUTO",
-                            "operator": "and"
-                        }
-                    },
-                ],
-                "minimum_should_match": 1,
-            }
-        },
-    }
-    res = es.search(index=INDEX, body=body)
-    hits = res.get("hits", {}).get("hits", []) or []
-    return _rerank_hits(query, hits)
+    res = es.search(index=INDEX, body=_search_body(query, None, top_k, min_score))
+    return res.get("hits", {}).get("hits", []) or []
+
+
+# Taille et seuil par type de document pour search_kb_multi : (top_k, min_score)
+MULTI_SEARCH_DEFAULTS: Dict[str, Tuple[int, float]] = {
+    "faq": (3, 2.5),
+    "contact": (5, 2.5),
+    "procedure": (3, 2.5),
+}
+
+
+def search_kb_multi(
+    es: Elasticsearch,
+    query: str,
+    sources: Dict[str, Tuple[int, float]] | None = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Plusieurs types de documents en un seul aller-retour (_msearch) : une sous-requête
+    par doc_type, sur l'index du type, avec sa taille et son seuil. Renvoie {doc_type: hits}.
+
+    Une sous-requête en erreur fait échouer l'ensemble (RuntimeError) : l'appelant
+    se replie comme pour une recherche simple.
+    """
+    sources = sources or MULTI_SEARCH_DEFAULTS
+    rules = DOC_TYPE_RULES.scan(_normalize(query))  # un seul passage pour toutes les sous-requêtes
+    searches: List[Dict[str, Any]] = []
+    for doc_type, (top_k, min_score) in sources.items():
+        searches.append({"index": index_for([doc_type])})
+        searches.append(_search_body(query, [doc_type], top_k, min_score, rules))
+
+    res = es.msearch(searches=searches)
+    grouped: Dict[str, List[Dict[str, Any]]] = {}
+    for doc_type, r in zip(sources, res.get("responses", [])):
+        if "error" in r:
+            raise RuntimeError(f"_msearch {doc_type} : {r['error']}")
+        grouped[doc_type] = r.get("hits", {}).get("hits", []) or []
+    return grouped
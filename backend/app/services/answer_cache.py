@@ -0,0 +1,47 @@
+from typing import Any, Optional
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import CHAT_CACHE_HITS, CHAT_CACHE_MISSES, CHAT_CACHE_SIZE
+
+# Réponses /chat déjà calculées :
+# ((kb_version, version des modèles), message en minuscules, canal, langue) -> (outcome, entités)
+ANSWER_CACHE = TTLCache(
+    maxsize=settings.ANSWER_CACHE_SIZE,
+    ttl=settings.ANSWER_CACHE_TTL_SECONDS,
+)
+
+_generation: Optional[tuple] = None
+
+
+def answer_cache_key(
+    msg: str,
+    channel: str,
+    language: Optional[str],
+    kb_version: int,
+    model_version: str = "",
+) -> tuple:
+    # pas de normalisation plus poussée : le routage lit le texte brut en minuscules
+    # (match exact sur la question FAQ, règle "?"), deux messages qui ne diffèrent que par
+    # la ponctuation ou les accents peuvent donc recevoir des réponses différentes
+    return ((kb_version, model_version), msg.strip().lower(), channel, language or "")
+
+
+def get_cached_answer(key: tuple) -> Optional[Any]:
+    global _generation
+    # nouvelle version de la base de connaissance (ingestion) ou des modèles -> on vide tout
+    if _generation != key[0]:
+        ANSWER_CACHE.clear()
+        _generation = key[0]
+
+    value = ANSWER_CACHE.get(key)
+    if value is None:
+        CHAT_CACHE_MISSES.inc()
+    else:
+        CHAT_CACHE_HITS.inc()
+    return value
+
+
+def set_cached_answer(key: tuple, value: Any) -> None:
+    ANSWER_CACHE.set(key, value)
+    CHAT_CACHE_SIZE.set(len(ANSWER_CACHE))
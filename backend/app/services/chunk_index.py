@@ -0,0 +1,70 @@
+import logging
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models import DocChunk
+from app.nlp.ann import IVFIndex
+from app.nlp.embedding_store import sync_embeddings
+from app.nlp.semantic import embed_query, encode_texts
+
+logger = logging.getLogger(__name__)
+
+
+def refresh_chunk_index(db: Session, nlist: int | None = None, quantize: bool | None = None) -> dict:
+    """Embeddings des passages (store par empreinte : seuls les nouveaux sont encodés)
+    puis reconstruction de l'index IVF. Renvoie les compteurs."""
+    model = settings.SEMANTIC_MODEL
+    quantize = settings.SEMANTIC_QUANTIZE if quantize is None else quantize
+    ids, texts = [], []
+    for chunk in db.query(DocChunk).order_by(DocChunk.id).yield_per(1000):
+        if chunk.content and chunk.content.strip():
+            ids.append(chunk.id)
+            texts.append(chunk.content)
+
+    vectors, stats = sync_embeddings(
+        settings.CHUNK_STORE_PATH,
+        texts,
+        model,
+        encode=lambda batch: encode_texts(batch, model=model),
+    )
+    if texts:
+        index = IVFIndex.build(vectors, ids, nlist=nlist or settings.CHUNK_NLIST or None,
+                               quantize=quantize, model=model)
+        header = index.save(settings.CHUNK_INDEX_PATH)
+        stats.update(n=header["n"], nlist=header["nlist"], dtype=header["dtype"])
+    return stats
+
+
+@lru_cache(maxsize=1)
+def _load_index(path: Path, mtime: float) -> IVFIndex:
+    index = IVFIndex.load(str(path))
+    logger.info("Index des passages chargé : %d passages, %d listes", len(index), index.nlist)
+    return index
+
+
+def get_chunk_index(path: str | None = None) -> Optional[IVFIndex]:
+    """Index IVF courant (projeté en mémoire, lecture seule), None s'il n'a pas été construit."""
+    path = Path(path or settings.CHUNK_INDEX_PATH)
+    try:
+        mtime = path.stat().st_mtime
+    except FileNotFoundError:
+        return None
+    return _load_index(path, mtime)
+
+
+def search_doc_chunks(db: Session, query: str, limit: int = 5,
+                      nprobe: int | None = None) -> List[Tuple[DocChunk, float]]:
+    """Passages les plus proches du message, avec leur similarité cosinus."""
+    index = get_chunk_index()
+    if index is None or not len(index):
+        return []
+    ids, scores = index.search(embed_query(query, model=index.model), k=limit,
+                               nprobe=nprobe or settings.CHUNK_NPROBE)
+    if not len(ids):
+        return []
+    rows = {c.id: c for c in db.query(DocChunk).filter(DocChunk.id.in_([int(i) for i in ids])).all()}
+    return [(rows[int(i)], float(s)) for i, s in zip(ids, scores) if int(i) in rows]
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+
+from app.core.config import settings
+from app.core.metrics import (
+    CHAT_EVENT_FLUSH_LATENCY,
+    CHAT_EVENT_QUEUE_DEPTH,
+    CHAT_EVENTS_DROPPED,
+    CHAT_EVENTS_WRITTEN,
+)
+from app.db.models import ChatEvent
+from app.db.session import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class ChatEventWriter:
+    """Journalisation différée des ChatEvent : file bornée en mémoire + tâche de fond
+       qui insère par lots (toutes les `batch_size` lignes ou `flush_ms` millisecondes)."""
+
+    def __init__(self, max_queue: int, batch_size: int, flush_ms: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="chat-event-writer")
+
+    async def stop(self) -> None:
+        """Vide la file puis arrête le flusher (appelé à l'arrêt de l'application)."""
+        if self._task is None:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    def submit(self, row: Dict[str, Any]) -> bool:
+        row.setdefault("created_at", datetime.now(timezone.utc))
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            CHAT_EVENTS_DROPPED.labels(reason="queue_full").inc()
+            return False
+        CHAT_EVENT_QUEUE_DEPTH.set(self._queue.qsize())
+        return True
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._queue.get()
+            stopping = item is _STOP
+            batch = [] if stopping else [item]
+            deadline = loop.time() + self.flush_interval
+            while not stopping and len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            if stopping:
+                batch.extend(self._drain())
+            for i in range(0, len(batch), self.batch_size):
+                await self._flush(batch[i:i + self.batch_size])
+            if stopping:
+                return
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        rows = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return rows
+            if item is not _STOP:
+                rows.append(item)
+
+    async def _flush(self, rows: List[Dict[str, Any]]) -> None:
+        t0 = time.perf_counter()
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(insert(ChatEvent), rows)
+                await db.commit()
+            CHAT_EVENTS_WRITTEN.inc(len(rows))
+            CHAT_EVENT_FLUSH_LATENCY.observe(time.perf_counter() - t0)
+        except Exception:
+            logger.exception("Échec d'écriture de %d ChatEvent", len(rows))
+            CHAT_EVENTS_DROPPED.labels(reason="flush_error").inc(len(rows))
+        finally:
+            CHAT_EVENT_QUEUE_DEPTH.set(self._queue.qsize())
+
+
+EVENT_WRITER = ChatEventWriter(
+    max_queue=settings.CHAT_EVENT_QUEUE_SIZE,
+    batch_size=settings.CHAT_EVENT_BATCH_SIZE,
+    flush_ms=settings.CHAT_EVENT_FLUSH_MS,
+)
@@ -0,0 +1,263 @@
+import asyncio
+import json
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.executor import run_cpu
+from app.db.models import FAQItem
+from app.services.kb_version import current_kb_version, current_kb_version_async
+from app.services.signals import (
+    SIGNAL_BITS,
+    TOPIC_ABSENCES,
+    TOPIC_EXAM,
+    TOPIC_FERIES,
+    TOPIC_VACANCES,
+    _normalize,
+    extract_query_signals,
+    signals_mask,
+    topics_mask,
+)
+
+# Champs couverts par l'index (mêmes champs que l'ancien filtre LIKE de search_faq)
+FIELDS = ("question", "answer", "category_name", "category_id", "tags")
+
+# Un mot-clé (déjà normalisé -> [a-z0-9]+) est une sous-chaîne de lower(champ)
+# ssi il est inclus dans une des séquences [a-z0-9]+ de lower(champ) :
+# on indexe donc ces séquences pour garder exactement la sémantique de LIKE '%kw%'.
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+FREQUENCY_RANK = {
+    "très élevée": 1,
+    "élevée": 2,
+    "moyenne": 3,
+    "faible": 4,
+    "très faible": 5,
+}
+
+_MAX_EXPANSIONS = 10_000
+
+
+def _field_texts(faq: FAQItem) -> Dict[str, str]:
+    return {
+        "question": faq.question or "",
+        "answer": faq.answer or "",
+        "category_name": faq.category_name or "",
+        "category_id": faq.category_id or "",
+        # équivalent de cast(tags, TEXT)
+        "tags": json.dumps(faq.tags or [], ensure_ascii=False),
+    }
+
+
+class FAQIndex:
+    """Index inversé en mémoire sur les FAQ, construit au démarrage et après chaque ingestion."""
+
+    def __init__(self, version: int):
+        self.version = version
+        self.postings: Dict[str, Dict[str, set]] = {f: defaultdict(set) for f in FIELDS}
+        self.vocabulary: set = set()
+        self.by_question: Dict[str, List[int]] = defaultdict(list)
+        self.category: Dict[int, str] = {}
+        self.frequency_rank: Dict[int, int] = {}
+        self._expansions: dict = {}
+
+        # Signaux de reranking précalculés, alignés par position
+        self.pos: Dict[int, int] = {}
+        self._masks: List[int] = []
+        self.masks = np.zeros(0, dtype=np.uint32)
+        # tokens de la question / réponse normalisées -> positions
+        self.q_postings: Dict[str, List[int]] = defaultdict(list)
+        self.a_postings: Dict[str, List[int]] = defaultdict(list)
+
+    @classmethod
+    def build(cls, faqs: Iterable[FAQItem], version: int) -> "FAQIndex":
+        index = cls(version)
+        for faq in faqs:
+            index.add(faq)
+        index.masks = np.asarray(index._masks, dtype=np.uint32)
+        return index
+
+    def add(self, faq: FAQItem) -> None:
+        for field, text in _field_texts(faq).items():
+            for tok in set(_TOKEN_RE.findall(text.lower())):
+                self.postings[field][tok].add(faq.id)
+                self.vocabulary.add(tok)
+        self.by_question[(faq.question or "").lower()].append(faq.id)
+        self.category[faq.id] = faq.category_id
+        self.frequency_rank[faq.id] = FREQUENCY_RANK.get(faq.frequency, 6)
+
+        pos = len(self._masks)
+        self.pos[faq.id] = pos
+        q_norm = _normalize(faq.question or "")
+        a_norm = _normalize(faq.answer or "")
+        for tok in set(q_norm.split()):
+            self.q_postings[tok].append(pos)
+        for tok in set(a_norm.split()):
+            self.a_postings[tok].append(pos)
+
+        txt = " ".join([
+            faq.question or "",
+            faq.answer or "",
+            " ".join(faq.tags or []),
+            faq.category_name or "",
+            faq.category_id or "",
+        ])
+        faq_txt = _normalize((faq.question or "") + " " + (faq.answer or ""))
+        self._masks.append(signals_mask(extract_query_signals(txt)) | topics_mask(faq_txt))
+
+    def __len__(self) -> int:
+        return len(self.category)
+
+    def exact_ids(self, query: str) -> List[int]:
+        return sorted(self.by_question.get((query or "").lower(), []))
+
+    def _expand(self, kw: str) -> List[str]:
+        """Tokens du vocabulaire contenant kw (équivalent de '%kw%')."""
+        toks = self._expansions.get(kw)
+        if toks is None:
+            toks = [t for t in self.vocabulary if kw in t]
+            if len(self._expansions) >= _MAX_EXPANSIONS:
+                self._expansions.clear()
+            self._expansions[kw] = toks
+        return toks
+
+    def candidates(self, kws: List[str]) -> Dict[int, Dict[str, int]]:
+        """IDs candidats -> nombre de mots-clés trouvés par champ."""
+        hits: Dict[int, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(FIELDS, 0))
+        for kw in kws:
+            toks = self._expand(kw)
+            if not toks:
+                continue
+            for field in FIELDS:
+                postings = self.postings[field]
+                ids = set()
+                for t in toks:
+                    ids |= postings.get(t, set())
+                for faq_id in ids:
+                    hits[faq_id][field] += 1
+        return dict(hits)
+
+    def _norm_mask(self, postings: Dict[str, List[int]], kw: str) -> np.ndarray:
+        """Positions dont le texte normalisé contient kw (sous-chaîne d'un token)."""
+        key = (id(postings), kw)
+        mask = self._expansions.get(key)
+        if mask is None:
+            mask = np.zeros(len(self._masks), dtype=bool)
+            for tok, positions in postings.items():
+                if kw in tok:
+                    mask[positions] = True
+            if len(self._expansions) >= _MAX_EXPANSIONS:
+                self._expansions.clear()
+            self._expansions[key] = mask
+        return mask
+
+    def rerank(self, query: str, kws: List[str], ids: List[int]) -> List[int]:
+        """Reranking vectorisé des candidats (plus petit score = meilleur, tri stable)."""
+        ids = [i for i in ids if i in self.pos]
+        if not ids:
+            return []
+        cand = np.fromiter((self.pos[i] for i in ids), dtype=np.int64, count=len(ids))
+        masks = self.masks[cand]
+        score = np.zeros(len(ids), dtype=np.int32)
+
+        def has(bit: int) -> np.ndarray:
+            return (masks & bit) != 0
+
+        # 0) Bonus de similarité question <-> question FAQ
+        for kw in kws:
+            in_q = self._norm_mask(self.q_postings, kw)[cand]
+            in_a = self._norm_mask(self.a_postings, kw)[cand]
+            score += np.where(in_q, -4, np.where(in_a, -2, 0)).astype(np.int32)
+
+        # 0bis) Malus thématiques génériques
+        q_topics = topics_mask(_normalize(query))
+
+        # Exams
+        if not q_topics & TOPIC_EXAM:
+            score += 8 * has(TOPIC_EXAM)
+
+        # Absences
+        if q_topics & TOPIC_ABSENCES:
+            score += 3 * ~has(TOPIC_ABSENCES)
+        else:
+            score += 2 * has(TOPIC_ABSENCES)
+
+        # Jours fériés
+        if q_topics & TOPIC_FERIES:
+            score += 3 * ~has(TOPIC_FERIES)
+        else:
+            score += 2 * (has(TOPIC_FERIES) & has(TOPIC_VACANCES))
+
+        signals_q = extract_query_signals(query)
+
+        # 1) Semestre S1 / S2
+        f_s1, f_s2 = has(SIGNAL_BITS["has_s1"]), has(SIGNAL_BITS["has_s2"])
+        if signals_q["has_s1"]:
+            score -= 5 * (f_s1 & ~f_s2)
+            score += 5 * (f_s2 & ~f_s1)
+        if signals_q["has_s2"]:
+            score -= 5 * (f_s2 & ~f_s1)
+            score += 5 * (f_s1 & ~f_s2)
+
+        # 2) Vacances / week-end / jours fériés, 3) Services (biblio, ENT, etc.)
+        for key in ["has_vacances", "has_weekend", "has_feries",
+                    "has_biblio", "has_resto_u", "has_cafeteria", "has_parking", "has_vpn", "has_ent"]:
+            if signals_q[key]:
+                score += np.where(has(SIGNAL_BITS[key]), -4, 2).astype(np.int32)
+
+        order = np.argsort(score, kind="stable")
+        return [ids[i] for i in order]
+
+
+_lock = threading.Lock()
+_async_lock = asyncio.Lock()
+_FAQ_INDEX: FAQIndex | None = None
+
+
+def rebuild_faq_index(db: Session) -> FAQIndex:
+    global _FAQ_INDEX
+    version = current_kb_version(db)
+    index = FAQIndex.build(db.query(FAQItem).all(), version)
+    _FAQ_INDEX = index
+    return index
+
+
+def get_faq_index(db: Session) -> FAQIndex:
+    """Index courant ; reconstruit si la version de la base de connaissance a changé."""
+    index = _FAQ_INDEX
+    version = current_kb_version(db)
+    if index is not None and index.version == version:
+        return index
+    with _lock:
+        index = _FAQ_INDEX
+        if index is None or index.version != version:
+            index = rebuild_faq_index(db)
+        return index
+
+
+def _load_faqs(db: Session) -> List[FAQItem]:
+    return db.query(FAQItem).all()
+
+
+async def get_faq_index_async(db: AsyncSession) -> FAQIndex:
+    """Comme get_faq_index, pour /chat : les FAQ sont lues par la session, l'index est
+    construit dans le pool NLP. La boucle asyncio n'est jamais bloquée par la reconstruction."""
+    global _FAQ_INDEX
+    version = await current_kb_version_async(db)
+    index = _FAQ_INDEX
+    if index is not None and index.version == version:
+        return index
+    # une seule reconstruction à la fois ; les requêtes suivantes attendent sans bloquer
+    async with _async_lock:
+        index = _FAQ_INDEX
+        version = await current_kb_version_async(db)
+        if index is None or index.version != version:
+            faqs = await db.run_sync(_load_faqs)
+            index = await run_cpu(FAQIndex.build, faqs, version)
+            _FAQ_INDEX = index
+        return index
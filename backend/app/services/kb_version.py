@@ -0,0 +1,65 @@
+import threading
+import time
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models import KBState
+
+KB_STATE_ID = 1
+
+_lock = threading.Lock()
+_cached_version: int | None = None
+_checked_at: float = 0.0
+
+
+def bump_kb_version(db: Session) -> int:
+    """Incrémente la version de la base de connaissance (appelé par les scripts d'ingestion).
+       Le commit reste à la charge de l'appelant."""
+    state = db.get(KBState, KB_STATE_ID, with_for_update=True)
+    if state is None:
+        state = KBState(id=KB_STATE_ID, version=0)
+        db.add(state)
+    state.version = (state.version or 0) + 1
+    db.flush()
+    return state.version
+
+
+def current_kb_version(db: Session) -> int:
+    """Version courante de la base de connaissance, relue au plus toutes les
+       KB_VERSION_CHECK_SECONDS pour ne pas ajouter un aller-retour DB par requête."""
+    global _cached_version, _checked_at
+
+    now = time.monotonic()
+    if _cached_version is not None and now - _checked_at < settings.KB_VERSION_CHECK_SECONDS:
+        return _cached_version
+
+    with _lock:
+        if _cached_version is None or now - _checked_at >= settings.KB_VERSION_CHECK_SECONDS:
+            version = db.query(KBState.version).filter(KBState.id == KB_STATE_ID).scalar()
+            _cached_version = int(version or 0)
+            _checked_at = now
+        return _cached_version
+
+
+async def current_kb_version_async(db: AsyncSession) -> int:
+    """Comme current_kb_version, pour /chat (session async).
+
+    Ne jamais appeler current_kb_version via run_sync : la fonction tourne alors sur le
+    thread de la boucle et son verrou, tenu pendant la requête DB, bloque la boucle dès
+    qu'une deuxième requête l'attend. Pas de verrou ici (un asyncio.Lock tenu en attendant
+    une connexion du pool bloquerait aussi) : au pire quelques requêtes relisent la version
+    en même temps, une lecture concurrente est sans danger.
+    """
+    global _cached_version, _checked_at
+
+    now = time.monotonic()
+    if _cached_version is not None and now - _checked_at < settings.KB_VERSION_CHECK_SECONDS:
+        return _cached_version
+
+    result = await db.execute(select(KBState.version).where(KBState.id == KB_STATE_ID))
+    _cached_version = int(result.scalar() or 0)
+    _checked_at = now
+    return _cached_version
@@ -0,0 +1,221 @@
+"""Recherche FAQ / contacts / procédures pour /chat : Elasticsearch d'abord, SQL en repli.
+
+Avec KB_RETRIEVAL=es, la recherche part sur Elasticsearch (client partagé, thread
+dédié aux E/S) ; les ids trouvés sont rechargés depuis la base pour que le rendu
+reste identique. Si ES est en erreur, trop lent ou si le disjoncteur est ouvert,
+la recherche SQL de app.services.router prend le relais. Le chemin qui a servi
+chaque recherche est compté dans kb_retrieval_total{source, path}. Pour un routage
+incertain, retrieve_kb_multi interroge les trois types en un seul _msearch.
+"""
+import logging
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.breaker import CircuitBreaker
+from app.core.config import settings
+from app.core.executor import run_cpu, run_io
+from app.core.metrics import ES_REQUEST_LATENCY, KB_RETRIEVAL_PATH
+from app.db.models import Contact, FAQItem, Procedure
+from app.search.es_client import get_es
+from app.search.es_search import MULTI_SEARCH_DEFAULTS, search_kb_by_type, search_kb_multi
+from app.services.faq_index import get_faq_index_async
+from app.services.router import (
+    _contacts_by_ids,
+    _faqs_by_ids,
+    _retriever,
+    rank_faq_ids,
+    search_contacts,
+    search_procedures,
+    semantic_candidates,
+)
+
+logger = logging.getLogger(__name__)
+
+ES_BREAKER = CircuitBreaker(
+    "elasticsearch",
+    failure_threshold=settings.ES_BREAKER_FAILURES,
+    reset_seconds=settings.ES_BREAKER_RESET_SECONDS,
+    slow_seconds=settings.ES_SLOW_SECONDS,
+)
+
+
+def _rows_by_ids(db: Session, model, ids: List[int]) -> list:
+    """Lignes `model` par clé primaire, dans l'ordre des ids (documents supprimés ignorés)."""
+    if not ids:
+        return []
+    rows = {r.id: r for r in db.query(model).filter(model.id.in_(ids)).all()}
+    return [rows[i] for i in ids if i in rows]
+
+
+async def _es_call(source: str, fn, *args, **kwargs):
+    """Appel ES protégé par le disjoncteur ; None si ES ne peut pas servir (l'appelant passe en SQL)."""
+    if settings.KB_RETRIEVAL != "es":
+        return None
+    ticket = ES_BREAKER.allow()
+    if ticket is None:
+        KB_RETRIEVAL_PATH.labels(source=source, path="fallback_open").inc()
+        return None
+
+    t0 = time.perf_counter()
+    try:
+        result = await run_io(fn, get_es(), *args, **kwargs)
+    except Exception as exc:
+        ES_BREAKER.record(ticket, False, time.perf_counter() - t0)
+        KB_RETRIEVAL_PATH.labels(source=source, path="fallback_error").inc()
+        logger.warning("Recherche Elasticsearch %s en échec, repli SQL : %r", source, exc)
+        return None
+
+    duration = time.perf_counter() - t0
+    ES_REQUEST_LATENCY.labels(source=source).observe(duration)
+    ES_BREAKER.record(ticket, True, duration)
+    return result
+
+
+def _db_ids(hits: List[dict]) -> List[int]:
+    return [int(h["_source"]["db_id"]) for h in hits if (h.get("_source") or {}).get("db_id") is not None]
+
+
+async def _search_es(source: str, query: str, top_k: int) -> Optional[List[int]]:
+    """Ids (db_id) trouvés par ES pour un type de document, ou None (repli SQL)."""
+    hits = await _es_call(source, search_kb_by_type, query, [source], top_k=top_k)
+    return None if hits is None else _db_ids(hits)
+
+
+def _served_by_es(source: str, found: list, trace: Optional[dict]) -> bool:
+    """Compte le chemin ES. Un résultat vide (après les filtres du type) compte comme un
+    échec de recherche : la recherche SQL est tentée (un index pas encore rempli ou en
+    retard ne doit pas vider les réponses)."""
+    if not found:
+        KB_RETRIEVAL_PATH.labels(source=source, path="fallback_empty").inc()
+        return False
+    KB_RETRIEVAL_PATH.labels(source=source, path="es").inc()
+    if trace is not None:
+        trace.update(path="es", es_hits=len(found))
+    return True
+
+
+def _sql(source: str, trace: Optional[dict]) -> None:
+    if settings.KB_RETRIEVAL != "es":
+        KB_RETRIEVAL_PATH.labels(source=source, path="sql").inc()
+    if trace is not None:
+        trace["path"] = "sql"
+
+
+def _es_top_k(source: str, limit: int) -> int:
+    """Hits demandés à ES pour `limit` résultats : les filtres FAQ (catégorie) et contacts
+    (cas spéciaux) en écartent, on en garde autant que la recherche SQL."""
+    return limit if source == "procedure" else max(limit * 3, 15)
+
+
+async def _faqs(
+    db: AsyncSession,
+    query: str,
+    es_ids: Optional[List[int]],
+    limit: int,
+    category_id: str | None = None,
+    order_by_frequency: bool = False,
+    trace: dict | None = None,
+) -> List[FAQItem]:
+    # index (reconstruit si la KB a changé), encodage du message et reranking NumPy
+    # dans le pool NLP, hors de la boucle ; la session ne sert qu'à lire les lignes
+    index = await get_faq_index_async(db)
+
+    # ES ne fait que générer les candidats (autant que la recherche SQL en garde) ;
+    # match exact, catégorie, fréquence et reranking sont les mêmes sur les deux chemins
+    retriever, semantic_ids = "keywords", None
+    if es_ids is None or not _served_by_es("faq", es_ids, trace):
+        es_ids = None
+        _sql("faq", trace)
+        retriever = _retriever(None)
+        if retriever in ("semantic", "hybrid"):
+            semantic_ids = await run_cpu(semantic_candidates, query, max(limit * 3, 15), "faq")
+
+    ids = await run_cpu(
+        rank_faq_ids, index, query, limit=limit, category_id=category_id, order_by_frequency=order_by_frequency,
+        trace=trace, retriever=retriever, semantic_ids=semantic_ids, candidate_ids=es_ids,
+    )
+    return await db.run_sync(_faqs_by_ids, ids)
+
+
+async def _contacts(db: AsyncSession, query: str, es_ids: Optional[List[int]], limit: int,
+                    trace: dict | None = None) -> List[Contact]:
+    # les cas spéciaux de search_contacts (scolarité, responsable Master IA) filtrent aussi les hits ES
+    if es_ids is not None:
+        contacts = (await db.run_sync(_contacts_by_ids, query, es_ids))[:limit]
+        if _served_by_es("contact", contacts, trace):
+            return contacts
+
+    _sql("contact", trace)
+    return await db.run_sync(search_contacts, query, limit=limit)
+
+
+async def _procedures(db: AsyncSession, query: str, es_ids: Optional[List[int]], limit: int,
+                      trace: dict | None = None) -> List[Procedure]:
+    if es_ids is not None:
+        procedures = await db.run_sync(_rows_by_ids, Procedure, es_ids)
+        if _served_by_es("procedure", procedures, trace):
+            return procedures
+
+    _sql("procedure", trace)
+    retriever = _retriever(None)
+    semantic_ids = None
+    if retriever == "semantic":
+        semantic_ids = await run_cpu(semantic_candidates, query, limit, "procedure")
+    return await db.run_sync(search_procedures, query, limit=limit, retriever=retriever, semantic_ids=semantic_ids)
+
+
+async def retrieve_faq(
+    db: AsyncSession,
+    query: str,
+    limit: int = 5,
+    category_id: str | None = None,
+    order_by_frequency: bool = False,
+    trace: dict | None = None,
+) -> List[FAQItem]:
+    es_ids = await _search_es("faq", query, top_k=_es_top_k("faq", limit))
+    return await _faqs(db, query, es_ids, limit, category_id, order_by_frequency, trace)
+
+
+async def retrieve_contacts(db: AsyncSession, query: str, limit: int = 5, trace: dict | None = None) -> List[Contact]:
+    es_ids = await _search_es("contact", query, top_k=_es_top_k("contact", limit))
+    return await _contacts(db, query, es_ids, limit, trace)
+
+
+async def retrieve_procedures(db: AsyncSession, query: str, limit: int = 5, trace: dict | None = None) -> List[Procedure]:
+    es_ids = await _search_es("procedure", query, top_k=_es_top_k("procedure", limit))
+    return await _procedures(db, query, es_ids, limit, trace)
+
+
+async def retrieve_kb_multi(
+    db: AsyncSession,
+    query: str,
+    limits: Dict[str, int] | None = None,
+    trace: dict | None = None,
+) -> Dict[str, list]:
+    """Candidats FAQ, contacts et procédures ensemble ({doc_type: lignes}), pour un routage incertain.
+
+    Côté ES, un seul _msearch (un aller-retour réseau quel que soit le nombre de types) ;
+    chaque type est ensuite traité comme par retrieve_faq / retrieve_contacts /
+    retrieve_procedures (post-traitement, repli SQL si ES échoue ou ne trouve rien).
+    """
+    limits = limits or {doc_type: top_k for doc_type, (top_k, _) in MULTI_SEARCH_DEFAULTS.items()}
+    sources = {
+        doc_type: (_es_top_k(doc_type, limit), MULTI_SEARCH_DEFAULTS.get(doc_type, (limit, 2.5))[1])
+        for doc_type, limit in limits.items()
+    }
+    grouped = await _es_call("multi", search_kb_multi, query, sources)
+
+    results: Dict[str, list] = {}
+    for doc_type, limit in limits.items():
+        es_ids = None if grouped is None else _db_ids(grouped.get(doc_type, []))
+        sub_trace = trace.setdefault(doc_type, {}) if trace is not None else None
+        if doc_type == "faq":
+            results[doc_type] = await _faqs(db, query, es_ids, limit, trace=sub_trace)
+        elif doc_type == "contact":
+            results[doc_type] = await _contacts(db, query, es_ids, limit, sub_trace)
+        else:
+            results[doc_type] = await _procedures(db, query, es_ids, limit, sub_trace)
+    return results
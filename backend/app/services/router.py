@@ -2,10 +2,19 @@ import re
 from typing import List
 from sqlalchemy.orm import Session
 from datetime import datetime, date, time as time_, timedelta
-from sqlalchemy import or_, func, cast, case,TEXT
-from unidecode import unidecode
+from sqlalchemy import or_, func
 
+from app.core.config import settings
 from app.db.models import FAQItem, Procedure, Contact, TimetableSlot
+from app.nlp.semantic import get_semantic_index, semantic_search
+from app.services.faq_index import FAQIndex, get_faq_index
+from app.services.signals import (
+    _normalize,
+    detect_semester_flags,
+    detect_period_flags,
+    detect_service_flags,
+    extract_query_signals,
+)
 
 STOPWORDS_FR = {
     "comment","pourquoi","quoi","que","qui","où","ou","quand","combien",
@@ -25,13 +34,6 @@ JOURS_FR = {
     "samedi": 5,
     "dimanche": 6,
 }
-def _normalize(text: str) -> str:
-    t = (text or "").lower()
-    t = unidecode(t)  # enlève les accents
-    t = re.sub(r"[^a-z0-9\s]", " ", t)
-    t = re.sub(r"\s+", " ", t).strip()
-    return t
-
 def _next_weekday(base: date, weekday: int) -> date:
     """Renvoie la date du prochain `weekday` (0=lundi..6=dimanche) à partir de base
        (si aujourd'hui est ce jour, on prend aujourd'hui)."""
@@ -55,182 +57,107 @@ def _keywords(query: str, max_kw: int = 6) -> List[str]:
 def _or_like(field, kws: List[str]):
     return or_(*[func.lower(field).like(f"%{kw}%") for kw in kws])
 
-def detect_semester_flags(text: str) -> dict[str, bool]:
-    t = _normalize(text)
-    return {
-        "has_s1": ("semestre 1" in t) or (" s1" in t),
-        "has_s2": ("semestre 2" in t) or (" s2" in t),
-    }
-
-def detect_period_flags(text: str) -> dict[str, bool]:
-    t = _normalize(text)
-    return {
-        "has_vacances": "vacances" in t,
-        "has_weekend": ("week-end" in t) or ("week end" in t) or ("samedi" in t) or ("dimanche" in t),
-        "has_feries": ("jour férié" in t) or ("jours fériés" in t) or ("férié" in t) or ("fete du travail" in t),
-    }
-
-def detect_service_flags(text: str) -> dict[str, bool]:
-    t = text.lower()
-    return {
-        "has_biblio": "bibliothèque" in t or "bibliotheque" in t,
-        "has_resto_u": "restaurant universitaire" in t or "resto u" in t,
-        "has_cafeteria": "cafétéria" in t or "cafeteria" in t,
-        "has_parking": "parking" in t,
-        "has_vpn": "vpn" in t,
-        "has_ent": "ent" in t,
-    }
-
-def extract_query_signals(query: str) -> dict:
-    sig = {}
-    sig.update(detect_semester_flags(query))
-    sig.update(detect_period_flags(query))
-    sig.update(detect_service_flags(query))
-    return sig
-def search_faq(db: Session, query: str, limit: int = 5, category_id: str | None = None, order_by_frequency: bool = False,):
-    # --- 0) match exact sur la question FAQ ---
-    q_norm = _normalize(query)
+def _faqs_by_ids(db: Session, ids: List[int]) -> List[FAQItem]:
+    """Charge les FAQ par clé primaire en conservant l'ordre des ids."""
+    if not ids:
+        return []
+    rows = {f.id: f for f in db.query(FAQItem).filter(FAQItem.id.in_(ids)).all()}
+    return [rows[i] for i in ids if i in rows]
+
+def _retriever(retriever: str | None) -> str:
+    """Générateur de candidats effectif : sans index sémantique construit, mots-clés."""
+    retriever = retriever or settings.FAQ_RETRIEVER
+    if retriever != "keywords" and get_semantic_index() is None:
+        return "keywords"
+    return retriever
+
+def semantic_candidates(query: str, k: int, kind: str) -> List[int]:
+    """Ids les plus proches par embeddings. Encode le message : côté /chat, à lancer via
+    run_cpu (app.services.retrieval), jamais dans db.run_sync (boucle asyncio)."""
+    return [h.id for h in semantic_search(query, k=k, kind=kind)]
+
+def rank_faq_ids(index: FAQIndex, query: str, limit: int = 5, category_id: str | None = None,
+                 order_by_frequency: bool = False, trace: dict | None = None,
+                 retriever: str | None = None, semantic_ids: List[int] | None = None,
+                 candidate_ids: List[int] | None = None) -> List[int]:
+    """Ids des FAQ à renvoyer, dans l'ordre : calcul pur sur l'index en mémoire (sans session),
+    exécuté dans le pool NLP par app.services.retrieval.
+
+    `trace` (optionnel) reçoit le nombre de candidats à chaque étape (mode debug de /chat).
+    `retriever` (défaut : settings.FAQ_RETRIEVER) choisit le générateur de candidats :
+    "keywords" (index inversé), "semantic" (embeddings, ordre par similarité) ou
+    "hybrid" (union des deux, reranking par signaux). En "semantic" / "hybrid",
+    `semantic_ids` (semantic_candidates) est calculé par l'appelant.
+    `candidate_ids` (hits Elasticsearch) remplace la génération de candidats ; le reste
+    (match exact, catégorie, fréquence, reranking) est identique.
+    """
+    if trace is None:
+        trace = {}
+    retriever = _retriever(retriever)
 
-    exact = (
-        db.query(FAQItem)
-        .filter(func.lower(FAQItem.question) == func.lower(query))
-        .all()
-    )
-    if exact:
-        return exact
+    # --- 0) match exact sur la question FAQ ---
+    exact_ids = index.exact_ids(query)
+    trace["exact"] = len(exact_ids)
+    if exact_ids:
+        return exact_ids
 
-    # --- 1) recherche classique par mots-clés ---
+    # --- 1) candidats : Elasticsearch, mots-clés (index inversé en mémoire) et/ou embeddings ---
     kws = _keywords(query)
-    if not kws:
+    if candidate_ids is not None:
+        ids = list(candidate_ids)
+        retriever = "keywords"
+    elif not kws and retriever == "keywords":
         return []
-
-    tags_str = cast(FAQItem.tags, TEXT)
-
-    base_filter = or_(
-        _or_like(FAQItem.question, kws),
-        _or_like(FAQItem.answer, kws),
-        _or_like(FAQItem.category_name, kws),
-        _or_like(FAQItem.category_id, kws),
-        _or_like(tags_str, kws),
-    )
-
-    q = db.query(FAQItem).filter(base_filter)
+    else:
+        ids = sorted(index.candidates(kws)) if kws and retriever != "semantic" else []
+    trace["keywords"] = kws
+    if retriever in ("semantic", "hybrid"):
+        # candidats sémantiques en tête (par similarité décroissante), puis ceux des mots-clés
+        semantic_ids = list(semantic_ids or [])
+        trace["semantic"] = len(semantic_ids)
+        known = set(semantic_ids)
+        ids = semantic_ids + [i for i in ids if i not in known]
+    trace["candidates"] = len(ids)
 
     if category_id:
-        q = q.filter(FAQItem.category_id == category_id)
+        ids = [i for i in ids if index.category.get(i) == category_id]
+        trace["in_category"] = len(ids)
 
     if order_by_frequency:
-        freq_order = case(
-            (
-                (FAQItem.frequency == "très élevée", 1),
-                (FAQItem.frequency == "élevée", 2),
-                (FAQItem.frequency == "moyenne", 3),
-                (FAQItem.frequency == "faible", 4),
-                (FAQItem.frequency == "très faible", 5),
-            ),
-            else_=6,
-        )
-        q = q.order_by(freq_order)
+        ids.sort(key=lambda i: index.frequency_rank.get(i, 6))
 
-    results = q.limit(max(limit * 3, 15)).all()
-    if not results:
+    ids = ids[:max(limit * 3, 15)]
+    trace["reranked"] = len(ids)
+    if not ids:
         return []
 
-    # --- 2) reranking par signaux ---
-    signals_q = extract_query_signals(query)
-
-    def faq_signals(faq: FAQItem) -> dict:
-        txt = " ".join([
-            faq.question or "",
-            faq.answer or "",
-            " ".join(faq.tags or []),
-            faq.category_name or "",
-            faq.category_id or "",
-        ])
-        sig = {}
-        sig.update(detect_semester_flags(txt))
-        sig.update(detect_period_flags(txt))
-        sig.update(detect_service_flags(txt))
-        return sig
-
-    def score_faq(faq: FAQItem) -> int:
-        sig_f = faq_signals(faq)
-        score = 0
-
-        # 0) Bonus de similarité question <-> question FAQ
-        faq_q_norm = _normalize(faq.question or "")
-        faq_a_norm = _normalize(faq.answer or "")
-        for kw in kws:
-            if kw in faq_q_norm:
-                score -= 4  # bonus fort : mot dans la question
-            elif kw in faq_a_norm:
-                score -= 2  # bonus plus faible : mot dans la réponse
-
-            # 0bis) Malus thématiques génériques
-        faq_txt = _normalize((faq.question or "") + " " + (faq.answer or ""))
-        q_txt = _normalize(query)
-
-        # Exams
-        q_mentions_exam = ("examen" in q_txt) or ("examens" in q_txt)
-        faq_mentions_exam = ("examen" in faq_txt) or ("examens" in faq_txt)
-        if faq_mentions_exam and not q_mentions_exam:
-            score += 8  # malus fort
-
-        # Absences
-        q_mentions_absences = ("absence" in q_txt) or ("absences" in q_txt)
-        faq_mentions_absences = ("absence" in faq_txt) or ("absences" in faq_txt)
-        if q_mentions_absences and not faq_mentions_absences:
-            score += 3
-        if not q_mentions_absences and faq_mentions_absences:
-            score += 2
-
-        # Jours fériés
-        q_mentions_feries = (
-                "jour feri" in q_txt or "jours feri" in q_txt or "feries" in q_txt
-        )
-        faq_mentions_feries = (
-                "jour feri" in faq_txt or "jours feri" in faq_txt or "feries" in faq_txt
-        )
-        if q_mentions_feries and not faq_mentions_feries:
-            score += 3
-        if not q_mentions_feries and faq_mentions_feries and "vacances" in faq_txt:
-            score += 2
-
-        # 1) Semestre S1 / S2
-        q_has_s1, q_has_s2 = signals_q["has_s1"], signals_q["has_s2"]
-        f_has_s1, f_has_s2 = sig_f["has_s1"], sig_f["has_s2"]
-
-        if q_has_s1 or q_has_s2:
-            if q_has_s1 and f_has_s1 and not f_has_s2:
-                score -= 5
-            if q_has_s2 and f_has_s2 and not f_has_s1:
-                score -= 5
-            if q_has_s1 and f_has_s2 and not f_has_s1:
-                score += 5
-            if q_has_s2 and f_has_s1 and not f_has_s2:
-                score += 5
-
-        # 2) Vacances / week-end / jours fériés (signaux globaux)
-        for key in ["has_vacances", "has_weekend", "has_feries"]:
-            if signals_q[key]:
-                if sig_f[key]:
-                    score -= 4
-                else:
-                    score += 2
-
-        # 3) Services (biblio, ENT, etc.)
-        for key in ["has_biblio", "has_resto_u", "has_cafeteria", "has_parking", "has_vpn", "has_ent"]:
-            if signals_q[key]:
-                if sig_f[key]:
-                    score -= 4
-                else:
-                    score += 2
-
-        return score
-
-    results = sorted(results, key=score_faq)
-    return results[:limit]
-def search_procedures(db: Session, query: str, limit: int = 5):
+    # --- 2) reranking par signaux (précalculés dans l'index, score vectorisé) ---
+    # en mode "semantic", l'ordre de similarité est conservé
+    ranked = ids if retriever == "semantic" else index.rerank(query, kws, ids)
+    return ranked[:limit]
+
+def search_faq(db: Session, query: str, limit: int = 5, category_id: str | None = None, order_by_frequency: bool = False,
+               trace: dict | None = None, retriever: str | None = None):
+    """Version synchrone (scripts) ; /chat passe par app.services.retrieval.retrieve_faq."""
+    retriever = _retriever(retriever)
+    semantic_ids = None
+    if retriever in ("semantic", "hybrid"):
+        semantic_ids = semantic_candidates(query, max(limit * 3, 15), "faq")
+    ids = rank_faq_ids(get_faq_index(db), query, limit=limit, category_id=category_id,
+                       order_by_frequency=order_by_frequency, trace=trace, retriever=retriever,
+                       semantic_ids=semantic_ids)
+    return _faqs_by_ids(db, ids)
+
+def search_procedures(db: Session, query: str, limit: int = 5, retriever: str | None = None,
+                      semantic_ids: List[int] | None = None):
+    """En "semantic", `semantic_ids` (semantic_candidates) est fourni par /chat ; calculé ici sinon (scripts)."""
+    if _retriever(retriever) == "semantic":
+        ids = semantic_ids if semantic_ids is not None else semantic_candidates(query, limit, "procedure")
+        if not ids:
+            return []
+        rows = {p.id: p for p in db.query(Procedure).filter(Procedure.id.in_(ids)).all()}
+        return [rows[i] for i in ids if i in rows]
+
     kws = _keywords(query)
     if not kws:
         return []
@@ -251,7 +178,6 @@ def search_contacts(db: Session, query: str, limit: int = 5):
     if not kws:
         return []
 
-    q_low = query.lower()
     base_query = db.query(Contact).filter(
             or_(
                 _or_like(Contact.nom_complet, kws),  # personnes (enseignants, responsables…)
@@ -268,6 +194,13 @@ def search_contacts(db: Session, query: str, limit: int = 5):
                 _or_like(Contact.commentaires, kws),  # missions, description service…
             )
         )
+    return _contact_special_cases(base_query, query).limit(limit).all()
+
+
+def _contact_special_cases(base_query, query: str):
+    """Restrictions propres à certaines questions, communes à la recherche SQL et aux
+    contacts trouvés par Elasticsearch (_contacts_by_ids)."""
+    q_low = query.lower()
     # Cas spécial : questions sur la scolarité → on restreint aux services administratifs
     if "scolarité" in q_low or "scolarite" in q_low:
         base_query = base_query.filter(Contact.sous_categorie.ilike("%scolar%"))
@@ -283,8 +216,15 @@ def search_contacts(db: Session, query: str, limit: int = 5):
                 )
             )
         )
+    return base_query
 
-    return base_query.limit(limit).all()
+
+def _contacts_by_ids(db: Session, query: str, ids: List[int]) -> List[Contact]:
+    """Contacts `ids` (hits ES) dans leur ordre, avec les cas spéciaux de search_contacts."""
+    if not ids:
+        return []
+    rows = {c.id: c for c in _contact_special_cases(db.query(Contact).filter(Contact.id.in_(ids)), query).all()}
+    return [rows[i] for i in ids if i in rows]
 
 
 def search_timetable(db: Session, query: str, program: str | None = None, group_name: str | None = None, limit: int = 10):
@@ -0,0 +1,56 @@
+import os
+from typing import List, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models import FAQItem, Procedure
+from app.nlp.embedding_store import sync_embeddings
+from app.nlp.semantic import document_text, encode_texts, save_semantic_index
+
+
+def collect_documents(db: Session) -> Tuple[List[str], List[int], List[str]]:
+    """(types, ids, textes) de toutes les FAQ et procédures à encoder."""
+    kinds, ids, texts = [], [], []
+    for kind, model in (("faq", FAQItem), ("procedure", Procedure)):
+        for row in db.query(model).order_by(model.id).yield_per(500):
+            text = document_text(kind, row)
+            if not text.strip():
+                continue
+            kinds.append(kind)
+            ids.append(row.id)
+            texts.append(text)
+    return kinds, ids, texts
+
+
+def semantic_index_enabled() -> bool:
+    """Index à maintenir : recherche sémantique activée ou index déjà construit."""
+    return settings.FAQ_RETRIEVER != "keywords" or os.path.exists(settings.SEMANTIC_INDEX_PATH)
+
+
+def refresh_semantic_index(db: Session, quantize: bool | None = None) -> dict:
+    """Reconstruit l'index sémantique à partir de la base.
+
+    Les embeddings viennent du store par empreinte de texte : après une ingestion, seuls
+    les documents nouveaux ou modifiés passent dans l'encodeur (les ids des procédures,
+    réinsérées à chaque ingestion, changent sans coût). Sans aucun document, l'index est
+    supprimé comme le store : get_semantic_index() renvoie None et la recherche repasse
+    par les mots-clés au lieu de servir les anciens embeddings. Renvoie les compteurs.
+    """
+    model = settings.SEMANTIC_MODEL
+    quantize = settings.SEMANTIC_QUANTIZE if quantize is None else quantize
+    kinds, ids, texts = collect_documents(db)
+
+    matrix, stats = sync_embeddings(
+        settings.SEMANTIC_STORE_PATH,
+        texts,
+        model,
+        encode=lambda batch: encode_texts(batch, model=model),
+    )
+    if not texts:
+        if os.path.exists(settings.SEMANTIC_INDEX_PATH):
+            os.unlink(settings.SEMANTIC_INDEX_PATH)
+        return stats
+    header = save_semantic_index(settings.SEMANTIC_INDEX_PATH, matrix, kinds, ids, model, quantize=quantize)
+    stats.update(counts=header["counts"], dim=header["dim"], dtype=header["dtype"])
+    return stats
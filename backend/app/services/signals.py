@@ -0,0 +1,68 @@
+import re
+from unidecode import unidecode
+
+from app.nlp.rules import NORMALIZED_SIGNAL_RULES, SERVICE_SIGNAL_RULES
+
+
+def _normalize(text: str) -> str:
+    t = (text or "").lower()
+    t = unidecode(t)  # enlève les accents
+    t = re.sub(r"[^a-z0-9\s]", " ", t)
+    t = re.sub(r"\s+", " ", t).strip()
+    return t
+
+def detect_semester_flags(text: str) -> dict[str, bool]:
+    hits = NORMALIZED_SIGNAL_RULES.scan(_normalize(text))
+    return {k: k in hits for k in ("has_s1", "has_s2")}
+
+def detect_period_flags(text: str) -> dict[str, bool]:
+    hits = NORMALIZED_SIGNAL_RULES.scan(_normalize(text))
+    return {k: k in hits for k in ("has_vacances", "has_weekend", "has_feries")}
+
+def detect_service_flags(text: str) -> dict[str, bool]:
+    hits = SERVICE_SIGNAL_RULES.scan(text.lower())
+    return {k: k in hits for k in SERVICE_SIGNAL_RULES.rules}
+
+def extract_query_signals(query: str) -> dict:
+    # un seul passage par automate (au lieu de detect_semester_flags + detect_period_flags + ...)
+    hits = NORMALIZED_SIGNAL_RULES.scan(_normalize(query)) | SERVICE_SIGNAL_RULES.scan(query.lower())
+    return {k: k in hits for k in SIGNAL_KEYS}
+
+# ------------------------
+# Signaux sous forme de bitmask (précalculés pour chaque FAQ à la construction de l'index)
+# ------------------------
+SIGNAL_KEYS = (
+    "has_s1", "has_s2",
+    "has_vacances", "has_weekend", "has_feries",
+    "has_biblio", "has_resto_u", "has_cafeteria", "has_parking", "has_vpn", "has_ent",
+)
+SIGNAL_BITS = {k: 1 << i for i, k in enumerate(SIGNAL_KEYS)}
+
+# Thématiques détectées sur le texte normalisé (question + réponse)
+TOPIC_EXAM = 1 << 16
+TOPIC_ABSENCES = 1 << 17
+TOPIC_FERIES = 1 << 18
+TOPIC_VACANCES = 1 << 19
+
+
+def signals_mask(sig: dict) -> int:
+    mask = 0
+    for key, bit in SIGNAL_BITS.items():
+        if sig.get(key):
+            mask |= bit
+    return mask
+
+
+TOPIC_BITS = {
+    "topic_exam": TOPIC_EXAM,
+    "topic_absences": TOPIC_ABSENCES,
+    "topic_feries": TOPIC_FERIES,
+    "topic_vacances": TOPIC_VACANCES,
+}
+
+
+def topics_mask(norm_text: str) -> int:
+    mask = 0
+    for rule in NORMALIZED_SIGNAL_RULES.scan(norm_text):
+        mask |= TOPIC_BITS.get(rule, 0)
+    return mask
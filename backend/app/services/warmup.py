@@ -0,0 +1,77 @@
+import asyncio
+import logging
+
+from app.core.config import settings
+from app.core.startup import STARTUP
+from app.db.session import SessionLocal
+from app.nlp.intent_model import encode_text, predict_faq_category, predict_intent
+from app.nlp.ner import get_nlp
+from app.nlp.registry import MODEL_REGISTRY
+from app.nlp.semantic import semantic_search
+from app.services.faq_index import rebuild_faq_index
+
+logger = logging.getLogger(__name__)
+
+_PROBE = "Comment contacter le service scolarité ?"
+
+
+def _warm_models() -> None:
+    models = MODEL_REGISTRY.current
+    # premier passage dans le scoreur compilé (allocations numpy, regex)
+    encoded = encode_text(_PROBE, models.intent, models.faq)
+    if models.intent is not None:
+        predict_intent(models.intent, encoded)
+    if models.faq is not None:
+        predict_faq_category(models.faq, encoded)
+
+
+def _warm_ner() -> None:
+    # appel direct (hors cache d'entités) : chargement du pipeline + premier doc
+    get_nlp()(_PROBE)
+
+
+def _warm_faq_index() -> None:
+    db = SessionLocal()
+    try:
+        rebuild_faq_index(db)
+    finally:
+        db.close()
+
+
+def _warm_semantic() -> None:
+    # chargement de l'index, de torch et de l'encodeur + premier encodage
+    semantic_search(_PROBE, k=1)
+
+
+WARMUP_STEPS = {
+    "warmup:models": _warm_models,
+    "warmup:ner": _warm_ner,
+    "warmup:faq_index": _warm_faq_index,
+}
+if settings.FAQ_RETRIEVER != "keywords":
+    WARMUP_STEPS["warmup:semantic"] = _warm_semantic
+
+
+async def _run_step(name: str, fn) -> None:
+    with STARTUP.step(name):
+        await asyncio.to_thread(fn)
+
+
+async def warm_up() -> None:
+    """Préchauffe modèles, spaCy et index FAQ en parallèle, hors du chemin des requêtes.
+
+    Une requête arrivée avant la fin reste servie (chargements paresseux) ;
+    /ready ne répond 200 qu'une fois toutes les étapes terminées sans erreur.
+    Les étapes doivent être annoncées (STARTUP.expect(*WARMUP_STEPS)) avant de lancer
+    la tâche : sinon un /ready reçu avant son premier pas ne verrait rien en attente.
+    """
+    results = await asyncio.gather(
+        *(_run_step(name, fn) for name, fn in WARMUP_STEPS.items()),
+        return_exceptions=True,
+    )
+    if any(isinstance(r, BaseException) for r in results):
+        logger.error("Préchauffage incomplet : %s", STARTUP.errors)
+
+    # surveillance des nouveaux artefacts (modèles déjà chargés par warmup:models)
+    await MODEL_REGISTRY.start()
+    STARTUP.mark_ready()
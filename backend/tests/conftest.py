@@ -0,0 +1,29 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# base SQLite jetable : les tests ne touchent jamais la base PostgreSQL de l'API
+_DB_PATH = Path(tempfile.mkdtemp(prefix="av_tests_")) / "kb.db"
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_PATH}"
+os.environ["ASYNC_DATABASE_URL"] = f"sqlite+aiosqlite:///{_DB_PATH}"
+
+# les tests importent le paquet `app` comme l'API (répertoire backend/)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    """Session sur des tables vides, recréées pour chaque test."""
+    from app.db import models  # noqa: F401  (enregistre les tables)
+    from app.db.session import Base, SessionLocal, engine
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
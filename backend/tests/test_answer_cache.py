@@ -0,0 +1,26 @@
+from app.services.answer_cache import ANSWER_CACHE, answer_cache_key, get_cached_answer, set_cached_answer
+
+
+def test_normalized_variant_does_not_shadow_verbatim_question():
+    ANSWER_CACHE.clear()
+    # la variante sans "?" est posée d'abord ; la question FAQ exacte ne doit pas reprendre sa réponse
+    variant = answer_cache_key("combien de temps durent les cours", "web", None, kb_version=1)
+    verbatim = answer_cache_key("Combien de temps durent les cours ?", "web", None, kb_version=1)
+    assert get_cached_answer(variant) is None  # comme /chat : lecture, puis écriture après calcul
+    set_cached_answer(variant, ("faq-14", {}))
+
+    assert verbatim != variant
+    assert get_cached_answer(verbatim) is None
+    assert get_cached_answer(variant) == ("faq-14", {})
+
+
+def test_case_and_surrounding_spaces_share_an_entry():
+    assert answer_cache_key("  Où est la BU ?", "web", "fr", 1) == answer_cache_key("où est la bu ?", "web", "fr", 1)
+
+
+def test_channel_language_and_versions_are_part_of_the_key():
+    key = answer_cache_key("où est la bu ?", "web", None, 1, "m1")
+    assert key != answer_cache_key("où est la bu ?", "kiosk", None, 1, "m1")
+    assert key != answer_cache_key("où est la bu ?", "web", "en", 1, "m1")
+    assert key != answer_cache_key("où est la bu ?", "web", None, 2, "m1")
+    assert key != answer_cache_key("où est la bu ?", "web", None, 1, "m2")
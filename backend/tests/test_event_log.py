@@ -0,0 +1,184 @@
+import asyncio
+
+from prometheus_client import REGISTRY
+
+from app.db.models import ChatEvent
+from app.services import event_log
+from app.services.event_log import ChatEventWriter
+
+
+class _MemorySession:
+    """Remplace AsyncSessionLocal : chaque lot inséré est gardé en mémoire."""
+
+    def __init__(self, batches: list, fail: bool = False):
+        self.batches = batches
+        self.fail = fail
+        self.gate = None  # asyncio.Event : bloque les insertions jusqu'à son déclenchement
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, stmt, rows):
+        if self.gate is not None:
+            await self.gate.wait()
+        if self.fail:
+            raise RuntimeError("base indisponible")
+        self.batches.append(list(rows))
+
+    async def commit(self):
+        pass
+
+
+def _row(i: int) -> dict:
+    return dict(user_hash=f"u{i}", user_message=f"message {i}", response="ok", intent="faq")
+
+
+def _dropped(reason: str) -> float:
+    return REGISTRY.get_sample_value("chat_events_dropped_total", {"reason": reason}) or 0.0
+
+
+async def _until(predicate, timeout: float = 2.0) -> None:
+    async def wait():
+        while not predicate():
+            await asyncio.sleep(0.005)
+    await asyncio.wait_for(wait(), timeout)
+
+
+def test_full_batches_are_flushed_without_waiting(monkeypatch):
+    batches = []
+    monkeypatch.setattr(event_log, "AsyncSessionLocal", _MemorySession(batches))
+
+    async def main():
+        writer = ChatEventWriter(max_queue=100, batch_size=3, flush_ms=60_000)
+        await writer.start()
+        for i in range(7):
+            assert writer.submit(_row(i))
+        # deux lots complets partent tout de suite, le 7e attend le délai (ou l'arrêt)
+        await _until(lambda: len(batches) == 2)
+        await asyncio.sleep(0.05)
+        assert len(batches) == 2
+        await writer.stop()
+
+    asyncio.run(main())
+    assert [len(b) for b in batches] == [3, 3, 1]
+    assert [r["user_hash"] for b in batches for r in b] == [f"u{i}" for i in range(7)]
+    assert all("created_at" in r for b in batches for r in b)
+
+
+def test_partial_batch_is_flushed_after_the_interval(monkeypatch):
+    batches = []
+    monkeypatch.setattr(event_log, "AsyncSessionLocal", _MemorySession(batches))
+
+    async def main():
+        writer = ChatEventWriter(max_queue=100, batch_size=50, flush_ms=20)
+        await writer.start()
+        writer.submit(_row(0))
+        writer.submit(_row(1))
+        await _until(lambda: len(batches) == 1)
+        await writer.stop()
+
+    asyncio.run(main())
+    assert [len(b) for b in batches] == [2]
+
+
+def test_submit_drops_rows_when_the_queue_is_full(monkeypatch):
+    batches = []
+    monkeypatch.setattr(event_log, "AsyncSessionLocal", _MemorySession(batches))
+    before = _dropped("queue_full")
+
+    async def main():
+        # flusher pas encore démarré : rien ne sort de la file
+        writer = ChatEventWriter(max_queue=2, batch_size=10, flush_ms=60_000)
+        results = [writer.submit(_row(i)) for i in range(4)]
+        await writer.start()
+        await writer.stop()
+        return results
+
+    assert asyncio.run(main()) == [True, True, False, False]
+    assert _dropped("queue_full") - before == 2
+    assert [r["user_hash"] for b in batches for r in b] == ["u0", "u1"]
+
+
+def test_stop_drains_the_queue(monkeypatch):
+    batches = []
+    monkeypatch.setattr(event_log, "AsyncSessionLocal", _MemorySession(batches))
+
+    async def main():
+        writer = ChatEventWriter(max_queue=100, batch_size=2, flush_ms=60_000)
+        await writer.start()
+        for i in range(5):
+            writer.submit(_row(i))
+        await asyncio.wait_for(writer.stop(), timeout=2)
+        assert writer._task is None
+        await writer.stop()  # second arrêt sans effet
+
+    asyncio.run(main())
+    assert [len(b) for b in batches] == [2, 2, 1]
+
+
+def test_rows_queued_behind_the_stop_marker_are_drained(monkeypatch):
+    batches = []
+    session = _MemorySession(batches)
+    monkeypatch.setattr(event_log, "AsyncSessionLocal", session)
+
+    async def main():
+        session.gate = asyncio.Event()
+        writer = ChatEventWriter(max_queue=100, batch_size=2, flush_ms=60_000)
+        await writer.start()
+        writer.submit(_row(0))
+        writer.submit(_row(1))
+        await asyncio.sleep(0.01)  # le premier lot est en cours d'insertion
+        stopping = asyncio.create_task(writer.stop())
+        await asyncio.sleep(0.01)  # le marqueur d'arrêt est dans la file
+        writer.submit(_row(2))
+        writer.submit(_row(3))
+        session.gate.set()
+        await asyncio.wait_for(stopping, timeout=2)
+
+    asyncio.run(main())
+    assert [[r["user_hash"] for r in b] for b in batches] == [["u0", "u1"], ["u2", "u3"]]
+
+
+def test_flush_error_drops_the_batch_and_keeps_running(monkeypatch):
+    batches = []
+    session = _MemorySession(batches, fail=True)
+    monkeypatch.setattr(event_log, "AsyncSessionLocal", session)
+    before = _dropped("flush_error")
+
+    async def main():
+        writer = ChatEventWriter(max_queue=100, batch_size=2, flush_ms=60_000)
+        await writer.start()
+        writer.submit(_row(0))
+        writer.submit(_row(1))
+        await _until(lambda: _dropped("flush_error") - before == 2)
+        session.fail = False
+        writer.submit(_row(2))
+        await writer.stop()
+
+    asyncio.run(main())
+    assert [[r["user_hash"] for r in b] for b in batches] == [["u2"]]
+
+
+def test_rows_are_inserted_with_the_async_session(db):
+    from app.db.session import async_engine
+
+    async def main():
+        try:
+            writer = ChatEventWriter(max_queue=100, batch_size=4, flush_ms=20)
+            await writer.start()
+            for i in range(10):
+                writer.submit(_row(i))
+            await writer.stop()
+        finally:
+            await async_engine.dispose()
+
+    asyncio.run(main())
+    rows = db.query(ChatEvent).order_by(ChatEvent.id).all()
+    assert [r.user_hash for r in rows] == [f"u{i}" for i in range(10)]
+    assert all(r.created_at is not None for r in rows)
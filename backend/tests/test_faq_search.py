@@ -0,0 +1,134 @@
+"""L'index FAQ en mémoire (candidats, signaux, reranking NumPy) donne les mêmes résultats,
+dans le même ordre, que l'ancienne recherche SQL LIKE + reranking Python (legacy_search)."""
+import json
+from pathlib import Path
+
+import pytest
+from sqlalchemy import TEXT, cast, or_
+
+import legacy_search
+from app.db.models import FAQItem
+from app.services import signals
+from app.services.faq_index import FAQIndex
+from app.services.router import _faqs_by_ids, _keywords, rank_faq_ids
+
+DATA_DIR = Path(__file__).resolve().parents[2] / "data" / "raw"
+if not (DATA_DIR / "faq_complete.json").exists():
+    pytest.skip("data/raw absent : KB de test indisponible", allow_module_level=True)
+
+EXTRA_QUERIES = [
+    "Quand commence le semestre 2 ?",
+    "les examens du S1 ont lieu quand",
+    "bibliothèque ouverte le samedi ?",
+    "jours fériés et vacances de Noël",
+    "justifier une absence à un examen",
+    "parking vélo campus",
+    "vpn ENT mot de passe oublié",
+    "résto U et cafétéria",
+    "",
+    "???",
+]
+
+
+def _faq_rows() -> list:
+    data = json.loads((DATA_DIR / "faq_complete.json").read_text(encoding="utf-8"))
+    rows = []
+    for cat in data.get("categories", []):
+        for q in cat.get("questions", []):
+            rows.append(FAQItem(
+                faq_id=q["id"],
+                category_id=cat["id"],
+                category_name=cat.get("nom") or cat["id"],
+                question=q["question"],
+                answer=q.get("reponse") or "",
+                tags=q.get("tags") or [],
+                frequency=q.get("frequence") or "moyenne",
+                language="fr",
+            ))
+    return rows
+
+
+def _queries(faqs) -> list:
+    texts = [f.question for f in faqs]
+    texts += [f.question.rstrip(" ?") for f in faqs]  # plus de match exact : mots-clés + reranking
+    texts += [f.question.lower() for f in faqs[::5]]
+    with open(DATA_DIR / "intents.csv", encoding="utf-8") as fh:
+        texts += [line.rsplit(",", 1)[0].strip('"') for line in fh.read().splitlines()[1:]]
+    return list(dict.fromkeys(texts + EXTRA_QUERIES))
+
+
+@pytest.fixture
+def kb(db):
+    # lower() unicode comme PostgreSQL (celui de SQLite ne traite que l'ASCII)
+    db.connection().connection.driver_connection.create_function(
+        "lower", 1, lambda s: s.lower() if s is not None else None, deterministic=True
+    )
+    db.add_all(_faq_rows())
+    db.commit()
+    faqs = db.query(FAQItem).order_by(FAQItem.id).all()
+    return db, FAQIndex.build(faqs, version=1), faqs
+
+
+def _like_ids(db, kws) -> set:
+    """Candidats de l'ancien filtre `LIKE '%kw%'` sur les cinq champs."""
+    base_filter = or_(
+        legacy_search._or_like(FAQItem.question, kws),
+        legacy_search._or_like(FAQItem.answer, kws),
+        legacy_search._or_like(FAQItem.category_name, kws),
+        legacy_search._or_like(FAQItem.category_id, kws),
+        legacy_search._or_like(cast(FAQItem.tags, TEXT), kws),
+    )
+    return {f.id for f in db.query(FAQItem.id).filter(base_filter)}
+
+
+def test_keywords_and_signals_match_the_old_helpers(kb):
+    _, _, faqs = kb
+    texts = _queries(faqs) + [f.answer for f in faqs]
+    for text in texts:
+        assert _keywords(text) == legacy_search._keywords(text), text
+        assert signals.extract_query_signals(text) == legacy_search.extract_query_signals(text), text
+
+
+def test_index_candidates_match_the_like_filter(kb):
+    db, index, faqs = kb
+    # chaque mot-clé des requêtes, des sous-chaînes de mots (LIKE '%kw%' trouve "exam" dans
+    # "examens") et quelques combinaisons (un candidat suffit à un des mots-clés)
+    queries = _queries(faqs)
+    keyword_sets = {(kw,) for q in queries for kw in _keywords(q)}
+    keyword_sets |= {("exam",), ("bib",), ("ent",), ("2024",), ("emploi",), ("inexistant",)}
+    keyword_sets |= {tuple(_keywords(q)) for q in queries[::25]}
+    for kws in sorted(keyword_sets):
+        if kws:
+            assert set(index.candidates(list(kws))) == _like_ids(db, list(kws)), kws
+
+
+# toutes les requêtes pour les options par défaut, une sur quatre pour les autres (durée du test)
+@pytest.mark.parametrize("options, step", [
+    ({}, 1),
+    ({"order_by_frequency": True}, 4),
+    ({"limit": 3}, 4),
+    ({"limit": 1}, 4),
+])
+def test_ranking_matches_the_old_search(kb, options, step):
+    db, index, faqs = kb
+    mismatches = []
+    for query in _queries(faqs)[::step]:
+        old = [f.id for f in legacy_search.search_faq(db, query, **options)]
+        new = [f.id for f in _faqs_by_ids(db, rank_faq_ids(index, query, retriever="keywords", **options))]
+        if old != new:
+            mismatches.append((query, old, new))
+    assert mismatches == []
+
+
+def test_ranking_matches_the_old_search_within_a_category(kb):
+    db, index, faqs = kb
+    mismatches = []
+    for category_id in sorted({f.category_id for f in faqs}):
+        for query in _queries(faqs)[::20]:
+            old = [f.id for f in legacy_search.search_faq(db, query, limit=3, category_id=category_id)]
+            new = [f.id for f in _faqs_by_ids(
+                db, rank_faq_ids(index, query, limit=3, category_id=category_id, retriever="keywords")
+            )]
+            if old != new:
+                mismatches.append((category_id, query, old, new))
+    assert mismatches == []
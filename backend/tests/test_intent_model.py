@@ -0,0 +1,71 @@
+import os
+
+import joblib
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.svm import LinearSVC
+
+from app.nlp.compact import save_compact
+from app.nlp.intent_model import load_faq_model, load_intent_model
+from app.nlp.linear import LinearHead, TfidfFeatures
+
+TEXTS = ["horaires de la bibliothèque", "contacter la scolarité", "mes cours lundi", "examens du semestre"]
+
+
+def _model(labels):
+    vectorizer = TfidfVectorizer().fit(TEXTS)
+    y = [labels[i % 2] for i in range(len(TEXTS))]
+    return {"vectorizer": vectorizer, "clf": LinearSVC().fit(vectorizer.transform(TEXTS), y), "labels": sorted(labels)}
+
+
+def _write_joblib(path, model, mtime):
+    joblib.dump(model, path)
+    os.utime(path, (mtime, mtime))
+
+
+def _write_compact(path, models, mtime):
+    features = TfidfFeatures.from_sklearn(next(iter(models.values()))["vectorizer"])
+    heads = {name: LinearHead.from_sklearn(m["clf"], m["labels"]) for name, m in models.items()}
+    save_compact(str(path), features, heads, 0.0)
+    os.utime(path, (mtime, mtime))
+
+
+def test_fresh_joblib_wins_over_older_mmap(tmp_path):
+    _write_compact(tmp_path / "intent.mmap", {"intent": _model(["old_a", "old_b"])}, mtime=1_000)
+    _write_joblib(tmp_path / "intent.joblib", _model(["new_a", "new_b"]), mtime=2_000)
+
+    assert load_intent_model(tmp_path)["labels"] == ["new_a", "new_b"]
+
+
+def test_mmap_preferred_when_not_older(tmp_path):
+    _write_joblib(tmp_path / "intent.joblib", _model(["old_a", "old_b"]), mtime=1_000)
+    _write_compact(tmp_path / "intent.mmap", {"intent": _model(["new_a", "new_b"])}, mtime=2_000)
+
+    model = load_intent_model(tmp_path)
+    assert model["labels"] == ["new_a", "new_b"]
+    assert "clf" not in model  # servi par le fichier compact
+
+
+def _write_joint(tmp_path, heads, mtime):
+    vectorizer = TfidfVectorizer().fit(TEXTS)
+    X = vectorizer.transform(TEXTS)
+    joint = {"vectorizer": vectorizer, "heads": {}}
+    for name, labels in heads.items():
+        y = [labels[i % 2] for i in range(len(TEXTS))]
+        joint["heads"][name] = {"clf": LinearSVC().fit(X, y), "labels": sorted(labels)}
+    _write_joblib(tmp_path / "nlu.joblib", joint, mtime)
+
+
+def test_plain_retrain_after_joint_is_served(tmp_path):
+    _write_joint(tmp_path, {"intent": ["joint_a", "joint_b"], "faq": ["cat_a", "cat_b"]}, mtime=1_000)
+    _write_joblib(tmp_path / "intent.joblib", _model(["new_a", "new_b"]), mtime=2_000)
+
+    assert load_intent_model(tmp_path)["labels"] == ["new_a", "new_b"]
+    # la tête FAQ n'a pas été ré-entraînée : toujours servie par l'artefact joint
+    assert load_faq_model(tmp_path)["labels"] == ["cat_a", "cat_b"]
+
+
+def test_joint_retrain_after_plain_is_served(tmp_path):
+    _write_joblib(tmp_path / "intent.joblib", _model(["old_a", "old_b"]), mtime=1_000)
+    _write_joint(tmp_path, {"intent": ["joint_a", "joint_b"], "faq": ["cat_a", "cat_b"]}, mtime=2_000)
+
+    assert load_intent_model(tmp_path)["labels"] == ["joint_a", "joint_b"]
@@ -0,0 +1,28 @@
+import asyncio
+
+from app.core.config import settings
+from app.db.models import KBState
+from app.services import kb_version
+from app.services.kb_version import KB_STATE_ID, current_kb_version_async
+
+
+def test_concurrent_async_reads_do_not_block_the_loop(db, monkeypatch):
+    db.add(KBState(id=KB_STATE_ID, version=7))
+    db.commit()
+    monkeypatch.setattr(settings, "KB_VERSION_CHECK_SECONDS", 0)
+    monkeypatch.setattr(kb_version, "_cached_version", None)
+
+    from app.db.session import AsyncSessionLocal, async_engine
+
+    async def one():
+        async with AsyncSessionLocal() as session:
+            return await current_kb_version_async(session)
+
+    async def main():
+        try:
+            # plus de requêtes que de connexions dans le pool
+            return await asyncio.wait_for(asyncio.gather(*(one() for _ in range(40))), timeout=10)
+        finally:
+            await async_engine.dispose()
+
+    assert asyncio.run(main()) == [7] * 40
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.svm import LinearSVC
+
+from app.nlp.compact import load_compact, save_compact
+from app.nlp.linear import LinearHead, LinearTextModel, TfidfFeatures, check_parity
+
+CORPUS = [
+    ("Quels sont les horaires de la bibliothèque ?", "faq"),
+    ("horaires d'ouverture de la BU le samedi", "faq"),
+    ("Je veux joindre la scolarité", "contact"),
+    ("email du responsable du Master IA", "contact"),
+    ("numéro de l'infirmerie du campus", "contact"),
+    ("Quels sont mes cours lundi ?", "timetable"),
+    ("emploi du temps B3 groupe 2 cette semaine", "timetable"),
+    ("où a lieu le cours de machine learning", "timetable"),
+    ("dates des examens du semestre 1", "exam"),
+    ("quand sont les rattrapages d'examens", "exam"),
+]
+TEXTS = [t for t, _ in CORPUS]
+# phrases hors corpus : mots inconnus, répétitions, texte vide
+UNSEEN = ["cours cours cours de machine learning", "Bibliothèque, horaires ?", "xyz inconnu", ""]
+
+
+def _fit(vectorizer_params, labels=None):
+    vectorizer = TfidfVectorizer(**vectorizer_params).fit(TEXTS)
+    y = labels or [label for _, label in CORPUS]
+    clf = LinearSVC().fit(vectorizer.transform(TEXTS), y)
+    return {"vectorizer": vectorizer, "clf": clf, "labels": sorted(set(y))}
+
+
+def _sklearn_scores(model, texts):
+    return model["clf"].decision_function(model["vectorizer"].transform(texts)).reshape(len(texts), -1)
+
+
+@pytest.mark.parametrize("params", [
+    {},
+    {"ngram_range": (1, 2)},
+    {"ngram_range": (1, 2), "min_df": 2, "sublinear_tf": True},
+    {"binary": True, "norm": "l1"},
+    {"use_idf": False, "lowercase": False},
+])
+def test_compiled_scorer_matches_sklearn(params):
+    model = _fit(params)
+    linear = LinearTextModel.from_sklearn(model)
+    texts = TEXTS + UNSEEN
+
+    expected = _sklearn_scores(model, texts)
+    got = np.vstack([linear.scores(t) for t in texts])
+    np.testing.assert_allclose(got, expected, rtol=0, atol=1e-9)
+    assert [model["labels"][i] for i in got.argmax(axis=1)] == list(model["clf"].predict(model["vectorizer"].transform(texts)))
+    assert check_parity(model, linear, texts) == []
+
+
+def test_binary_head_keeps_a_single_score_column():
+    model = _fit({"ngram_range": (1, 2)}, labels=["faq" if label == "faq" else "other" for _, label in CORPUS])
+    linear = LinearTextModel.from_sklearn(model)
+    for text in TEXTS + UNSEEN:
+        assert linear.scores(text).shape == (1,)
+    assert check_parity(model, linear, TEXTS + UNSEEN) == []
+
+
+def test_shared_encoding_gives_the_same_scores_for_every_head():
+    intent = _fit({"ngram_range": (1, 2)})
+    features = TfidfFeatures.from_sklearn(intent["vectorizer"])
+    other = {**intent, "clf": LinearSVC(C=0.1).fit(intent["vectorizer"].transform(TEXTS), [l for _, l in CORPUS])}
+    heads = [LinearTextModel.from_sklearn(m, features=features) for m in (intent, other)]
+
+    for text in TEXTS + UNSEEN:
+        encoded = features.encode(text)
+        for model, head in zip((intent, other), heads):
+            np.testing.assert_allclose(head.scores(encoded), _sklearn_scores(model, [text])[0], rtol=0, atol=1e-9)
+
+
+def test_compact_file_matches_sklearn(tmp_path):
+    model = _fit({"ngram_range": (1, 2), "sublinear_tf": True})
+    path = str(tmp_path / "intent.mmap")
+    save_compact(path, TfidfFeatures.from_sklearn(model["vectorizer"]),
+                 {"intent": LinearHead.from_sklearn(model["clf"], model["labels"])}, 0.0)
+    features, heads, _ = load_compact(path)
+    compact = LinearTextModel(features, heads["intent"])
+
+    texts = TEXTS + UNSEEN
+    got = np.vstack([compact.scores(t) for t in texts])
+    expected = _sklearn_scores(model, texts)
+    np.testing.assert_allclose(got, expected, rtol=0, atol=1e-4)  # coefficients stockés en float32
+    assert (got.argmax(axis=1) == expected.argmax(axis=1)).all()
+
+
+def test_unsupported_vectorizer_is_refused():
+    model = _fit({"strip_accents": "unicode"})
+    with pytest.raises(ValueError):
+        TfidfFeatures.from_sklearn(model["vectorizer"])
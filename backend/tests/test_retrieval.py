@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.db.models import Contact
+from app.services import retrieval
+
+
+def _contact(id, categorie, sous_categorie, formations=None, email=None):
+    return Contact(
+        id=id, categorie_principale=categorie, sous_categorie=sous_categorie, type_contact="personne",
+        formations_public=formations, email=email, nom_complet=f"Contact {id}",
+    )
+
+
+def _retrieve_contacts(monkeypatch, query, es_ids):
+    """retrieve_contacts avec KB_RETRIEVAL=es et un ES simulé qui renvoie `es_ids`."""
+    monkeypatch.setattr(settings, "KB_RETRIEVAL", "es")
+    monkeypatch.setattr(retrieval, "get_es", lambda: None)
+    monkeypatch.setattr(
+        retrieval, "search_kb_by_type",
+        lambda es, query, doc_types, top_k=5: [{"_source": {"db_id": i}} for i in es_ids][:top_k],
+    )
+    from app.db.session import AsyncSessionLocal, async_engine
+
+    async def main():
+        trace: dict = {}
+        try:
+            async with AsyncSessionLocal() as session:
+                rows = await retrieval.retrieve_contacts(session, query, limit=5, trace=trace)
+        finally:
+            await async_engine.dispose()
+        return [c.id for c in rows], trace["path"]
+
+    return asyncio.run(main())
+
+
+def test_es_contacts_keep_the_master_ia_restriction(db, monkeypatch):
+    db.add_all([
+        _contact(1, "Services étudiants", "Vie étudiante", email="vie@esic.fr"),
+        _contact(2, "Responsables pédagogiques", "Master", formations="Master IA", email="ia@esic.fr"),
+        _contact(3, "Responsables pédagogiques", "Bachelor", formations="Bachelor 3 Data"),
+    ])
+    db.commit()
+    # ES classe un contact sans rapport en premier ; seul le responsable du Master IA doit rester
+    assert _retrieve_contacts(monkeypatch, "email du responsable du master ia", [1, 3, 2]) == ([2], "es")
+
+
+def test_es_contacts_keep_the_scolarite_restriction(db, monkeypatch):
+    db.add_all([_contact(1, "Direction", "Accueil"), _contact(2, "Services étudiants", "Scolarite")])
+    db.commit()
+    assert _retrieve_contacts(monkeypatch, "contacter la scolarité", [1, 2]) == ([2], "es")
+
+
+def test_es_contacts_emptied_by_the_filters_fall_back_to_sql(db, monkeypatch):
+    db.add_all([_contact(1, "Direction", "Accueil"), _contact(2, "Services étudiants", "Scolarite")])
+    db.commit()
+    assert _retrieve_contacts(monkeypatch, "contacter la scolarité", [1]) == ([2], "sql")
+
+
+class _FakeMsearch:
+    def __init__(self, ids_by_index, error_index=None):
+        self.ids_by_index = ids_by_index
+        self.error_index = error_index
+        self.calls = []
+
+    def msearch(self, searches):
+        self.calls.append(searches)
+        responses = []
+        for header, body in zip(searches[::2], searches[1::2]):
+            if header["index"] == self.error_index:
+                responses.append({"error": {"type": "index_not_found_exception"}})
+                continue
+            hits = [{"_source": {"db_id": i}} for i in self.ids_by_index.get(header["index"], [])]
+            responses.append({"hits": {"hits": hits[:body["size"]]}})
+        return {"responses": responses}
+
+
+def test_search_kb_multi_sends_one_msearch_on_the_per_type_indices():
+    from app.search.es_search import search_kb_multi
+
+    es = _FakeMsearch({"kb_faq": [1, 2, 3, 4], "kb_contact": [7]})
+    grouped = search_kb_multi(es, "attestation de scolarité", {"faq": (2, 2.5), "contact": (5, 2.5)})
+
+    assert len(es.calls) == 1
+    assert [h["index"] for h in es.calls[0][::2]] == ["kb_faq", "kb_contact"]
+    assert {dt: [h["_source"]["db_id"] for h in hits] for dt, hits in grouped.items()} == {"faq": [1, 2], "contact": [7]}
+
+
+def test_search_kb_multi_fails_as_a_whole_on_a_sub_search_error():
+    from app.search.es_search import search_kb_multi
+
+    with pytest.raises(RuntimeError):
+        search_kb_multi(_FakeMsearch({}, error_index="kb_procedure"), "bourse")
+
+
+def test_retrieve_kb_multi_falls_back_to_sql_when_elasticsearch_fails(db, monkeypatch):
+    db.add_all([_contact(1, "Direction", "Accueil"), _contact(2, "Services étudiants", "Scolarite")])
+    db.commit()
+    monkeypatch.setattr(settings, "KB_RETRIEVAL", "es")
+    monkeypatch.setattr(retrieval, "get_es", lambda: _FakeMsearch({}, error_index="kb_faq"))
+    from app.db.session import AsyncSessionLocal, async_engine
+
+    async def main():
+        trace: dict = {}
+        try:
+            async with AsyncSessionLocal() as session:
+                found = await retrieval.retrieve_kb_multi(session, "contacter la scolarité", trace=trace)
+        finally:
+            await async_engine.dispose()
+        return {dt: [r.id for r in rows] for dt, rows in found.items()}, trace["contact"]["path"]
+
+    assert asyncio.run(main()) == ({"faq": [], "contact": [2], "procedure": []}, "sql")
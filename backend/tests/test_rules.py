@@ -0,0 +1,128 @@
+"""L'automate KeywordMatcher déclenche exactement les règles des anciens tests `motif in texte`
+(ou `texte.startswith(motif)` pour les motifs "^")."""
+import json
+from pathlib import Path
+
+import pytest
+
+from app.nlp.rules import (
+    CHAT_RULE_TABLE,
+    CHAT_RULES,
+    DOC_TYPE_RULE_TABLE,
+    DOC_TYPE_RULES,
+    NORMALIZED_SIGNAL_RULES,
+    NORMALIZED_SIGNAL_TABLE,
+    SERVICE_SIGNAL_RULES,
+    SERVICE_SIGNAL_TABLE,
+    KeywordMatcher,
+)
+from app.services.signals import _normalize
+
+DATA_DIR = Path(__file__).resolve().parents[2] / "data" / "raw"
+
+MESSAGES = [
+    "Comment contacter le service scolarité ?",
+    "comment contacter le service scolarite",
+    "Quel est l'email du responsable de Master IA ?",
+    "responsable du master intelligence artificielle",
+    "Qui est l'enseignant de Machine Learning ?",
+    "Comment joindre l'infirmerie ?",
+    "Numéro d'urgence campus",
+    "Quels sont mes cours lundi ?",
+    "Où se trouve le cours de Machine Learning ?",
+    "Qui enseigne la cybersécurité en B3 ?",
+    "Quand sont les examens de S1 ?",
+    "permanence du responsable de formation",
+    "horaires de la bibliothèque le samedi",
+    "je cherche la biblio",
+    "santé et infirmerie du campus",
+    "où",
+    "où est la cafétéria",
+    "et quel est le planning ?",
+    "le quel",
+    "quel",
+    "mon emploi du temps, mon planning, mes cours",
+    "attestation de scolarité et relevé de notes",
+    "téléphone du service, horaire d'ouverture",
+    "parent urgent : l'ENT est en panne",
+    "semestre 1 et semestre 2, S1 S2, week-end, jour férié, fête du travail",
+    "",
+]
+
+
+def _naive_scan(table, text):
+    hits = set()
+    for rule, patterns in table.items():
+        for pattern in patterns:
+            if pattern.startswith("^"):
+                if pattern[1:] and text.startswith(pattern[1:]):
+                    hits.add(rule)
+            elif pattern in text:
+                hits.add(rule)
+    return hits
+
+
+def _corpus():
+    texts = list(MESSAGES)
+    if (DATA_DIR / "intents.csv").exists():
+        with open(DATA_DIR / "intents.csv", encoding="utf-8") as fh:
+            texts += [line.rsplit(",", 1)[0].strip('"') for line in fh.read().splitlines()[1:]]
+    if (DATA_DIR / "faq_complete.json").exists():
+        data = json.loads((DATA_DIR / "faq_complete.json").read_text(encoding="utf-8"))
+        for cat in data.get("categories", []):
+            for q in cat.get("questions", []):
+                texts += [q["question"], q.get("reponse") or ""]
+    return texts
+
+
+@pytest.mark.parametrize("matcher, table, prepare", [
+    (CHAT_RULES, CHAT_RULE_TABLE, str.lower),
+    (NORMALIZED_SIGNAL_RULES, NORMALIZED_SIGNAL_TABLE, _normalize),
+    (SERVICE_SIGNAL_RULES, SERVICE_SIGNAL_TABLE, str.lower),
+    (DOC_TYPE_RULES, DOC_TYPE_RULE_TABLE, _normalize),
+])
+def test_rule_tables_match_substring_checks(matcher, table, prepare):
+    for text in _corpus():
+        t = prepare(text)
+        assert matcher.scan(t) == _naive_scan(table, t), t
+
+
+def test_accented_and_unaccented_patterns():
+    assert "scolarite" in CHAT_RULES.scan("comment contacter la scolarité ?")
+    assert "scolarite" in CHAT_RULES.scan("comment contacter la scolarite ?")
+    assert {"sante", "bibliotheque"} <= CHAT_RULES.scan("santé à la bibliothèque")
+    # le texte normalisé n'a plus d'accents : seuls les motifs sans accent y répondent
+    assert NORMALIZED_SIGNAL_RULES.scan(_normalize("Jours fériés")) == {"topic_feries"}
+    assert "has_feries" in NORMALIZED_SIGNAL_RULES.scan("jour férié")
+
+
+def test_overlapping_patterns_all_fire():
+    rules = CHAT_RULES.scan("quels sont mes cours lundi")
+    assert {"timetable_phrase", "mes_cours", "timetable_context", "generic_prefix"} <= rules
+    rules = CHAT_RULES.scan("quand sont les examens de s1")
+    assert {"timetable_phrase", "examens_s1", "generic_prefix"} <= rules
+    # motif contenu dans un autre ("infirmerie" déclenche deux règles, "ia" n'y est pas)
+    assert CHAT_RULES.scan("infirmerie") == {"service_only", "sante"}
+    # sous-chaîne d'un mot, comme `in` : "ent" dans "parent"
+    assert SERVICE_SIGNAL_RULES.scan("parent") == {"has_ent"}
+
+
+def test_failure_links_report_suffix_matches():
+    matcher = KeywordMatcher({"he": ("he",), "she": ("she",), "his_hers": ("his", "hers")})
+    assert matcher.scan("ushers") == {"he", "she", "his_hers"}
+    assert matcher.scan("hishe") == {"he", "she", "his_hers"}
+    assert matcher.scan("sh") == set()
+
+
+def test_anchored_patterns_only_match_at_the_start():
+    matcher = KeywordMatcher({"start": ("^ab",), "anywhere": ("ab",)})
+    assert matcher.scan("abab") == {"start", "anywhere"}
+    assert matcher.scan("cab") == {"anywhere"}
+    assert "generic_prefix" in CHAT_RULES.scan("quel est le planning")
+    assert "generic_prefix" not in CHAT_RULES.scan("et quel est le planning")
+    assert "generic_prefix" not in CHAT_RULES.scan("quel")  # le motif est "quel "
+
+
+def test_empty_text():
+    assert CHAT_RULES.scan("") == set()
+    assert CHAT_RULES.scan(None) == set()
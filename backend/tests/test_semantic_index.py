@@ -0,0 +1,69 @@
+import hashlib
+import os
+
+import numpy as np
+
+from app.core.config import settings
+from app.db.models import FAQItem, Procedure
+from app.nlp.semantic import get_semantic_index
+from app.services import semantic_index
+from app.services.router import _retriever
+from app.services.semantic_index import refresh_semantic_index
+
+
+def _fake_encode(texts, model=None):
+    """Vecteurs normalisés déterministes (sans sentence-transformers)."""
+    rows = []
+    for t in texts:
+        seed = int.from_bytes(hashlib.sha1(t.encode("utf-8")).digest()[:4], "little")
+        v = np.random.default_rng(seed).normal(size=16).astype(np.float32)
+        rows.append(v / np.linalg.norm(v))
+    return np.vstack(rows)
+
+
+def _faq() -> FAQItem:
+    return FAQItem(faq_id="f1", category_id="services", category_name="Services",
+                   question="Horaires de la bibliothèque ?", answer="8h-20h", frequency="moyenne")
+
+
+def _setup(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "SEMANTIC_INDEX_PATH", str(tmp_path / "semantic.idx"))
+    monkeypatch.setattr(settings, "SEMANTIC_STORE_PATH", str(tmp_path / "embeddings.store"))
+    monkeypatch.setattr(semantic_index, "encode_texts", _fake_encode)
+
+
+def test_refresh_writes_the_index(db, monkeypatch, tmp_path):
+    _setup(monkeypatch, tmp_path)
+    db.add_all([
+        _faq(),
+        Procedure(title="Inscription pédagogique", summary="En ligne sur l'ENT"),
+    ])
+    db.commit()
+
+    stats = refresh_semantic_index(db)
+    assert stats["counts"] == {"faq": 1, "procedure": 1}
+    index = get_semantic_index()
+    assert len(index) == 2 and index.matrix.shape == (2, 16)
+
+
+def test_refresh_removes_the_index_when_the_kb_is_empty(db, monkeypatch, tmp_path):
+    _setup(monkeypatch, tmp_path)
+    db.add(_faq())
+    db.commit()
+    refresh_semantic_index(db)
+    assert get_semantic_index() is not None
+
+    db.query(FAQItem).delete()
+    db.commit()
+    stats = refresh_semantic_index(db)
+
+    assert "counts" not in stats and stats["dropped"] == 1
+    # plus d'anciens embeddings servis : l'index et le store ont disparu, retour aux mots-clés
+    assert not os.path.exists(settings.SEMANTIC_INDEX_PATH)
+    assert not os.path.exists(settings.SEMANTIC_STORE_PATH)
+    assert get_semantic_index() is None
+    assert _retriever("semantic") == "keywords"
+
+    # un second passage sur une base vide ne casse rien
+    refresh_semantic_index(db)
+    assert get_semantic_index() is None
@@ -7,6 +7,7 @@ sys.path.append("/app")
 
 from sqlalchemy.orm import Session
 from app.db.session import SessionLocal
+from app.services.kb_version import bump_kb_version
 from app.db.models import Contact
 
 RAW_PATH = os.getenv("CONTACTS_PATH", "/data/raw/annuaire_contacts.json")
@@ -200,6 +201,7 @@ def main():
         for root_key, root_value in data.items():
             _ingest_node(db, root_value, root_key=root_key, current_service=None, current_formation=None, current_hours=None,)
 
+        bump_kb_version(db)
         db.commit()
 
         inserted_after = db.query(Contact).count()
@@ -7,6 +7,8 @@ sys.path.append("/app")  # backend est monté sur /app dans le container
 
 from sqlalchemy.orm import Session
 from app.db.session import SessionLocal
+from app.services.kb_version import bump_kb_version
+from app.services.semantic_index import refresh_semantic_index, semantic_index_enabled
 from app.db.models import FAQItem
 
 RAW_PATH = os.getenv("FAQ_PATH", "/data/raw/faq_complete.json")
@@ -64,9 +66,19 @@ def main():
                 db.add(item)
                 inserted += 1
 
+        bump_kb_version(db)
         db.commit()
         print(f"[OK] FAQ inserted: {inserted} | file: {RAW_PATH}")
 
+        # embeddings : seuls les documents nouveaux ou modifiés passent dans l'encodeur
+        if semantic_index_enabled():
+            try:
+                stats = refresh_semantic_index(db)
+                print(f"[OK] semantic index refreshed: {stats['embedded']} embedded, "
+                      f"{stats['reused']} reused, {stats['dropped']} dropped")
+            except ImportError as exc:
+                print(f"[WARN] semantic index not refreshed: {exc}")
+
     finally:
         db.close()
 
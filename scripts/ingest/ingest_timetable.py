@@ -10,6 +10,7 @@ sys.path.append("/app")
 
 from sqlalchemy.orm import Session
 from app.db.session import SessionLocal
+from app.services.kb_version import bump_kb_version
 from app.db.models import TimetableSlot
 
 CSV_PATH = Path(os.getenv("TIMETABLE_PATH", "/data/raw/emploi_du_temps_exclusive.csv"))
@@ -163,6 +164,7 @@ def main(csv_path: Path = CSV_PATH):
             db.add(slot)
             inserted += 1
 
+        bump_kb_version(db)
         db.commit()
         print(f"[OK] Inserted timetable slots: {inserted}")
         apply_exam_dates_from_json(db)
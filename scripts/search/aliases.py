@@ -0,0 +1,130 @@
+import time
+from typing import Dict, List
+
+from elasticsearch import Elasticsearch
+
+# Un index physique versionné par type de document (kb_<doc_type>-<horodatage>), derrière
+# l'alias kb_<doc_type> interrogé par l'API (app.search.es_client.index_for). L'alias
+# global kb_docs regroupe les index courants de tous les types (recherche sans type).
+ALIAS = "kb_docs"
+DOC_TYPES = ("faq", "procedure", "contact", "timetable")
+
+# Anciens index conservés après bascule (retour arrière possible)
+KEEP_PREVIOUS = 1
+
+ANALYSIS = {
+    "analyzer": {
+        "fr_analyzer": {
+            "type": "custom",
+            "tokenizer": "standard",
+            "filter": ["lowercase", "asciifolding"]
+        }
+    }
+}
+
+# Les emplois du temps grossissent avec les semaines et les groupes : deux shards et un
+# refresh espacé (chargés en masse). Les autres types restent petits : un shard, et un
+# refresh court pour la FAQ et les contacts, modifiés au fil de l'eau.
+INDEX_SETTINGS: Dict[str, Dict[str, object]] = {
+    "faq": {"number_of_shards": 1, "refresh_interval": "1s"},
+    "procedure": {"number_of_shards": 1, "refresh_interval": "5s"},
+    "contact": {"number_of_shards": 1, "refresh_interval": "1s"},
+    "timetable": {"number_of_shards": 2, "refresh_interval": "30s"},
+}
+
+_COMMON_PROPERTIES = {
+    "doc_type": {"type": "keyword"},   # constant dans un index, gardé pour les boosts et kb_docs
+    "db_id": {"type": "integer"},
+    "title": {"type": "text", "analyzer": "fr_analyzer"},
+    "content": {"type": "text", "analyzer": "fr_analyzer"},
+    "tags": {"type": "keyword"},
+    "language": {"type": "keyword"},
+    "content_hash": {"type": "keyword", "index": False},  # lu au scan incrémental, jamais cherché
+}
+
+_EXTRA_PROPERTIES = {
+    "faq": {
+        "category_id": {"type": "keyword"},
+        "category_name": {"type": "keyword"},
+        "frequency": {"type": "keyword"},
+    },
+    # libellés courts et répétés : pas de normes de longueur sur le titre
+    "timetable": {"title": {"type": "text", "analyzer": "fr_analyzer", "norms": False}},
+}
+
+
+def type_alias(doc_type: str) -> str:
+    return f"kb_{doc_type}"
+
+
+def mapping(doc_type: str) -> dict:
+    # dynamic false : un champ non déclaré reste dans _source sans être indexé
+    return {
+        "settings": {"analysis": ANALYSIS, "index": dict(INDEX_SETTINGS[doc_type])},
+        "mappings": {
+            "dynamic": False,
+            "properties": {**_COMMON_PROPERTIES, **_EXTRA_PROPERTIES.get(doc_type, {})},
+        },
+    }
+
+
+def new_index_name(doc_type: str) -> str:
+    return f"{type_alias(doc_type)}-{time.strftime('%Y%m%d%H%M%S')}"
+
+
+def create_versioned_index(es: Elasticsearch, doc_type: str, loading: bool = False) -> str:
+    """Crée un index physique vide ; `loading` : sans refresh ni réplique (chargement en masse)."""
+    name = new_index_name(doc_type)
+    body = mapping(doc_type)
+    if loading:
+        body["settings"]["index"].update(refresh_interval="-1", number_of_replicas=0)
+    es.indices.create(index=name, **body)
+    return name
+
+
+def finish_loading(es: Elasticsearch, name: str, doc_type: str) -> None:
+    """Rétablit le refresh du type et les répliques par défaut puis rend les documents visibles."""
+    refresh_interval = INDEX_SETTINGS[doc_type]["refresh_interval"]
+    es.indices.put_settings(index=name, settings={"index": {"refresh_interval": refresh_interval,
+                                                            "number_of_replicas": None}})
+    es.indices.refresh(index=name)
+
+
+def alias_targets(es: Elasticsearch, alias: str) -> List[str]:
+    if not es.indices.exists_alias(name=alias):
+        return []
+    return sorted(es.indices.get_alias(name=alias).keys())
+
+
+def swap_aliases(es: Elasticsearch, new_indices: Dict[str, str], keep_previous: int = KEEP_PREVIOUS) -> List[str]:
+    """Bascule les alias des types de `new_indices` ({doc_type: index}) et kb_docs en une seule
+    requête _aliases : l'API voit l'ancien ou le nouvel ensemble, jamais un mélange.
+
+    Les index d'avant le découpage par type (kb_docs physique ou kb_docs-*) sont supprimés
+    dans la même requête. Les versions au-delà de `keep_previous` sont supprimées ensuite.
+    Renvoie les index supprimés.
+    """
+    actions = []
+    for doc_type, index in new_indices.items():
+        for old in alias_targets(es, type_alias(doc_type)):
+            actions.append({"remove": {"index": old, "alias": type_alias(doc_type)}})
+            actions.append({"remove": {"index": old, "alias": ALIAS}})
+        actions.append({"add": {"index": index, "alias": type_alias(doc_type)}})
+        actions.append({"add": {"index": index, "alias": ALIAS}})
+
+    legacy = set(es.indices.get(index=f"{ALIAS}-*").keys())
+    if es.indices.exists(index=ALIAS) and not es.indices.exists_alias(name=ALIAS):
+        legacy.add(ALIAS)
+    actions.extend({"remove_index": {"index": name}} for name in sorted(legacy))
+    es.indices.update_aliases(actions=actions)
+
+    dropped = sorted(legacy)
+    for doc_type, index in new_indices.items():
+        versions = sorted(
+            (name for name in es.indices.get(index=f"{type_alias(doc_type)}-*").keys() if name != index),
+            reverse=True,
+        )
+        for name in versions[keep_previous:]:
+            es.indices.delete(index=name)
+            dropped.append(name)
+    return dropped
@@ -1,38 +1,28 @@
+import os
+
 from elasticsearch import Elasticsearch
 
-ES_URL = "http://elasticsearch:9200"
-INDEX = "kb_docs"
+from aliases import ALIAS, DOC_TYPES, alias_targets, create_versioned_index, swap_aliases, type_alias
+
+ES_URL = os.getenv("ELASTIC_URL", "http://elasticsearch:9200")
 
-MAPPING = {
-    "settings": {
-        "analysis": {
-            "analyzer": {
-                "fr_analyzer": {
-                    "type": "custom",
-                    "tokenizer": "standard",
-                    "filter": ["lowercase", "asciifolding"]
-                }
-            }
-        }
-    },
-    "mappings": {
-        "properties": {
-            "doc_type": {"type": "keyword"},   # faq / procedure / contact
-            "db_id": {"type": "integer"},
-            "title": {"type": "text", "analyzer": "fr_analyzer"},
-            "content": {"type": "text", "analyzer": "fr_analyzer"},
-            "tags": {"type": "keyword"},
-            "language": {"type": "keyword"}
-        }
-    }
-}
 
 def main():
+    # Premier déploiement seulement : un index versionné vide par type, derrière les alias.
+    # Les réindexations passent par index_from_db.py (nouveaux index + bascule atomique).
     es = Elasticsearch(ES_URL)
-    if es.indices.exists(index=INDEX):
-        es.indices.delete(index=INDEX)
-    es.indices.create(index=INDEX, body=MAPPING)
-    print(f"[OK] Created index: {INDEX}")
+    missing = [dt for dt in DOC_TYPES if not alias_targets(es, type_alias(dt))]
+    if not missing:
+        print(f"[INFO] Aliases {', '.join(type_alias(dt) for dt in DOC_TYPES)} already exist, nothing to do")
+        return
+    if len(missing) == len(DOC_TYPES) and es.indices.exists(index=ALIAS):
+        # index unique d'avant le découpage par type : remplacé à la prochaine indexation complète
+        print(f"[INFO] {ALIAS} already holds documents, run index_from_db.py to migrate to per-type indices")
+        return
+    created = {dt: create_versioned_index(es, dt) for dt in missing}
+    swap_aliases(es, created)
+    for dt, name in created.items():
+        print(f"[OK] Created index {name} behind alias {type_alias(dt)}")
 
 if __name__ == "__main__":
     main()
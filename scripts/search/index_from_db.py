@@ -1,15 +1,33 @@
+import argparse
+import hashlib
+import itertools
+import json
+import os
 import sys
+import time
+from collections import Counter
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
 sys.path.append("/app")
 
 from elasticsearch import Elasticsearch
-from elasticsearch.helpers import bulk
+from elasticsearch.helpers import parallel_bulk, scan
 from sqlalchemy.orm import Session
 
 from app.db.session import SessionLocal
 from app.db.models import FAQItem, Procedure, Contact, TimetableSlot  # <-- import ajouté
 
-ES_URL = "http://elasticsearch:9200"
-INDEX = "kb_docs"
+from aliases import DOC_TYPES, alias_targets, create_versioned_index, finish_loading, swap_aliases, type_alias
+
+ES_URL = os.getenv("ELASTIC_URL", "http://elasticsearch:9200")
+
+# (doc_type, db_id, _source)
+Doc = Tuple[str, int, Dict[str, Any]]
+
+# Indexation en flux : curseur serveur (yield_per) -> générateur d'actions -> parallel_bulk.
+# La mémoire reste bornée (yield_per lignes + thread_count x chunk_size actions en vol).
+YIELD_PER = int(os.getenv("INDEX_YIELD_PER", "1000"))
+CHUNK_SIZE = int(os.getenv("INDEX_CHUNK_SIZE", "500"))
+THREAD_COUNT = int(os.getenv("INDEX_THREADS", "4"))
 
 
 def buid_faq_content(f: FAQItem) -> str:
@@ -95,87 +113,216 @@ def build_timetable_content(t: TimetableSlot) -> str:
     return " ".join(p for p in parts if p)
 
 
+def faq_docs(db: Session) -> Iterator[Doc]:
+    for item in db.query(FAQItem).yield_per(YIELD_PER):
+        yield "faq", item.id, {
+            "doc_type": "faq",
+            "db_id": item.id,
+            "title": item.question,
+            "content": buid_faq_content(item),
+            "tags": item.tags or [],
+            "category_id": item.category_id,
+            "category_name": item.category_name,
+            "frequency": item.frequency,
+            "language": item.language or "fr",
+        }
+
+
+def procedure_docs(db: Session) -> Iterator[Doc]:
+    for p in db.query(Procedure).yield_per(YIELD_PER):
+        yield "procedure", p.id, {
+            "doc_type": "procedure",
+            "db_id": p.id,
+            "title": p.title,
+            "content": build_procedure_content(p),
+            "tags": [],
+            "language": p.language or "fr",
+        }
+
+
+def contact_docs(db: Session) -> Iterator[Doc]:
+    for c in db.query(Contact).yield_per(YIELD_PER):
+        yield "contact", c.id, {
+            "doc_type": "contact",
+            "db_id": c.id,
+            "title": c.nom_complet or c.sous_categorie or c.categorie_principale,
+            "content": build_contact_content(c),
+            "tags": [],
+            "language": "fr",
+        }
+
+
+def timetable_docs(db: Session) -> Iterator[Doc]:
+    for t in db.query(TimetableSlot).yield_per(YIELD_PER):
+        yield "timetable", t.id, {
+            "doc_type": "timetable",
+            "db_id": t.id,
+            "title": t.subject_name or t.subject_code or "",
+            "content": build_timetable_content(t),
+            "tags": [t.program, t.group_name] if t.program or t.group_name else [],
+            "language": "fr",
+        }
+
+
+def iter_docs(db: Session) -> Iterator[Doc]:
+    # FAQ, procédures, contacts, emplois du temps
+    for gen in (faq_docs, procedure_docs, contact_docs, timetable_docs):
+        yield from gen(db)
+
+
+def doc_id(doc_type: str, db_id: int) -> str:
+    # _id déterministe : une ligne de la base = un document, réécrit sur place
+    return f"{doc_type}-{db_id}"
+
+
+def content_hash(source: Dict[str, Any]) -> str:
+    payload = json.dumps(source, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def index_actions(
+    docs: Iterator[Doc],
+    indices: Dict[str, str],
+    known: Optional[Dict[str, str]] = None,
+    seen: Optional[Set[str]] = None,
+    stats: Optional[Counter] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Actions `index` routées vers l'index de leur type ({doc_type: index}) ; avec `known`
+    (_id -> empreinte déjà indexée), les documents inchangés sont sautés."""
+    for doc_type, db_id, source in docs:
+        _id = doc_id(doc_type, db_id)
+        digest = content_hash(source)
+        if seen is not None:
+            seen.add(_id)
+        if known is not None and known.get(_id) == digest:
+            if stats is not None:
+                stats["unchanged"] += 1
+            continue
+        yield {"_op_type": "index", "_index": indices[doc_type], "_id": _id,
+               "_source": {**source, "content_hash": digest}}
+
+
+def delete_actions(known: Dict[str, str], owners: Dict[str, str], seen: Set[str]) -> Iterator[Dict[str, Any]]:
+    # évalué après index_actions (chaîné derrière) : `seen` est alors complet
+    for _id in sorted(set(known) - seen):
+        yield {"_op_type": "delete", "_index": owners[_id], "_id": _id}
+
+
+def indexed_hashes(es: Elasticsearch, index: str) -> Dict[str, str]:
+    """_id -> content_hash des documents de l'index (les documents sans empreinte seront réindexés)."""
+    hits = scan(es, index=index, query={"query": {"match_all": {}}}, _source=["content_hash"], size=YIELD_PER)
+    return {h["_id"]: (h.get("_source") or {}).get("content_hash", "") for h in hits}
+
+
+def bulk_index(es: Elasticsearch, actions: Iterator[Dict[str, Any]], chunk_size: int, thread_count: int) -> Counter:
+    """Envoie les actions par lots en parallèle ; compte les succès et les échecs."""
+    stats: Counter = Counter()
+    results = parallel_bulk(
+        es,
+        actions,
+        thread_count=thread_count,
+        chunk_size=chunk_size,
+        queue_size=thread_count,
+        raise_on_error=False,
+        raise_on_exception=False,
+    )
+    for ok, info in results:
+        if ok:
+            stats["deleted" if "delete" in info else "indexed"] += 1
+        else:
+            stats["errors"] += 1
+            if stats["errors"] <= 5:
+                print(f"[WARN] bulk error: {info}")
+    return stats
+
+
+def full_reindex(es: Elasticsearch, db: Session, chunk_size: int, thread_count: int) -> Counter:
+    """Nouveaux index versionnés (un par type) chargés à part, puis bascule atomique des alias."""
+    indices: Dict[str, str] = {}
+    try:
+        for doc_type in DOC_TYPES:
+            # sans refresh ni réplique pendant le chargement
+            indices[doc_type] = create_versioned_index(es, doc_type, loading=True)
+        print(f"[INFO] Loading {', '.join(indices.values())}")
+        stats = bulk_index(es, index_actions(iter_docs(db), indices), chunk_size, thread_count)
+        for doc_type, index in indices.items():
+            finish_loading(es, index, doc_type)
+    except BaseException:
+        for index in indices.values():
+            es.indices.delete(index=index, ignore_unavailable=True)
+        raise
+
+    if stats["errors"]:
+        # les alias restent sur les index précédents, complets
+        for index in indices.values():
+            es.indices.delete(index=index)
+        print("[ERROR] New indices dropped, aliases left unchanged")
+        return stats
+    dropped = swap_aliases(es, indices)
+    for doc_type, index in indices.items():
+        print(f"[OK] Alias {type_alias(doc_type)} -> {index}")
+    if dropped:
+        print(f"[INFO] Dropped {', '.join(dropped)}")
+    return stats
+
+
+def incremental_update(es: Elasticsearch, db: Session, chunk_size: int, thread_count: int) -> Counter:
+    """Réindexe sur place les documents nouveaux ou modifiés (empreinte) et supprime ceux des lignes disparues."""
+    indices: Dict[str, str] = {}
+    for doc_type in DOC_TYPES:
+        targets = alias_targets(es, type_alias(doc_type))
+        if len(targets) != 1:
+            raise SystemExit(f"[ERROR] Alias {type_alias(doc_type)} must point to exactly one index "
+                             f"(found {targets}), run a full reindex")
+        indices[doc_type] = targets[0]
+
+    known: Dict[str, str] = {}
+    owners: Dict[str, str] = {}
+    for index in indices.values():
+        hashes = indexed_hashes(es, index)
+        known.update(hashes)
+        owners.update(dict.fromkeys(hashes, index))
+    seen: Set[str] = set()
+    skipped: Counter = Counter()
+    # index en service : le refresh reste actif, un refresh final rend tout visible
+    actions = itertools.chain(
+        index_actions(iter_docs(db), indices, known=known, seen=seen, stats=skipped),
+        delete_actions(known, owners, seen),
+    )
+    stats = bulk_index(es, actions, chunk_size, thread_count)
+    es.indices.refresh(index=",".join(indices.values()))
+    stats["unchanged"] = skipped["unchanged"]
+    return stats
+
+
 def main():
-    es = Elasticsearch(ES_URL)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--threads", type=int, default=THREAD_COUNT)
+    parser.add_argument("--incremental", action="store_true",
+                        help="update the live indices in place instead of building new versions")
+    args = parser.parse_args()
+
+    es = Elasticsearch(ES_URL, request_timeout=60)
     db: Session = SessionLocal()
 
+    start = time.perf_counter()
     try:
-        actions = []
-
-        # FAQ
-        for item in db.query(FAQItem).all():
-            content = buid_faq_content(item)
-            actions.append({
-                "_op_type": "index",
-                "_index": INDEX,
-                "_source": {
-                    "doc_type": "faq",
-                    "db_id": item.id,
-                    "title": item.question,
-                    "content": content,
-                    "tags": item.tags or [],
-                    "category_id": item.category_id,
-                    "category_name": item.category_name,
-                    "frequency": item.frequency,
-                    "language": item.language or "fr",
-                },
-            })
-
-        # Procédures
-        for p in db.query(Procedure).all():
-            content = build_procedure_content(p)
-            actions.append({
-                "_op_type": "index",
-                "_index": INDEX,
-                "_source": {
-                    "doc_type": "procedure",
-                    "db_id": p.id,
-                    "title": p.title,
-                    "content": content,
-                    "tags": [],
-                    "language": p.language or "fr",
-                },
-            })
-
-        # Contacts
-        for c in db.query(Contact).all():
-            content = build_contact_content(c)
-            actions.append({
-                "_op_type": "index",
-                "_index": INDEX,
-                "_source": {
-                    "doc_type": "contact",
-                    "db_id": c.id,
-                    "title": c.nom_complet or c.sous_categorie or c.categorie_principale,
-                    "content": content,
-                    "tags": [],
-                    "language": "fr",
-                },
-            })
-
-        # Emplois du temps
-        for t in db.query(TimetableSlot).all():
-            content = build_timetable_content(t)
-            actions.append({
-                "_op_type": "index",
-                "_index": INDEX,
-                "_source": {
-                    "doc_type": "timetable",
-                    "db_id": t.id,
-                    "title": t.subject_name or t.subject_code or "",
-                    "content": content,
-                    "tags": [t.program, t.group_name] if t.program or t.group_name else [],
-                    "language": "fr",
-                },
-            })
-
-        if actions:
-            bulk(es, actions, refresh=True)
-        print(f"[OK] Indexed docs: {len(actions)}")
-
+        run = incremental_update if args.incremental else full_reindex
+        stats = run(es, db, args.chunk_size, args.threads)
     finally:
         db.close()
 
+    elapsed = time.perf_counter() - start
+    rate = stats["indexed"] / elapsed if elapsed > 0 else 0.0
+    print(f"[OK] Indexed docs: {stats['indexed']} in {elapsed:.1f}s ({rate:.0f} docs/s, "
+          f"chunk size {args.chunk_size}, {args.threads} threads)")
+    if args.incremental:
+        print(f"[OK] Unchanged: {stats['unchanged']}, deleted: {stats['deleted']}")
+    if stats["errors"]:
+        print(f"[ERROR] {stats['errors']} documents failed to index")
+        sys.exit(1)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,94 @@
+import io
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import joblib
+import numpy as np
+
+# Répertoire surveillé par app.nlp.registry (MODELS_DIR côté API)
+OUT_DIR = os.getenv("MODELS_DIR", "/app/app/nlp/models")
+
+# Budget d'inférence : un modèle plus lent (p95 par message, scoreur compilé) ou plus
+# gros est rejeté et l'artefact en place n'est pas remplacé.
+LATENCY_BUDGET_US = float(os.getenv("INTENT_LATENCY_BUDGET_US", "1000"))
+SIZE_BUDGET_BYTES = int(os.getenv("INTENT_SIZE_BUDGET_BYTES", str(5 * 1024 * 1024)))
+
+def dump_atomic(payload, path: str):
+    """Écrit l'artefact dans un fichier temporaire puis le renomme : l'API qui surveille
+    le répertoire ne voit jamais un fichier à moitié écrit."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-", suffix=".joblib")
+    os.close(fd)
+    try:
+        joblib.dump(payload, tmp)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+def model_footprint(payload, linear, texts: list[str], sample: int = 500) -> dict:
+    """Latence d'inférence par message (scoreur compilé, comme à l'API) et taille sérialisée,
+    enregistrées dans les métadonnées de l'artefact."""
+    buf = io.BytesIO()
+    joblib.dump(payload, buf)
+
+    timings = []
+    for text in texts[:sample]:
+        t0 = time.perf_counter()
+        linear.scores(text)
+        timings.append(time.perf_counter() - t0)
+    timings_us = np.array(timings or [0.0]) * 1e6
+    return {
+        "trained_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "latency_p50_us": float(np.percentile(timings_us, 50)),
+        "latency_p95_us": float(np.percentile(timings_us, 95)),
+        "size_bytes": buf.getbuffer().nbytes,
+        "n_features": linear.features.n_features,
+    }
+
+def within_budget(footprint: dict, path: str) -> bool:
+    """Contrôle du budget d'inférence ; affiche la raison du rejet."""
+    if footprint["latency_p95_us"] <= LATENCY_BUDGET_US and footprint["size_bytes"] <= SIZE_BUDGET_BYTES:
+        return True
+    print(f"[ERROR] model rejected: budget is p95 <= {LATENCY_BUDGET_US:.0f} us and "
+          f"size <= {SIZE_BUDGET_BYTES} bytes, {path} left unchanged")
+    return False
+
+# Termes dont tous les coefficients sont sous ce seuil : retirés du fichier compact.
+# Désactivé par défaut (un terme retiré ne compte plus dans la norme TF-IDF) ;
+# appliqué seulement si la parité labels + scores tient, sinon export complet.
+PRUNE_BELOW = float(os.getenv("COMPACT_PRUNE_BELOW", "0"))
+
+def export_compact(path: str, models: dict, texts: list[str], prune_below: float = PRUNE_BELOW):
+    """Exporte {tête: {"vectorizer", "clf", "labels"}} (même vectorizer) au format mmap
+    chargé en priorité par l'API, après contrôle de parité (labels + scores) sur `texts`."""
+    from app.nlp.compact import compact_parity, save_compact
+    from app.nlp.linear import LinearHead, LinearTextModel, TfidfFeatures
+
+    features = TfidfFeatures.from_sklearn(next(iter(models.values()))["vectorizer"])
+    heads = {name: LinearHead.from_sklearn(m["clf"], m["labels"]) for name, m in models.items()}
+    reference = {name: LinearTextModel(features, head) for name, head in heads.items()}
+
+    # fichier de travail hors de MODEL_FILES : le registre ne voit que la version validée
+    staging = f"{path}.staging"
+    header = save_compact(staging, features, heads, prune_below)
+    bad = compact_parity(staging, reference, texts)
+    if prune_below > 0 and any(bad.values()):
+        print(f"[WARN] pruning below {prune_below} changes scores, exporting the full vocabulary")
+        header = save_compact(staging, features, heads, 0.0)
+        bad = compact_parity(staging, reference, texts)
+    if any(bad.values()):
+        os.unlink(staging)
+        # le .joblib vient d'être réécrit : l'ancien .mmap ne doit pas rester servi à sa place
+        if os.path.exists(path):
+            os.unlink(path)
+        print(f"[ERROR] compact model disagrees with the reference: { {k: len(v) for k, v in bad.items()} }, "
+              f"{path} removed")
+        sys.exit(1)
+
+    os.replace(staging, path)
+    print(f"[OK] compact model saved: {path} "
+          f"({header['n_terms']} terms, {header['pruned_terms']} pruned, {os.path.getsize(path)} bytes)")
@@ -0,0 +1,73 @@
+import argparse
+import sys
+import time
+sys.path.append("/app")
+
+import numpy as np
+
+from app.core.config import settings
+from app.nlp.ann import IVFIndex, exact_search, recall_at_k
+
+# Rappel@k et latence de l'index IVF face à la recherche exacte (force brute).
+# Requêtes : passages de l'index bruités (paraphrases simulées), pas besoin d'encodeur.
+# --synthetic N : corpus synthétique en grappes, pour estimer le comportement à N passages.
+
+def synthetic_corpus(n: int, dim: int, clusters: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    x = centers[rng.integers(0, clusters, n)] + 2.0 * rng.standard_normal((n, dim)).astype(np.float32)
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+def make_queries(vectors: np.ndarray, n: int, noise: float, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    q = vectors[rng.choice(len(vectors), n, replace=False)].astype(np.float32)
+    q = q + noise * rng.standard_normal(q.shape).astype(np.float32) / np.sqrt(q.shape[1])
+    return q / np.linalg.norm(q, axis=1, keepdims=True)
+
+def timed(fn, queries):
+    results, timings = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        results.append(fn(q)[0])
+        timings.append(time.perf_counter() - t0)
+    us = np.array(timings) * 1e6
+    return results, np.percentile(us, 50), np.percentile(us, 95)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--synthetic", type=int, default=0, help="nombre de passages synthétiques")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--nlist", type=int, default=0)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.5)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", default="1,2,4,8,16,32")
+    parser.add_argument("--int8", action="store_true")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        vectors = synthetic_corpus(args.synthetic, args.dim, clusters=max(10, args.synthetic // 100))
+        ids = np.arange(len(vectors), dtype=np.int64)
+        t0 = time.perf_counter()
+        index = IVFIndex.build(vectors, ids, nlist=args.nlist or None, quantize=args.int8)
+        print(f"[INFO] synthetic corpus: {len(vectors)} x {args.dim}, "
+              f"{index.nlist} lists built in {time.perf_counter() - t0:.1f} s")
+    else:
+        index = IVFIndex.load(settings.CHUNK_INDEX_PATH)
+        vectors = index.vectors.astype(np.float32) * index.scale
+        ids = index.ids
+        print(f"[INFO] {settings.CHUNK_INDEX_PATH}: {len(index)} chunks, {index.nlist} lists, {index.vectors.dtype}")
+
+    queries = make_queries(vectors, min(args.queries, len(vectors)), args.noise)
+    exact, p50, p95 = timed(lambda q: exact_search(vectors, ids, q, args.k), queries)
+    exact_top1 = [e[:1] for e in exact]
+    print(f"{'search':>12} {'recall@1':>9} {'recall@' + str(args.k):>9} {'p50 us':>9} {'p95 us':>9}")
+    print(f"{'exact':>12} {1.0:>9.3f} {1.0:>9.3f} {p50:>9.0f} {p95:>9.0f}")
+    for nprobe in [int(p) for p in args.nprobe.split(",")]:
+        found, p50, p95 = timed(lambda q: index.search(q, k=args.k, nprobe=nprobe), queries)
+        r1 = recall_at_k([f[:1] for f in found], exact_top1)
+        rk = recall_at_k(found, exact)
+        print(f"{'nprobe=' + str(nprobe):>12} {r1:>9.3f} {rk:>9.3f} {p50:>9.0f} {p95:>9.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import os
+import sys
+sys.path.append("/app")
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services.chunk_index import refresh_chunk_index
+
+OUT_PATH = settings.CHUNK_INDEX_PATH
+
+# Index IVF des passages DocChunk, chargé en lecture seule (mmap) par les workers de l'API.
+# Embeddings réutilisés depuis le store ; --rebuild ré-encode tout.
+def main():
+    os.makedirs(os.path.dirname(OUT_PATH), exist_ok=True)
+    if "--rebuild" in sys.argv[1:] and os.path.exists(settings.CHUNK_STORE_PATH):
+        os.unlink(settings.CHUNK_STORE_PATH)
+
+    db: Session = SessionLocal()
+    try:
+        stats = refresh_chunk_index(db, quantize=settings.SEMANTIC_QUANTIZE or "--int8" in sys.argv[1:])
+    finally:
+        db.close()
+
+    if "n" not in stats:
+        print("[WARN] no doc chunk to index")
+        return
+    print(f"[INFO] {stats['embedded']} embedded, {stats['reused']} reused, {stats['dropped']} dropped from the store")
+    print(f"[OK] chunk index saved: {OUT_PATH} ({stats['n']} chunks, {stats['nlist']} lists, "
+          f"{stats['dtype']}, {os.path.getsize(OUT_PATH)} bytes)")
+    print("[INFO] run bench_chunk_index.py to check recall@k / latency for CHUNK_NPROBE")
+
+if __name__ == "__main__":
+    main()
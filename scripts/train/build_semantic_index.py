@@ -0,0 +1,51 @@
+import os
+import sys
+sys.path.append("/app")
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.nlp.semantic import KINDS, load_semantic_index
+from app.services.semantic_index import refresh_semantic_index
+
+OUT_PATH = settings.SEMANTIC_INDEX_PATH
+
+# int8 : matrice 4x plus petite (--int8 ou SEMANTIC_QUANTIZE=1)
+QUANTIZE = settings.SEMANTIC_QUANTIZE or "--int8" in sys.argv[1:]
+
+# Encode toutes les questions FAQ et procédures (titre + résumé) dans la matrice utilisée
+# par app.nlp.semantic (FAQ_RETRIEVER=semantic|hybrid). Les embeddings déjà présents
+# dans le store sont réutilisés ; --rebuild ré-encode tout.
+def main():
+    os.makedirs(os.path.dirname(OUT_PATH), exist_ok=True)
+    if "--rebuild" in sys.argv[1:] and os.path.exists(settings.SEMANTIC_STORE_PATH):
+        os.unlink(settings.SEMANTIC_STORE_PATH)
+
+    print(f"[INFO] embedding model: {settings.SEMANTIC_MODEL} (CPU, batch size {settings.SEMANTIC_BATCH_SIZE})")
+    db: Session = SessionLocal()
+    try:
+        stats = refresh_semantic_index(db, quantize=QUANTIZE)
+    finally:
+        db.close()
+
+    if "counts" not in stats:
+        print(f"[WARN] no FAQ or procedure to embed, semantic index removed: {OUT_PATH}")
+        return
+    print(f"[INFO] {stats['embedded']} embedded, {stats['reused']} reused, {stats['dropped']} dropped from the store")
+
+    # Contrôle : chaque document doit se retrouver premier avec son propre embedding
+    index = load_semantic_index(OUT_PATH)
+    matrix = index.matrix.astype("float32") * index.scale
+    misses = sum(
+        1 for i, vec in enumerate(matrix)
+        if index.search(vec, k=1, kind=KINDS[index.kinds[i]])[0].id != index.ids[i]
+    )
+    if misses:
+        print(f"[WARN] {misses} documents are not their own nearest neighbour (duplicates in the KB?)")
+
+    print(f"[OK] semantic index saved: {OUT_PATH} "
+          f"({stats['counts']}, dim {stats['dim']}, {stats['dtype']}, {os.path.getsize(OUT_PATH)} bytes)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import csv
+import os
+import sys
+sys.path.append("/app")
+
+from app.nlp.intent_model import load_faq_model, load_intent_model
+from app.nlp.linear import check_parity
+
+INTENTS_PATH = os.getenv("INTENTS_PATH", "/data/raw/intents.csv")
+
+# Vérifie que le scoreur NumPy compilé renvoie les mêmes labels/scores que sklearn
+# sur les phrases annotées (à lancer après chaque ré-entraînement).
+def main():
+    with open(INTENTS_PATH, encoding="utf-8") as f:
+        texts = [row["text"] for row in csv.DictReader(f)]
+
+    failed = False
+    for name, model in (("intent", load_intent_model()), ("faq", load_faq_model())):
+        if model is None:
+            print(f"[WARN] {name} model not found, skipped")
+            continue
+        if "clf" not in model:
+            print(f"[INFO] {name}: compact (.mmap) artifact in use, parity is checked when it is exported")
+            continue
+        if "linear" not in model:
+            print(f"[ERROR] {name} model could not be compiled")
+            failed = True
+            continue
+        bad = check_parity(model, model["linear"], texts)
+        if bad:
+            failed = True
+            print(f"[ERROR] {name}: {len(bad)}/{len(texts)} mismatches, e.g. {bad[:3]}")
+        else:
+            print(f"[OK] {name}: compiled scorer matches sklearn on {len(texts)} texts")
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import csv
+import os
+import sys
+sys.path.append("/app")
+
+import joblib
+
+from artifacts import OUT_DIR, export_compact
+
+INTENTS_PATH = os.getenv("INTENTS_PATH", "/data/raw/intents.csv")
+
+# Convertit les artefacts joblib déjà présents dans OUT_DIR au format compact (.mmap),
+# sans ré-entraîner. Parité des labels contrôlée sur les phrases de intents.csv.
+def main():
+    with open(INTENTS_PATH, encoding="utf-8") as f:
+        texts = [row["text"] for row in csv.DictReader(f)]
+
+    found = False
+    for name in ("nlu", "intent", "faq"):
+        path = f"{OUT_DIR}/{name}.joblib"
+        if not os.path.exists(path):
+            continue
+        found = True
+        payload = joblib.load(path)
+        if name == "nlu":
+            models = {head: {"vectorizer": payload["vectorizer"], **spec} for head, spec in payload["heads"].items()}
+        else:
+            models = {name: payload}
+        export_compact(f"{OUT_DIR}/{name}.mmap", models, texts)
+
+    if not found:
+        print(f"[WARN] no joblib model found in {OUT_DIR}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import os
+import sys
+sys.path.append("/app")
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.svm import LinearSVC
+
+from artifacts import OUT_DIR, dump_atomic, export_compact, model_footprint, within_budget
+from app.nlp.linear import LinearHead, LinearTextModel, TfidfFeatures, check_parity
+
+NLU_OUT_PATH = f"{OUT_DIR}/nlu.joblib"
+NLU_COMPACT_PATH = f"{OUT_DIR}/nlu.mmap"
+
+
+class _JointScorer:
+    """Inférence d'un message comme à l'API : une seule vectorisation, puis toutes les têtes."""
+
+    def __init__(self, features: TfidfFeatures, heads: list[LinearHead]):
+        self.features = features
+        self.heads = heads
+
+    def scores(self, text: str) -> list:
+        idx, vals = self.features.transform(text)
+        return [head.scores(idx, vals) for head in self.heads]
+
+
+def _step_params(best_params: dict, step: str) -> dict:
+    """Paramètres d'une étape du pipeline ("vectorizer__min_df" -> min_df pour "vectorizer")."""
+    prefix = f"{step}__"
+    return {
+        k[len(prefix):]: tuple(v) if isinstance(v, list) else v
+        for k, v in best_params.items()
+        if k.startswith(prefix)
+    }
+
+
+# Artefact joint chargé en priorité par app.nlp.intent_model :
+# un seul TfidfVectorizer (ajusté sur l'union des corpus) + une tête LinearSVC par tâche.
+# Le message n'est donc tokenisé et vectorisé qu'une fois pour l'intent et la catégorie FAQ.
+def train_joint(
+    datasets: dict[str, tuple[list[str], list[str]]],
+    search_info: dict | None = None,
+    out_path: str = NLU_OUT_PATH,
+    compact_path: str = NLU_COMPACT_PATH,
+):
+    """datasets = {"intent": (texts, labels), "faq": (texts, labels)}
+
+    `search_info` : résumé de train_intent.search_model ; ses `best_params` (validation
+    croisée) configurent le vectorizer partagé et les têtes. L'artefact est soumis au même
+    budget d'inférence que le modèle intent seul, mesuré sur le message complet (toutes les têtes).
+    """
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    search_info = search_info or {}
+    best_params = search_info.get("best_params", {})
+
+    all_texts = [t for texts, _ in datasets.values() for t in texts]
+    vectorizer = TfidfVectorizer(**{"ngram_range": (1, 2), "min_df": 1, **_step_params(best_params, "vectorizer")})
+    vectorizer.fit(all_texts)
+    features = TfidfFeatures.from_sklearn(vectorizer)
+
+    heads = {}
+    for name, (texts, labels) in datasets.items():
+        if len(set(labels)) < 2:
+            print(f"[WARN] joint model: not enough distinct labels for head '{name}', skipped")
+            continue
+
+        clf = LinearSVC(**_step_params(best_params, "clf"))
+        clf.fit(vectorizer.transform(texts), labels)
+        head = {"clf": clf, "labels": sorted(set(labels))}
+
+        model = {"vectorizer": vectorizer, **head}
+        bad = check_parity(model, LinearTextModel.from_sklearn(model, features=features), texts)
+        if bad:
+            print(f"[ERROR] joint model, head '{name}': compiled scorer disagrees with sklearn on {len(bad)} texts")
+            sys.exit(1)
+        heads[name] = head
+
+    payload = {"vectorizer": vectorizer, "heads": heads}
+    scorer = _JointScorer(features, [LinearHead.from_sklearn(h["clf"], h["labels"]) for h in heads.values()])
+    footprint = model_footprint(payload, scorer, all_texts)
+    print(f"[INFO] joint inference p50 {footprint['latency_p50_us']:.0f} us, p95 {footprint['latency_p95_us']:.0f} us, "
+          f"size {footprint['size_bytes']} bytes, {footprint['n_features']} features")
+    if not within_budget(footprint, out_path):
+        sys.exit(1)
+
+    payload["meta"] = {
+        "n_samples": {name: len(datasets[name][0]) for name in heads},
+        **search_info,
+        **footprint,
+    }
+    dump_atomic(payload, out_path)
+
+    print(f"[OK] joint NLU model saved: {out_path}")
+    print(f"[INFO] shared vocabulary: {len(vectorizer.vocabulary_)} terms, heads: {sorted(heads)}")
+    export_compact(compact_path, {name: {"vectorizer": vectorizer, **head} for name, head in heads.items()}, all_texts)
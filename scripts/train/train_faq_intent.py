@@ -5,18 +5,17 @@ sys.path.append("/app")
 from sqlalchemy.orm import Session
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.svm import LinearSVC
-import joblib
 
 from app.db.session import SessionLocal
+from artifacts import OUT_DIR, dump_atomic, export_compact
+from app.nlp.linear import LinearTextModel, check_parity
+from joint import train_joint
 from app.db.models import FAQItem
 
-OUT_DIR = "/app/app/nlp/models"
 OUT_PATH = f"{OUT_DIR}/faq.joblib"
+COMPACT_PATH = f"{OUT_DIR}/faq.mmap"
 
-def main():
-    os.makedirs(OUT_DIR, exist_ok=True)
-    db: Session = SessionLocal()
-
+def build_dataset(db: Session) -> tuple[list[str], list[str]]:
     texts = []
     labels = []
 
@@ -37,6 +36,14 @@ def main():
         texts.append(text)
         labels.append(f.category_id)  # ex: "emploitemps", "proceduresadmin", ...
 
+    return texts, labels
+
+def main():
+    os.makedirs(OUT_DIR, exist_ok=True)
+    db: Session = SessionLocal()
+
+    texts, labels = build_dataset(db)
+
     # Sécurité : s'il n'y a pas assez de données
     if len(set(labels)) < 2:
         print("[WARN] Not enough distinct FAQ categories to train classifier")
@@ -53,10 +60,27 @@ def main():
         "clf": clf,
         "labels": sorted(set(labels)),
     }
-    joblib.dump(payload, OUT_PATH)
+
+    # Parité du scoreur compilé (utilisé à l'inférence) avec sklearn
+    bad = check_parity(payload, LinearTextModel.from_sklearn(payload), texts)
+    if bad:
+        print(f"[ERROR] compiled scorer disagrees with sklearn on {len(bad)} texts, e.g. {bad[:3]}")
+        db.close()
+        sys.exit(1)
+
+    dump_atomic(payload, OUT_PATH)
 
     print(f"[OK] FAQ category model saved: {OUT_PATH}")
     print(f"[INFO] FAQ categories: {sorted(set(labels))}")
+    export_compact(COMPACT_PATH, {"faq": payload}, texts)
+
+    # --joint : produit aussi l'artefact partagé (un vectorizer, têtes intent + FAQ)
+    if "--joint" in sys.argv[1:]:
+        from train_intent import build_dataset as build_other_dataset, search_model
+        intent_texts, intent_labels = build_other_dataset(db)
+        # hyperparamètres choisis par validation croisée sur l'intent, comme train_intent.py
+        _, search_info = search_model(intent_texts, intent_labels)
+        train_joint({"intent": (intent_texts, intent_labels), "faq": (texts, labels)}, search_info)
 
     db.close()
 
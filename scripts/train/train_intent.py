@@ -1,27 +1,54 @@
+import csv
 import os
 import sys
 sys.path.append("/app")
 
+from typing import Iterator
+
 from sqlalchemy.orm import Session
 from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.model_selection import GridSearchCV, StratifiedKFold
+from sklearn.pipeline import Pipeline
 from sklearn.svm import LinearSVC
-import joblib
 
 from app.db.session import SessionLocal
+from artifacts import OUT_DIR, dump_atomic, export_compact, model_footprint, within_budget
+from app.nlp.linear import LinearTextModel, check_parity
+from joint import train_joint
 from app.db.models import Contact, TimetableSlot, FAQItem
 
-OUT_DIR = "/app/app/nlp/models"
 OUT_PATH = f"{OUT_DIR}/intent.joblib"
-
-def main():
-    os.makedirs(OUT_DIR, exist_ok=True)
-    db: Session = SessionLocal()
-
-    texts = []
-    labels = []
-
+COMPACT_PATH = f"{OUT_DIR}/intent.mmap"
+INTENTS_PATH = os.getenv("INTENTS_PATH", "/data/raw/intents.csv")
+
+# Recherche d'hyperparamètres (validation croisée stratifiée, répartie sur les cœurs)
+CV_FOLDS = int(os.getenv("INTENT_CV_FOLDS", "5"))
+N_JOBS = int(os.getenv("TRAIN_N_JOBS", "-1"))
+PARAM_GRID = {
+    "vectorizer__ngram_range": [(1, 1), (1, 2)],
+    "vectorizer__min_df": [1, 2],
+    "vectorizer__sublinear_tf": [False, True],
+    "clf__C": [0.1, 1.0, 10.0],
+}
+
+def _norm(text: str) -> str:
+    return " ".join(text.lower().split())
+
+def iter_csv_samples(path: str = INTENTS_PATH) -> Iterator[tuple[str, str]]:
+    """Phrases annotées (text, intent), lues ligne à ligne."""
+    if not os.path.exists(path):
+        print(f"[WARN] {path} not found, training on DB-derived samples only")
+        return
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            text, intent = (row.get("text") or "").strip(), (row.get("intent") or "").strip()
+            if text and intent:
+                yield text, intent
+
+def iter_db_samples(db: Session) -> Iterator[tuple[str, str]]:
+    """Exemples synthétiques tirés de la base (contacts, créneaux) + phrases de base."""
     # -------- CONTACT --------
-    for c in db.query(Contact).all():
+    for c in db.query(Contact).yield_per(500):
         # phrase artificielle pour apprendre le pattern
         base = []
         if c.categorie_principale:
@@ -32,8 +59,7 @@ def main():
             base.append(c.role)
 
         label_text = " ".join(base) if base else "contact campus"
-        texts.append(f"contacter {label_text}")
-        labels.append("contact")
+        yield f"contacter {label_text}", "contact"
 
     # Seeds pour contact
     contact_seeds = [
@@ -45,11 +71,10 @@ def main():
         "qui dois-je appeler en cas de problème sur le campus",
     ]
     for t in contact_seeds:
-        texts.append(t)
-        labels.append("contact")
+        yield t, "contact"
 
     # -------- TIMETABLE --------
-    for slot in db.query(TimetableSlot).all():
+    for slot in db.query(TimetableSlot).yield_per(500):
         parts = []
         if slot.program:
             parts.append(slot.program)
@@ -59,8 +84,7 @@ def main():
             parts.append(slot.subject_name)
 
         label_text = " ".join(parts) if parts else "emploi du temps"
-        texts.append(f"emploi du temps {label_text}")
-        labels.append("timetable")
+        yield f"emploi du temps {label_text}", "timetable"
 
     # Seeds pour timetable
     timetable_seeds = [
@@ -71,25 +95,113 @@ def main():
         "où est ma salle de TD",
     ]
     for t in timetable_seeds:
-        texts.append(t)
-        labels.append("timetable")
+        yield t, "timetable"
+
+def build_dataset(db: Session) -> tuple[list[str], list[str]]:
+    """intents.csv puis échantillons issus de la base, dédupliqués sur le texte normalisé.
+
+    Les phrases annotées passent en premier : un texte synthétique qui les répète
+    (quel que soit son label) est ignoré, tout comme les milliers de doublons générés
+    par des contacts/créneaux aux mêmes catégories.
+    """
+    texts, labels = [], []
+    seen = set()
+    counts = {"csv": 0, "db": 0, "duplicates": 0}
+    for source, samples in (("csv", iter_csv_samples()), ("db", iter_db_samples(db))):
+        for text, label in samples:
+            key = _norm(text)
+            if key in seen:
+                counts["duplicates"] += 1
+                continue
+            seen.add(key)
+            texts.append(text)
+            labels.append(label)
+            counts[source] += 1
+
+    print(f"[INFO] dataset: {counts['csv']} annotated + {counts['db']} DB-derived samples, "
+          f"{counts['duplicates']} duplicates dropped")
+    return texts, labels
+
+def search_model(texts: list[str], labels: list[str]) -> tuple[Pipeline, dict]:
+    """GridSearchCV sur le TF-IDF + LinearSVC ; renvoie le meilleur pipeline (réajusté
+    sur tout le jeu) et le résumé de la recherche."""
+    pipeline = Pipeline([
+        ("vectorizer", TfidfVectorizer(ngram_range=(1, 2), min_df=1)),
+        ("clf", LinearSVC()),
+    ])
+    smallest = min(labels.count(l) for l in set(labels))
+    folds = min(CV_FOLDS, smallest)
+    if folds < 2:
+        print("[WARN] a label has a single example, hyperparameter search skipped")
+        return pipeline.fit(texts, labels), {"cv_folds": 0}
+
+    search = GridSearchCV(
+        pipeline,
+        PARAM_GRID,
+        cv=StratifiedKFold(n_splits=folds, shuffle=True, random_state=0),
+        scoring="f1_macro",
+        n_jobs=N_JOBS,
+    )
+    search.fit(texts, labels)
+    best_params = {k: list(v) if isinstance(v, tuple) else v for k, v in search.best_params_.items()}
+    print(f"[INFO] best params: {best_params} (macro-F1 {search.best_score_:.3f}, {folds}-fold CV)")
+    return search.best_estimator_, {
+        "cv_folds": folds,
+        "cv_f1_macro": float(search.best_score_),
+        "best_params": best_params,
+        "n_candidates": len(search.cv_results_["params"]),
+    }
 
-    # Entraînement
-    vectorizer = TfidfVectorizer(ngram_range=(1, 2), min_df=1)
-    X = vectorizer.fit_transform(texts)
+def main():
+    os.makedirs(OUT_DIR, exist_ok=True)
+    db: Session = SessionLocal()
+
+    texts, labels = build_dataset(db)
+    if len(set(labels)) < 2:
+        print("[WARN] Not enough distinct intents to train classifier")
+        db.close()
+        return
 
-    clf = LinearSVC()
-    clf.fit(X, labels)
+    # Entraînement
+    best, search_info = search_model(texts, labels)
 
     payload = {
-        "vectorizer": vectorizer,
-        "clf": clf,
+        "vectorizer": best.named_steps["vectorizer"],
+        "clf": best.named_steps["clf"],
         "labels": sorted(set(labels)),
     }
-    joblib.dump(payload, OUT_PATH)
+
+    # Parité du scoreur compilé (utilisé à l'inférence) avec sklearn
+    linear = LinearTextModel.from_sklearn(payload)
+    bad = check_parity(payload, linear, texts)
+    if bad:
+        print(f"[ERROR] compiled scorer disagrees with sklearn on {len(bad)} texts, e.g. {bad[:3]}")
+        db.close()
+        sys.exit(1)
+
+    footprint = model_footprint(payload, linear, texts)
+    print(f"[INFO] inference p50 {footprint['latency_p50_us']:.0f} us, p95 {footprint['latency_p95_us']:.0f} us, "
+          f"size {footprint['size_bytes']} bytes, {footprint['n_features']} features")
+    if not within_budget(footprint, OUT_PATH):
+        db.close()
+        sys.exit(1)
+
+    payload["meta"] = {
+        "n_samples": len(texts),
+        "label_counts": {l: labels.count(l) for l in payload["labels"]},
+        **search_info,
+        **footprint,
+    }
+    dump_atomic(payload, OUT_PATH)
 
     print(f"[OK] intent model saved: {OUT_PATH}")
     print(f"[INFO] labels: {sorted(set(labels))}")
+    export_compact(COMPACT_PATH, {"intent": payload}, texts)
+
+    # --joint : produit aussi l'artefact partagé (un vectorizer, têtes intent + FAQ)
+    if "--joint" in sys.argv[1:]:
+        from train_faq_intent import build_dataset as build_other_dataset
+        train_joint({"intent": (texts, labels), "faq": build_other_dataset(db)}, search_info)
 
     db.close()
 